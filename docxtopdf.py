@@ -1,749 +1,997 @@
-import os
-import sys
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-from PIL import Image, ImageFile, UnidentifiedImageError
-import win32com.client
-import pythoncom
-import webbrowser
-import pytesseract
-import subprocess
-
-# 处理打包后的资源路径
-def resource_path(relative_path):
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath("."), relative_path)
-
-# 初始化OCR路径
-if getattr(sys, 'frozen', False):
-    tess_path = resource_path("Tesseract-OCR/tesseract.exe")
-    os.environ["PATH"] += os.pathsep + resource_path("poppler/bin")
-else:
-    tess_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # 开发环境路径
-
-pytesseract.pytesseract.tesseract_cmd = tess_path
-
-
-# 允许加载损坏的图片
-ImageFile.LOAD_TRUNCATED_IMAGES = True
-
-class DocToPdfConverter:
-    # 支持的文档格式
-    SUPPORTED_DOC_FORMATS = [
-        ('Word 文档', '*.doc;*.docx'),
-        ('Word 模板', '*.dot;*.dotx'),
-        ('启用宏的文档', '*.docm;*.dotm'),
-        ('富文本格式', '*.rtf'),
-        ('纯文本', '*.txt'),
-        ('网页格式', '*.htm;*.html'),
-        ('OpenDocument', '*.odt'),
-        ('XML 文档', '*.xml'),
-        ('PDF 文档', '*.pdf')
-    ]
-
-    # 支持的图片格式
-    SUPPORTED_IMAGE_FORMATS = [
-        ('JPEG 图片', '*.jpg;*.jpeg'),
-        ('PNG 图片', '*.png'),
-        ('BMP 图片', '*.bmp'),
-        ('GIF 图片', '*.gif'),
-        ('TIFF 图片', '*.tiff')
-    ]
-
-    def __init__(self, master):
-        self.master = master
-        master.title("文档/图片转PDF工具")
-        master.geometry("1200x800")
-        master.configure(bg="#f0f8ff")  # 浅蓝色背景
-        
-        # 设置窗口图标
-        try:
-            master.iconbitmap('pdf_icon.ico')  # 如果有图标文件
-        except:
-            pass
-        # 初始化OCR相关配置
-        self.tesseract_path = None
-        self.init_tesseract()
-
-        # 检测办公软件
-        self.office_type = self.detect_office()
-        if not self.office_type:
-            messagebox.showwarning("警告", "未检测到Microsoft Word或WPS，将仅支持图片转PDF功能")
-
-        # ================= 样式配置 =================
-        self.style = ttk.Style()
-        self.style.theme_use('clam')
-        
-        # 主背景色
-        self.style.configure(".", background="#f0f8ff", foreground="#333333")
-        
-        # 框架样式
-        self.style.configure("TFrame", background="#f0f8ff")
-        self.style.configure("TLabelframe", background="#f0f8ff", bordercolor="#4a90e2", relief=tk.GROOVE)
-        self.style.configure("TLabelframe.Label", background="#f0f8ff", foreground="#2c3e50", font=("微软雅黑", 10, "bold"))
-        
-        # 标签样式
-        self.style.configure("TLabel", background="#f0f8ff", font=("微软雅黑", 10))
-        
-        # 按钮样式
-        self.style.configure("TButton", font=("微软雅黑", 10), padding=8, relief=tk.RAISED)
-        self.style.map("TButton",
-            foreground=[('active', 'white'), ('!active', 'white')],
-            background=[('active', '#45aaf2'), ('!active', '#2d98da')],
-            bordercolor=[('active', '#45aaf2'), ('!active', '#2d98da')]
-        )
-        
-        # 输入框样式
-        self.style.configure("TEntry", fieldbackground="white", font=("微软雅黑", 10), padding=6)
-        
-        # 树形视图样式
-        self.style.configure("Treeview", 
-            background="white", 
-            foreground="#333333",
-            rowheight=25,
-            fieldbackground="white"
-        )
-        self.style.configure("Treeview.Heading", 
-            background="#4a90e2", 
-            foreground="white",
-            font=("微软雅黑", 10, "bold")
-        )
-        self.style.map("Treeview",
-            background=[('selected', '#3498db')],
-            foreground=[('selected', 'white')]
-        )
-
-        # ================= 主界面布局 =================
-        # 标题区域
-        self.header_frame = ttk.Frame(master)
-        self.header_frame.pack(pady=(20, 10), fill=tk.X)
-        
-        # 主标题
-        ttk.Label(
-            self.header_frame,
-            text="文档/图片转PDF工具",
-            font=("微软雅黑", 18, "bold"),
-            foreground="#2c3e50",
-            justify="center"
-        ).pack(pady=(0, 5))
-        
-        # 副标题
-        ttk.Label(
-            self.header_frame,
-            text="支持多种文档和图片格式转换为PDF",
-            font=("微软雅黑", 12),
-            foreground="#7f8c8d",
-            justify="center"
-        ).pack()
-
-        # 文件选择区域
-        self.setup_file_section()
-
-        # 输出路径区域
-        self.setup_output_section()
-
-        # 文件列表区域
-        self.setup_list_section()
-
-        # 操作按钮区域
-        self.setup_action_section()
-
-        # 状态栏
-        self.setup_status_bar()
-
-        # 初始化变量
-        self.output_path = ""
-        self.app = None
-        self.current_file = ""
-        self.supported_doc_exts = self.generate_supported_extensions(self.SUPPORTED_DOC_FORMATS)
-        self.supported_image_exts = self.generate_supported_extensions(self.SUPPORTED_IMAGE_FORMATS)
-    
-    def init_tesseract(self):
-        """初始化Tesseract OCR配置"""
-        try:
-            # 尝试自动检测路径
-            possible_paths = [
-                r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-                r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-                '/usr/bin/tesseract',
-                '/usr/local/bin/tesseract'
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path):
-                    pytesseract.pytesseract.tesseract_cmd = path
-                    self.tesseract_path = path
-                    return
-
-            # 尝试环境变量检测
-            try:
-                subprocess.run(['tesseract', '--version'], check=True, 
-                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                self.tesseract_path = 'tesseract'
-                return
-            except:
-                messagebox.showwarning("OCR警告", 
-                    "Tesseract OCR未正确配置，文字提取功能受限\n"
-                    "请通过'设置OCR路径'按钮手动配置")
-        except Exception as e:
-            print(f"OCR初始化错误: {e}")
-    
-    def generate_supported_extensions(self, formats):
-        """生成带点的扩展名集合"""
-        exts = set()
-        for _, formats_str in formats:
-            if formats_str == '*.*':
-                continue
-            for ext in formats_str.split(';'):
-                exts.add(ext.lower().replace("*", ""))
-        return exts
-
-    def detect_office(self):
-        """检测可用的办公软件"""
-        try:
-            word = win32com.client.Dispatch("Word.Application")
-            word.Quit()
-            return "word"
-        except Exception as e:
-            if getattr(sys, 'frozen', False):
-                return messagebox.askyesno(
-                    "Office未安装",
-                    "需要安装Microsoft Word或WPS才能转换文档\n"
-                    "是否现在访问下载页面？"
-                ) and webbrowser.open("https://www.wps.cn/")
-            return None
-
-    def setup_file_section(self):
-        """文件选择区域"""
-        file_frame = ttk.LabelFrame(
-            self.master,
-            text=" 1. 选择文件 ",
-            padding=(15, 10))
-        file_frame.pack(pady=10, padx=20, fill=tk.X)
-
-        # 文件路径输入框
-        path_frame = ttk.Frame(file_frame)
-        path_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Label(
-            path_frame,
-            text="文件路径:",
-            font=("微软雅黑", 10, "bold")
-        ).pack(side=tk.LEFT, padx=(0, 10))
-        
-        self.entry_path = ttk.Entry(path_frame, width=50)
-        self.entry_path.pack(side=tk.LEFT, expand=True, fill=tk.X)
-        
-        # 文件选择按钮
-        button_frame = ttk.Frame(file_frame)
-        button_frame.pack(fill=tk.X, pady=5)
-        
-        ttk.Button(
-            button_frame,
-            text="选择文档",
-            command=self.select_document,
-            width=15
-        ).pack(side=tk.LEFT, padx=5)
-
-        ttk.Button(
-            button_frame,
-            text="选择图片",
-            command=self.select_image,
-            width=15
-        ).pack(side=tk.LEFT, padx=5)
-
-    def setup_output_section(self):
-        """输出路径区域"""
-        output_frame = ttk.LabelFrame(
-            self.master,
-            text=" 2. 输出设置 ",
-            padding=(15, 10)
-        )
-        output_frame.pack(pady=10, padx=20, fill=tk.X)
-
-        # 输出路径输入框
-        output_path_frame = ttk.Frame(output_frame)
-        output_path_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Label(
-            output_path_frame,
-            text="输出目录:",
-            font=("微软雅黑", 10, "bold")
-        ).pack(side=tk.LEFT, padx=(0, 10))
-        
-        self.entry_output = ttk.Entry(output_path_frame, width=50)
-        self.entry_output.pack(side=tk.LEFT, expand=True, fill=tk.X)
-        
-        # 选择目录按钮
-        ttk.Button(
-            output_path_frame,
-            text="浏览...",
-            command=self.select_output_path,
-            width=10
-        ).pack(side=tk.LEFT, padx=5)
-
-    def setup_list_section(self):
-        """文件列表区域"""
-        list_frame = ttk.LabelFrame(
-            self.master,
-            text=" 3. 当前文件 ",
-            padding=(15, 10))
-        list_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
-
-        # 创建带滚动条的树形视图
-        tree_frame = ttk.Frame(list_frame)
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 垂直滚动条
-        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
-        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 水平滚动条
-        x_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
-        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
-        
-        self.tree = ttk.Treeview(
-            tree_frame,
-            columns=("filename", "path", "type"),
-            show="headings",
-            height=5,
-            yscrollcommand=y_scroll.set,
-            xscrollcommand=x_scroll.set
-        )
-        self.tree.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
-        
-        # 配置滚动条
-        y_scroll.config(command=self.tree.yview)
-        x_scroll.config(command=self.tree.xview)
-        
-        # 设置列
-        self.tree.heading("filename", text="文件名", anchor=tk.W)
-        self.tree.heading("path", text="路径", anchor=tk.W)
-        self.tree.heading("type", text="类型", anchor=tk.W)
-        
-        self.tree.column("filename", width=200, minwidth=150, stretch=tk.YES)
-        self.tree.column("path", width=350, minwidth=200, stretch=tk.YES)
-        self.tree.column("type", width=100, minwidth=80, stretch=tk.NO)
-
-    def setup_action_section(self):
-        """操作按钮区域"""
-        action_frame = ttk.Frame(self.master)
-        action_frame.pack(pady=20, padx=20, fill=tk.X)
-        
-        # 左对齐按钮
-        left_frame = ttk.Frame(action_frame)
-        left_frame.pack(side=tk.LEFT, expand=True)
-        
-        buttons = [
-            ("项目说明", self.show_project_info),
-            ("查看源码", self.view_source_code),
-            ("联系作者", self.contact_author),
-            ("提取文字", self.extract_text_from_image),
-            ("设置OCR路径", self.set_tesseract_path)  # 新增按钮
-        ]
-        
-        for text, command in buttons:
-            ttk.Button(
-                left_frame,
-                text=text,
-                command=command,
-                width=15
-            ).pack(side=tk.LEFT, padx=5)
-
-        
-        # 右对齐按钮
-        right_frame = ttk.Frame(action_frame)
-        right_frame.pack(side=tk.RIGHT, expand=True)
-        
-        ttk.Button(
-            right_frame,
-            text="支持格式",
-            command=self.show_supported_formats,
-            width=15
-        ).pack(side=tk.RIGHT, padx=5)
-        
-        ttk.Button(
-            right_frame,
-            text="开始转换",
-            command=self.start_conversion,
-            width=15,
-            style="Accent.TButton"
-        ).pack(side=tk.RIGHT, padx=5)
-        
-        # 创建强调按钮样式
-        self.style.configure("Accent.TButton", 
-            background="#2ecc71", 
-            foreground="white"
-        )
-        self.style.map("Accent.TButton",
-            background=[('active', '#27ae60'), ('!active', '#2ecc71')],
-            foreground=[('active', 'white'), ('!active', 'white')]
-        )
-
-    def set_tesseract_path(self):
-        """设置 Tesseract 路径"""
-        path = filedialog.askopenfilename(
-            title="选择 Tesseract 可执行文件",
-            filetypes=[("可执行文件", "*.exe")]
-        )
-        if path:
-            pytesseract.pytesseract.tesseract_cmd = path
-            self.tesseract_path = path
-            self.update_status(f"Tesseract 路径已设置为: {path}")
-            messagebox.showinfo("成功", f"Tesseract 路径已设置为: {path}")
-
-    def show_ocr_result(self, text):
-        """显示OCR结果的增强界面"""
-        result_window = tk.Toplevel(self.master)
-        result_window.title("文字提取结果")
-        result_window.geometry("900x600")
-        
-        # 顶部按钮区域
-        btn_frame = ttk.Frame(result_window)
-        btn_frame.pack(fill=tk.X, padx=10, pady=5)
-        
-        ttk.Button(
-            btn_frame,
-            text="复制内容",
-            command=lambda: self.master.clipboard_append(text),
-            width=15
-        ).pack(side=tk.LEFT, padx=5)
-
-        # 文字显示区域
-        text_frame = ttk.Frame(result_window)
-        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-        
-        scrollbar = ttk.Scrollbar(text_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        text_area = scrolledtext.ScrolledText(
-            text_frame,
-            wrap=tk.WORD,
-            yscrollcommand=scrollbar.set,
-            font=("微软雅黑", 10),
-            padx=10,
-            pady=10
-        )
-        text_area.pack(fill=tk.BOTH, expand=True)
-        text_area.insert(tk.END, text)
-        text_area.config(state=tk.DISABLED)
-        
-        scrollbar.config(command=text_area.yview)
-
-    def setup_status_bar(self):
-        """状态栏"""
-        status_frame = ttk.Frame(self.master, relief=tk.SUNKEN)
-        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
-        
-        self.status_label = ttk.Label(
-            status_frame,
-            text="就绪",
-            font=("微软雅黑", 9),
-            foreground="#7f8c8d",
-            anchor=tk.W
-        )
-        self.status_label.pack(fill=tk.X, padx=5)
-
-    def show_project_info(self):
-        """显示项目说明"""
-        messagebox.showinfo(
-            "项目说明",
-            "📚 文档/图片转PDF工具\n\n"
-            "🔹 项目诞生原因：\n"
-            " 由一个懒癌晚期的大学生因为受不了某些软件广告式的转换界面\n"
-            " 和拿着开源收费的图片提取文字功能\n"
-            " 而打造的一款极简工具\n"
-            "🔹 主要功能：\n"
-            "• 支持Word等多种文档格式转PDF\n"
-            "• 支持JPG、PNG等常见图片格式转PDF\n"
-            "• 支持从图片中提取文字\n"
-            "• 简洁直观的用户界面\n\n"
-            "🔹 版本: 1.1.0\n"
-            "© 2025 文档转换工具"
-        )
-
-    def view_source_code(self):
-        """查看源码"""
-        result = messagebox.askyesno(
-            "查看源码",
-            "即将跳转到GitHub查看项目版本1.0.0的源码，是否继续？"
-        )
-        if result:
-            try:
-                webbrowser.open("https://github.com/cxywh/To-pdf/blob/main/docxtopdf.py")
-            except Exception as e:
-                messagebox.showerror("错误", f"无法打开网页: {str(e)}")
-
-    def contact_author(self):
-        """联系作者"""
-        contact_window = tk.Toplevel(self.master)
-        contact_window.title("联系作者")
-        contact_window.geometry("300x250")
-        contact_window.resizable(False, False)
-        
-        tk.Label(
-            contact_window,
-            text="📧 联系方式",
-            font=("微软雅黑", 12, "bold"),
-            pady=10
-        ).pack()
-        
-        tk.Label(
-            contact_window,
-            text="QQ: 3864095082",
-            font=("微软雅黑", 11),
-            pady=5
-        ).pack()
-        
-        tk.Label(
-            contact_window,
-            text="瓦:马枪手胡图图#92533",
-            font=("微软雅黑", 11),
-            pady=5
-        ).pack()
-        
-        ttk.Button(
-            contact_window,
-            text="关闭",
-            command=contact_window.destroy,
-            width=10
-        ).pack(pady=10)
-
-    def update_status(self, message):
-        """更新状态栏信息"""
-        self.status_label.config(text=message)
-        self.master.update()
-
-    def select_document(self):
-        """选择文档文件"""
-        filetypes = []
-        for desc, ext in self.SUPPORTED_DOC_FORMATS:
-            if ext == '*.*':
-                filetypes.append((desc, ext))
-            else:
-                ext_tuple = tuple(ext.split(';'))
-                filetypes.append((desc, ext_tuple))
-        
-        path = filedialog.askopenfilename(
-            title="选择要转换的文档文件",
-            filetypes=filetypes,
-            defaultextension="*.*"
-        )
-        if path:
-            self.entry_path.delete(0, tk.END)
-            self.entry_path.insert(0, path)
-            self.current_file = path
-            self.update_file_list(path, "文档")
-            self.update_status(f"已选择文档: {os.path.basename(path)}")
-
-    def select_image(self):
-        """选择图片文件"""
-        filetypes = []
-        for desc, ext in self.SUPPORTED_IMAGE_FORMATS:
-            if ext == '*.*':
-                filetypes.append((desc, ext))
-            else:
-                ext_tuple = tuple(ext.split(';'))
-                filetypes.append((desc, ext_tuple))
-        
-        # 添加一个选项以显示所有支持的图片格式
-        all_image_exts = []
-        for _, ext in self.SUPPORTED_IMAGE_FORMATS:
-            all_image_exts.extend(ext.split(';'))
-        all_image_exts = tuple(all_image_exts)
-        filetypes.insert(0, ("所有支持的图片格式", all_image_exts))
-        
-        path = filedialog.askopenfilename(
-            title="选择要转换的图片文件",
-            filetypes=filetypes,
-            defaultextension="*.*"
-        )
-        if path:
-            # 验证图片文件是否有效
-            if not self.is_valid_image(path):
-                return
-            
-            self.entry_path.delete(0, tk.END)
-            self.entry_path.insert(0, path)
-            self.current_file = path
-            self.update_file_list(path, "图片")
-            self.update_status(f"已选择图片: {os.path.basename(path)}")
-
-    def select_output_path(self):
-        """选择输出路径"""
-        path = filedialog.askdirectory(title="选择输出目录")
-        if path:
-            self.output_path = path
-            self.entry_output.delete(0, tk.END)
-            self.entry_output.insert(0, path)
-            self.update_status(f"输出目录设置为: {path}")
-
-    def update_file_list(self, file_path, file_type):
-        """更新文件列表显示"""
-        self.tree.delete(*self.tree.get_children())
-        if file_path:
-            self.tree.insert("", "end", values=(os.path.basename(file_path), file_path, file_type))
-
-    def show_supported_formats(self):
-        """显示支持格式"""
-        doc_formats = "\n".join([
-            f"• {desc} ({ext.replace(';', ', ')})"
-            for desc, ext in self.SUPPORTED_DOC_FORMATS
-        ])
-        image_formats = "\n".join([
-            f"• {desc} ({ext.replace(';', ', ')})"
-            for desc, ext in self.SUPPORTED_IMAGE_FORMATS
-        ])
-        
-        messagebox.showinfo(
-            "支持格式",
-            f"📄 文档支持格式：\n{doc_formats}\n\n"
-            f"🖼️ 图片支持格式：\n{image_formats}\n\n"
-            f"💻 办公软件: {'WPS' if self.office_type == 'wps' else 'Microsoft Word' if self.office_type else '无'}\n"
-            "ℹ️ 注意：图片转换使用PIL库，文档转换使用Office组件"
-        )
-
-    def is_valid_image(self, file_path):
-        """验证图片文件是否有效"""
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            messagebox.showerror("错误", f"文件不存在: {file_path}")
-            self.update_status("错误: 文件不存在")
-            return False
-
-        try:
-            with Image.open(file_path) as img:
-                # 验证文件内容
-                img.verify()
-                # 重新打开图片以加载数据
-                with Image.open(file_path) as img:
-                    img.load()  # 加载图片数据
-            return True
-        except (IOError, UnidentifiedImageError, Image.DecompressionBombError) as e:
-            messagebox.showerror("错误", f"无效的图片文件: {str(e)}")
-            self.update_status("错误: 无效的图片文件")
-            return False
-
-    def convert_image_to_pdf(self, image_path, output_path):
-        """将图片转换为PDF"""
-        self.update_status(f"正在转换图片到PDF: {os.path.basename(image_path)}...")
-        try:
-            with Image.open(image_path) as img:
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 保持原始图片质量
-                img.save(
-                    output_path, 
-                    "PDF", 
-                    resolution=100.0,
-                    quality=95,
-                    save_all=True if hasattr(img, 'is_animated') and img.is_animated else False
-                )
-            self.update_status(f"图片转换成功: {os.path.basename(image_path)}")
-            return True
-        except Exception as e:
-            messagebox.showerror("错误", f"图片转换失败: {str(e)}")
-            self.update_status(f"错误: 图片转换失败 - {str(e)}")
-            return False
-
-    def extract_text_from_image(self):
-        """从图片中提取文字"""
-        if not self.current_file:
-            messagebox.showwarning("警告", "请先选择图片文件！")
-            self.update_status("警告: 未选择文件")
-            return
-
-        try:
-            # 验证图片是否有效
-            if not self.is_valid_image(self.current_file):
-                return
-
-            # 提取文字
-            self.update_status(f"正在从图片中提取文字: {os.path.basename(self.current_file)}...")
-            text = pytesseract.image_to_string(Image.open(self.current_file), lang='chi_sim+eng')
-
-            if not text.strip():
-                messagebox.showinfo("提示", "未检测到文字！")
-                self.update_status("提示: 未检测到文字")
-                return
-
-            # 显示提取结果
-            self.show_ocr_result(text)
-
-        except Exception as e:
-            messagebox.showerror("错误", f"文字提取失败: {str(e)}")
-            self.update_status(f"错误: 文字提取失败 - {str(e)}")
-
-    def start_conversion(self):
-        """开始转换"""
-        if not self.current_file:
-            messagebox.showwarning("警告", "请先选择要转换的文件！")
-            self.update_status("警告: 未选择文件")
-            return
-        if not self.output_path:
-            messagebox.showwarning("警告", "请先选择输出目录！")
-            self.update_status("警告: 未选择输出目录")
-            return
-
-        try:
-            # 获取规范化的文件扩展名
-            file_ext = os.path.splitext(self.current_file)[1].lower()
-            
-            # 生成输出路径
-            filename = os.path.basename(self.current_file)
-            pdf_name = os.path.splitext(filename)[0] + ".pdf"
-            pdf_path = os.path.join(self.output_path, pdf_name)
-
-            # 判断文件类型
-            is_image = file_ext in self.supported_image_exts
-
-            if is_image:
-                # 图片转PDF
-                if not self.convert_image_to_pdf(self.current_file, pdf_path):
-                    return
-            else:
-                # 文档转PDF
-                if not self.office_type:
-                    messagebox.showerror("错误", "未检测到Office软件，无法转换文档！")
-                    self.update_status("错误: 未检测到Office软件")
-                    return
-
-                self.update_status(f"正在转换文档到PDF: {filename}...")
-                pythoncom.CoInitialize()
-                try:
-                    app_name = "Kwps.Application" if self.office_type == "wps" else "Word.Application"
-                    self.app = win32com.client.Dispatch(app_name)
-                    self.app.Visible = False
-
-                    doc = self.app.Documents.Open(self.current_file)
-                    doc.SaveAs(pdf_path, FileFormat=17)  # 17是PDF格式
-                    doc.Close()
-                    self.update_status(f"文档转换成功: {filename}")
-                except Exception as e:
-                    messagebox.showerror("错误", f"文档转换失败: {str(e)}")
-                    self.update_status(f"错误: 文档转换失败 - {str(e)}")
-                    return
-                finally:
-                    if hasattr(self, 'app') and self.app:
-                        self.app.Quit()
-                    pythoncom.CoUninitialize()
-
-            # 转换成功后询问
-            if messagebox.askyesno("完成", f"✅ {filename} 转换成功！\n是否继续转换其他文件？"):
-                self.current_file = ""
-                self.entry_path.delete(0, tk.END)
-                self.update_file_list("", "")
-                self.update_status("就绪 - 等待选择新文件")
-            else:
-                self.master.destroy()
-
-        except Exception as e:
-            messagebox.showerror("错误", f"转换过程中发生错误: {str(e)}")
-            self.update_status(f"错误: {str(e)}")
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = DocToPdfConverter(root)
-    root.mainloop()
+import multiprocessing
+import os
+import sys
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+import webbrowser
+
+from topdf import ConversionEngine, ConversionError, capabilities, formats, iter_inputs, ocr
+from topdf.backends import backend_label
+from topdf.engine import path_key
+from topdf.jobs import CANCELLED, DONE, FAILED, JobCancelled, JobQueue
+from topdf.manifest import ConversionManifest
+from topdf.outputcache import OutputCache
+from topdf.runtime import cache_dir, is_frozen, setup_environment
+
+setup_environment()
+
+class DocToPdfConverter:
+    # 后台任务状态的轮询间隔（毫秒）
+    POLL_INTERVAL = 100
+
+    # 列表中显示的文件类型
+    KIND_LABELS = {formats.KIND_IMAGE: "图片", formats.KIND_DOCUMENT: "文档",
+                   formats.KIND_PDF: "PDF"}
+
+    # 支持的文档格式
+    SUPPORTED_DOC_FORMATS = formats.SUPPORTED_DOC_FORMATS
+
+    # 支持的图片格式
+    SUPPORTED_IMAGE_FORMATS = formats.SUPPORTED_IMAGE_FORMATS
+
+    def __init__(self, master):
+        self.master = master
+        master.title("文档/图片转PDF工具")
+        master.geometry("1200x800")
+        master.configure(bg="#f0f8ff")  # 浅蓝色背景
+        
+        # 设置窗口图标
+        try:
+            master.iconbitmap('pdf_icon.ico')  # 如果有图标文件
+        except:
+            pass
+        # 转换引擎（界面只负责交互，转换逻辑都在引擎中）
+        self.engine = ConversionEngine()
+        # 后台任务队列：转换和OCR在工作线程中执行，界面保持响应
+        self.jobs = JobQueue(workers=min(os.cpu_count() or 1, 4))
+        self.job_items = {}       # 任务编号 -> 列表中的行
+        self.item_jobs = {}       # 列表中的行 -> 任务编号
+        self.job_callbacks = {}   # 任务编号 -> 任务成功后在界面线程中执行的函数
+        self.list_files = {}      # 尚未提交的行 -> (文件路径, 相对根目录)
+        self.batch = []           # 最近一次“开始转换”提交的任务
+        self.output_claims = {}   # 排队或转换中的任务占用的输出路径 -> 任务编号
+        self.closing = False      # 正在退出，等待任务结束
+
+        # Tesseract 和办公软件在后台检测（见 detect_capabilities），窗口不必等检测完成才显示
+        self.tesseract_path = None
+        self.office_type = None
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # ================= 样式配置 =================
+        self.style = ttk.Style()
+        self.style.theme_use('clam')
+        
+        # 主背景色
+        self.style.configure(".", background="#f0f8ff", foreground="#333333")
+        
+        # 框架样式
+        self.style.configure("TFrame", background="#f0f8ff")
+        self.style.configure("TLabelframe", background="#f0f8ff", bordercolor="#4a90e2", relief=tk.GROOVE)
+        self.style.configure("TLabelframe.Label", background="#f0f8ff", foreground="#2c3e50", font=("微软雅黑", 10, "bold"))
+        
+        # 标签样式
+        self.style.configure("TLabel", background="#f0f8ff", font=("微软雅黑", 10))
+        
+        # 按钮样式
+        self.style.configure("TButton", font=("微软雅黑", 10), padding=8, relief=tk.RAISED)
+        self.style.map("TButton",
+            foreground=[('active', 'white'), ('!active', 'white')],
+            background=[('active', '#45aaf2'), ('!active', '#2d98da')],
+            bordercolor=[('active', '#45aaf2'), ('!active', '#2d98da')]
+        )
+        
+        # 输入框样式
+        self.style.configure("TEntry", fieldbackground="white", font=("微软雅黑", 10), padding=6)
+        
+        # 树形视图样式
+        self.style.configure("Treeview", 
+            background="white", 
+            foreground="#333333",
+            rowheight=25,
+            fieldbackground="white"
+        )
+        self.style.configure("Treeview.Heading", 
+            background="#4a90e2", 
+            foreground="white",
+            font=("微软雅黑", 10, "bold")
+        )
+        self.style.map("Treeview",
+            background=[('selected', '#3498db')],
+            foreground=[('selected', 'white')]
+        )
+
+        # ================= 主界面布局 =================
+        # 标题区域
+        self.header_frame = ttk.Frame(master)
+        self.header_frame.pack(pady=(20, 10), fill=tk.X)
+        
+        # 主标题
+        ttk.Label(
+            self.header_frame,
+            text="文档/图片转PDF工具",
+            font=("微软雅黑", 18, "bold"),
+            foreground="#2c3e50",
+            justify="center"
+        ).pack(pady=(0, 5))
+        
+        # 副标题
+        ttk.Label(
+            self.header_frame,
+            text="支持多种文档和图片格式转换为PDF",
+            font=("微软雅黑", 12),
+            foreground="#7f8c8d",
+            justify="center"
+        ).pack()
+
+        # 文件选择区域
+        self.setup_file_section()
+
+        # 输出路径区域
+        self.setup_output_section()
+
+        # 文件列表区域
+        self.setup_list_section()
+
+        # 操作按钮区域
+        self.setup_action_section()
+
+        # 状态栏
+        self.setup_status_bar()
+
+        # 初始化变量
+        self.output_path = ""
+        self.current_file = ""
+        self.supported_doc_exts = self.generate_supported_extensions(self.SUPPORTED_DOC_FORMATS)
+        self.supported_image_exts = self.generate_supported_extensions(self.SUPPORTED_IMAGE_FORMATS)
+
+        # 开始轮询后台任务状态
+        self.detect_capabilities()
+        self.poll_jobs()
+
+    def detect_capabilities(self):
+        """在后台检测 Tesseract 和办公软件，完成后在界面线程中提示缺少的组件"""
+        job = self.jobs.submit(self.probe_capabilities, "检测OCR和办公软件")
+        self.job_callbacks[job.id] = self.apply_capabilities
+
+    def probe_capabilities(self, job):
+        """在工作线程中执行，检测结果有磁盘缓存，通常不必真正查找"""
+        return ocr.init_tesseract(), self.engine.office_type
+
+    def apply_capabilities(self, result):
+        self.tesseract_path, self.office_type = result
+        if not self.tesseract_path:
+            messagebox.showwarning("OCR警告",
+                "Tesseract OCR未正确配置，文字提取功能受限\n"
+                "请通过'设置OCR路径'按钮手动配置")
+        if not self.office_type:
+            messagebox.showwarning("警告", "未检测到Microsoft Word、WPS或LibreOffice，将仅支持图片、PDF和纯文本/网页/XML文件")
+            self.suggest_office_download()
+    
+    def generate_supported_extensions(self, formats_list):
+        """生成带点的扩展名集合"""
+        return formats.generate_supported_extensions(formats_list)
+
+    def suggest_office_download(self):
+        """未检测到办公软件时，打包版提示下载"""
+        if is_frozen() and messagebox.askyesno(
+            "Office未安装",
+            "需要安装Microsoft Word、WPS或LibreOffice才能转换文档\n"
+            "是否现在访问下载页面？"
+        ):
+            webbrowser.open("https://www.wps.cn/")
+
+    def setup_file_section(self):
+        """文件选择区域"""
+        file_frame = ttk.LabelFrame(
+            self.master,
+            text=" 1. 选择文件 ",
+            padding=(15, 10))
+        file_frame.pack(pady=10, padx=20, fill=tk.X)
+
+        # 文件路径输入框
+        path_frame = ttk.Frame(file_frame)
+        path_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(
+            path_frame,
+            text="文件路径:",
+            font=("微软雅黑", 10, "bold")
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.entry_path = ttk.Entry(path_frame, width=50)
+        self.entry_path.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        
+        # 文件选择按钮
+        button_frame = ttk.Frame(file_frame)
+        button_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(
+            button_frame,
+            text="选择文档",
+            command=self.select_document,
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="选择图片",
+            command=self.select_image,
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="添加文件夹",
+            command=self.select_folder,
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="合并图片",
+            command=self.merge_images,
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            button_frame,
+            text="清空列表",
+            command=self.clear_file_list,
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+    def setup_output_section(self):
+        """输出路径区域"""
+        output_frame = ttk.LabelFrame(
+            self.master,
+            text=" 2. 输出设置 ",
+            padding=(15, 10)
+        )
+        output_frame.pack(pady=10, padx=20, fill=tk.X)
+
+        # 输出路径输入框
+        output_path_frame = ttk.Frame(output_frame)
+        output_path_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(
+            output_path_frame,
+            text="输出目录:",
+            font=("微软雅黑", 10, "bold")
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.entry_output = ttk.Entry(output_path_frame, width=50)
+        self.entry_output.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        
+        # 选择目录按钮
+        ttk.Button(
+            output_path_frame,
+            text="浏览...",
+            command=self.select_output_path,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 可搜索PDF选项
+        self.searchable_var = tk.BooleanVar(value=self.engine.searchable)
+        ttk.Checkbutton(
+            output_frame,
+            text="图片生成可搜索PDF（同时识别文字，附加不可见文字层）",
+            variable=self.searchable_var,
+            command=lambda: setattr(self.engine, "searchable", self.searchable_var.get())
+        ).pack(anchor=tk.W)
+
+        # 自动检测方向和文字种类
+        self.ocr_auto_var = tk.BooleanVar(value=self.engine.ocr_auto)
+        ttk.Checkbutton(
+            output_frame,
+            text="识别前自动检测页面方向和文字种类（扫描件方向不一时使用）",
+            variable=self.ocr_auto_var,
+            command=lambda: setattr(self.engine, "ocr_auto", self.ocr_auto_var.get())
+        ).pack(anchor=tk.W)
+
+        # 增量转换选项
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            output_frame,
+            text="跳过上次转换后没有变化的文件（增量转换）",
+            variable=self.incremental_var,
+            command=self.toggle_incremental
+        ).pack(anchor=tk.W)
+
+        # 输出缓存选项：重复的文件（改名、复制到其他目录）直接复用之前的转换结果，
+        # 与命令行一样默认关闭（需要读取每个文件计算哈希，缓存最多占用 2 GB）
+        self.output_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            output_frame,
+            text="内容相同的文件直接复用之前的转换结果（输出缓存）",
+            variable=self.output_cache_var,
+            command=self.toggle_output_cache
+        ).pack(anchor=tk.W)
+        self.toggle_output_cache()
+
+    def toggle_incremental(self):
+        """开启增量转换时打开清单（所有输出目录共用，记录中包含输出路径）"""
+        if self.incremental_var.get():
+            if self.engine.manifest is None:
+                self.engine.manifest = ConversionManifest(
+                    os.path.join(cache_dir(), "gui-manifest.sqlite3"))
+        else:
+            self.engine.manifest = None
+
+    def toggle_output_cache(self):
+        """开启输出缓存时打开默认的缓存目录"""
+        if self.output_cache_var.get():
+            if self.engine.output_cache is None:
+                self.engine.output_cache = OutputCache()
+        else:
+            self.engine.output_cache = None
+
+    def setup_list_section(self):
+        """文件列表区域"""
+        list_frame = ttk.LabelFrame(
+            self.master,
+            text=" 3. 文件列表 ",
+            padding=(15, 10))
+        list_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
+
+        # 创建带滚动条的树形视图
+        tree_frame = ttk.Frame(list_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 垂直滚动条
+        y_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # 水平滚动条
+        x_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
+        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.tree = ttk.Treeview(
+            tree_frame,
+            columns=("filename", "path", "type", "status", "elapsed", "size"),
+            show="headings",
+            height=10,
+            yscrollcommand=y_scroll.set,
+            xscrollcommand=x_scroll.set
+        )
+        self.tree.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        
+        # 配置滚动条
+        y_scroll.config(command=self.tree.yview)
+        x_scroll.config(command=self.tree.xview)
+        
+        # 设置列
+        self.tree.heading("filename", text="文件名", anchor=tk.W)
+        self.tree.heading("path", text="路径", anchor=tk.W)
+        self.tree.heading("type", text="类型", anchor=tk.W)
+        self.tree.heading("status", text="状态", anchor=tk.W)
+        self.tree.heading("elapsed", text="耗时", anchor=tk.W)
+        self.tree.heading("size", text="输出大小", anchor=tk.W)
+        
+        self.tree.column("filename", width=200, minwidth=150, stretch=tk.YES)
+        self.tree.column("path", width=350, minwidth=200, stretch=tk.YES)
+        self.tree.column("type", width=100, minwidth=80, stretch=tk.NO)
+        self.tree.column("status", width=120, minwidth=100, stretch=tk.NO)
+        self.tree.column("elapsed", width=80, minwidth=60, stretch=tk.NO)
+        self.tree.column("size", width=90, minwidth=70, stretch=tk.NO)
+
+        # 选中任务时在状态栏显示详情（如失败原因）
+        self.tree.bind("<<TreeviewSelect>>", self.show_job_detail)
+
+        # 使用 tkinterdnd2 创建的窗口支持把文件/文件夹直接拖到列表中
+        if getattr(self.master, "TkdndVersion", None):
+            self.tree.drop_target_register("DND_Files")
+            self.tree.dnd_bind("<<Drop>>", self.on_drop)
+
+    def setup_action_section(self):
+        """操作按钮区域"""
+        action_frame = ttk.Frame(self.master)
+        action_frame.pack(pady=20, padx=20, fill=tk.X)
+        
+        # 左对齐按钮
+        left_frame = ttk.Frame(action_frame)
+        left_frame.pack(side=tk.LEFT, expand=True)
+        
+        buttons = [
+            ("项目说明", self.show_project_info),
+            ("查看源码", self.view_source_code),
+            ("联系作者", self.contact_author),
+            ("提取文字", self.extract_text_from_image),
+            ("设置OCR路径", self.set_tesseract_path)  # 新增按钮
+        ]
+        
+        for text, command in buttons:
+            ttk.Button(
+                left_frame,
+                text=text,
+                command=command,
+                width=15
+            ).pack(side=tk.LEFT, padx=5)
+
+        
+        # 右对齐按钮
+        right_frame = ttk.Frame(action_frame)
+        right_frame.pack(side=tk.RIGHT, expand=True)
+        
+        ttk.Button(
+            right_frame,
+            text="支持格式",
+            command=self.show_supported_formats,
+            width=15
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        ttk.Button(
+            right_frame,
+            text="取消任务",
+            command=self.cancel_jobs,
+            width=15
+        ).pack(side=tk.RIGHT, padx=5)
+
+        ttk.Button(
+            right_frame,
+            text="开始转换",
+            command=self.start_conversion,
+            width=15,
+            style="Accent.TButton"
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        # 创建强调按钮样式
+        self.style.configure("Accent.TButton", 
+            background="#2ecc71", 
+            foreground="white"
+        )
+        self.style.map("Accent.TButton",
+            background=[('active', '#27ae60'), ('!active', '#2ecc71')],
+            foreground=[('active', 'white'), ('!active', 'white')]
+        )
+
+    def set_tesseract_path(self):
+        """设置 Tesseract 路径"""
+        path = filedialog.askopenfilename(
+            title="选择 Tesseract 可执行文件",
+            filetypes=[("可执行文件", "*.exe")]
+        )
+        if path:
+            ocr.set_tesseract_path(path)
+            # 记住手动选择的路径，下次启动不再重新检测
+            capabilities.remember("tesseract", path, path)
+            self.tesseract_path = path
+            self.update_status(f"Tesseract 路径已设置为: {path}")
+            messagebox.showinfo("成功", f"Tesseract 路径已设置为: {path}")
+
+    def show_ocr_result(self, text):
+        """显示OCR结果的增强界面"""
+        result_window = tk.Toplevel(self.master)
+        result_window.title("文字提取结果")
+        result_window.geometry("900x600")
+        
+        # 顶部按钮区域
+        btn_frame = ttk.Frame(result_window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Button(
+            btn_frame,
+            text="复制内容",
+            command=lambda: self.master.clipboard_append(text),
+            width=15
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 文字显示区域
+        text_frame = ttk.Frame(result_window)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        scrollbar = ttk.Scrollbar(text_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        text_area = scrolledtext.ScrolledText(
+            text_frame,
+            wrap=tk.WORD,
+            yscrollcommand=scrollbar.set,
+            font=("微软雅黑", 10),
+            padx=10,
+            pady=10
+        )
+        text_area.pack(fill=tk.BOTH, expand=True)
+        text_area.insert(tk.END, text)
+        text_area.config(state=tk.DISABLED)
+        
+        scrollbar.config(command=text_area.yview)
+
+    def setup_status_bar(self):
+        """状态栏"""
+        status_frame = ttk.Frame(self.master, relief=tk.SUNKEN)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        
+        self.status_label = ttk.Label(
+            status_frame,
+            text="就绪",
+            font=("微软雅黑", 9),
+            foreground="#7f8c8d",
+            anchor=tk.W
+        )
+        self.status_label.pack(fill=tk.X, padx=5)
+
+    def show_project_info(self):
+        """显示项目说明"""
+        messagebox.showinfo(
+            "项目说明",
+            "📚 文档/图片转PDF工具\n\n"
+            "🔹 项目诞生原因：\n"
+            " 由一个懒癌晚期的大学生因为受不了某些软件广告式的转换界面\n"
+            " 和拿着开源收费的图片提取文字功能\n"
+            " 而打造的一款极简工具\n"
+            "🔹 主要功能：\n"
+            "• 支持Word等多种文档格式转PDF\n"
+            "• 支持JPG、PNG等常见图片格式转PDF\n"
+            "• 支持从图片中提取文字\n"
+            "• 简洁直观的用户界面\n\n"
+            "🔹 版本: 1.1.0\n"
+            "© 2025 文档转换工具"
+        )
+
+    def view_source_code(self):
+        """查看源码"""
+        result = messagebox.askyesno(
+            "查看源码",
+            "即将跳转到GitHub查看项目版本1.0.0的源码，是否继续？"
+        )
+        if result:
+            try:
+                webbrowser.open("https://github.com/cxywh/To-pdf/blob/main/docxtopdf.py")
+            except Exception as e:
+                messagebox.showerror("错误", f"无法打开网页: {str(e)}")
+
+    def contact_author(self):
+        """联系作者"""
+        contact_window = tk.Toplevel(self.master)
+        contact_window.title("联系作者")
+        contact_window.geometry("300x250")
+        contact_window.resizable(False, False)
+        
+        tk.Label(
+            contact_window,
+            text="📧 联系方式",
+            font=("微软雅黑", 12, "bold"),
+            pady=10
+        ).pack()
+        
+        tk.Label(
+            contact_window,
+            text="QQ: 3864095082",
+            font=("微软雅黑", 11),
+            pady=5
+        ).pack()
+        
+        tk.Label(
+            contact_window,
+            text="瓦:马枪手胡图图#92533",
+            font=("微软雅黑", 11),
+            pady=5
+        ).pack()
+        
+        ttk.Button(
+            contact_window,
+            text="关闭",
+            command=contact_window.destroy,
+            width=10
+        ).pack(pady=10)
+
+    def on_close(self):
+        """关闭窗口前取消未完成的任务，并退出仍在运行的办公软件实例"""
+        unfinished = self.jobs.unfinished()
+        if unfinished and not messagebox.askyesno(
+            "确认退出",
+            f"还有 {len(unfinished)} 个任务未完成，退出将取消这些任务。\n确定要退出吗？"
+        ):
+            return
+        # 正在转换的文件要到当前步骤结束才停止，等它们结束后才能关闭清单和缓存，
+        # 否则任务会写入已经关闭的数据库。等待在后台线程中进行，期间隐藏窗口
+        self.closing = True
+        self.master.withdraw()
+        waiter = threading.Thread(target=self.jobs.shutdown, daemon=True)
+        waiter.start()
+        self.finish_close(waiter)
+
+    def finish_close(self, waiter):
+        """所有任务结束后退出办公软件实例，关闭清单和缓存，然后销毁窗口"""
+        if waiter.is_alive():
+            self.master.after(self.POLL_INTERVAL, self.finish_close, waiter)
+            return
+        self.engine.close()
+        if self.engine.manifest is not None:
+            self.engine.manifest.close()
+        if self.engine.output_cache is not None:
+            self.engine.output_cache.close()
+        self.master.destroy()
+
+    def update_status(self, message):
+        """更新状态栏信息"""
+        self.status_label.config(text=message)
+
+    def submit_job(self, func, description, item, *args, on_done=None):
+        """提交后台任务 func(job, *args) 并与列表中的行关联，on_done(结果) 在任务成功后于界面线程中调用"""
+        job = self.jobs.submit(func, description, *args)
+        self.job_items[job.id] = item
+        self.item_jobs[item] = job.id
+        self.tree.set(item, "status", job.status_label)
+        if on_done is not None:
+            self.job_callbacks[job.id] = on_done
+        return job
+
+    def add_task_row(self, file_path, file_type):
+        """为合并、文字提取等单独的任务添加一行"""
+        return self.tree.insert("", "end", values=(
+            os.path.basename(file_path), file_path, file_type, "", "", ""))
+
+    @staticmethod
+    def format_size(size):
+        for unit in ("B", "KB", "MB"):
+            if size < 1024:
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+            size /= 1024.0
+        return f"{size:.1f} GB"
+
+    def poll_jobs(self):
+        """定时取出状态有变化的任务并刷新界面（只在界面线程中操作控件）"""
+        if self.closing:
+            # 退出时取消的任务不再刷新界面，也不弹出汇总
+            return
+        for job in self.jobs.poll():
+            item = self.job_items.get(job.id)
+            if item is not None and self.tree.exists(item):
+                if getattr(job.result, "skipped", False):
+                    status = "未变化，已跳过"
+                elif getattr(job.result, "cached", False):
+                    status = "已复用相同文件的结果"
+                else:
+                    status = job.status_label
+                self.tree.set(item, "status", status)
+                if job.finished:
+                    self.tree.set(item, "elapsed", f"{job.elapsed:.1f}s")
+                    output = getattr(job.result, "output", None)
+                    if output and os.path.exists(output):
+                        self.tree.set(item, "size", self.format_size(os.path.getsize(output)))
+            if job.finished:
+                self.release_outputs(job)
+            if job.status == DONE:
+                self.update_status(f"{job.description}完成 ({job.elapsed:.1f}s)")
+                callback = self.job_callbacks.pop(job.id, None)
+                if callback is not None:
+                    callback(job.result)
+            elif job.status == FAILED:
+                self.job_callbacks.pop(job.id, None)
+                self.update_status(f"{job.description}失败: {job.error}")
+            elif job.status == CANCELLED:
+                self.job_callbacks.pop(job.id, None)
+                self.update_status(f"{job.description}已取消")
+        if self.batch and all(job.finished for job in self.batch):
+            self.finish_batch()
+        self.master.after(self.POLL_INTERVAL, self.poll_jobs)
+
+    def release_outputs(self, job):
+        """任务结束后释放它占用的输出文件名，之后的转换可以再使用"""
+        for key in [key for key, owner in self.output_claims.items() if owner == job.id]:
+            del self.output_claims[key]
+
+    def finish_batch(self):
+        """一批转换全部结束后汇总一次结果（而不是每个文件弹一次窗口）"""
+        batch, self.batch = self.batch, []
+        skipped = sum(job.status == DONE and getattr(job.result, "skipped", False) for job in batch)
+        succeeded = sum(job.status == DONE for job in batch) - skipped
+        failed = sum(job.status == FAILED for job in batch)
+        cancelled = sum(job.status == CANCELLED for job in batch)
+        summary = f"转换完成: 成功 {succeeded} 个, 失败 {failed} 个"
+        if skipped:
+            summary += f", 跳过 {skipped} 个（未变化）"
+        if cancelled:
+            summary += f", 取消 {cancelled} 个"
+        self.update_status(summary)
+        if failed:
+            messagebox.showwarning("完成", f"{summary}\n\n选中失败的文件可在状态栏查看原因")
+        else:
+            messagebox.showinfo("完成", f"✅ {summary}")
+
+    def job_for_item(self, item):
+        job_id = self.item_jobs.get(item)
+        return self.jobs.get(job_id) if job_id is not None else None
+
+    def show_job_detail(self, event=None):
+        """在状态栏显示选中任务的状态"""
+        for item in self.tree.selection():
+            job = self.job_for_item(item)
+            if job is None:
+                continue
+            if job.error:
+                self.update_status(f"{job.description}: {job.error}")
+            elif job.message:
+                self.update_status(f"{job.description}: {job.status_label} ({job.message})")
+            else:
+                self.update_status(f"{job.description}: {job.status_label}")
+
+    def cancel_jobs(self):
+        """取消选中的任务；没有选中任务时取消全部未完成的任务"""
+        jobs = [job for job in map(self.job_for_item, self.tree.selection()) if job is not None]
+        if jobs:
+            cancelled = sum(self.jobs.cancel(job) for job in jobs)
+        else:
+            unfinished = self.jobs.unfinished()
+            if not unfinished:
+                self.update_status("没有正在进行的任务")
+                return
+            if not messagebox.askyesno("取消任务", f"确定取消全部 {len(unfinished)} 个未完成的任务吗？"):
+                return
+            cancelled = self.jobs.cancel_all()
+        self.update_status(f"已请求取消 {cancelled} 个任务（正在转换的文件会在当前步骤结束后停止）")
+
+    def add_files(self, paths, base_dir=None):
+        """把文件加入待转换列表（不支持的格式和列表中已有的文件跳过），返回加入的数量"""
+        listed = {os.path.normcase(os.path.abspath(path)) for path, _ in self.list_files.values()}
+        added = 0
+        for path in paths:
+            kind = formats.file_kind(path)
+            key = os.path.normcase(os.path.abspath(path))
+            if kind is None or key in listed:
+                continue
+            item = self.tree.insert("", "end", values=(
+                os.path.basename(path), path, self.KIND_LABELS[kind], "待转换", "", ""))
+            self.list_files[item] = (path, base_dir)
+            listed.add(key)
+            self.current_file = path
+            added += 1
+        if added:
+            self.entry_path.delete(0, tk.END)
+            self.entry_path.insert(0, self.current_file if added == 1 else f"已添加 {added} 个文件")
+        return added
+
+    def select_document(self):
+        """选择文档文件（可多选）"""
+        filetypes = []
+        for desc, ext in self.SUPPORTED_DOC_FORMATS:
+            if ext == '*.*':
+                filetypes.append((desc, ext))
+            else:
+                ext_tuple = tuple(ext.split(';'))
+                filetypes.append((desc, ext_tuple))
+        
+        paths = filedialog.askopenfilenames(
+            title="选择要转换的文档文件（可多选）",
+            filetypes=filetypes,
+            defaultextension="*.*"
+        )
+        if paths:
+            added = self.add_files(paths)
+            self.update_status(f"已添加 {added} 个文档")
+
+    def select_image(self):
+        """选择图片文件（可多选）"""
+        filetypes = self.image_filetypes()
+        
+        paths = filedialog.askopenfilenames(
+            title="选择要转换的图片文件（可多选）",
+            filetypes=filetypes,
+            defaultextension="*.*"
+        )
+        if not paths:
+            return
+
+        # 验证图片文件是否有效（只读文件头），无效的图片汇总提示一次
+        valid, invalid = [], []
+        for path in paths:
+            try:
+                self.engine.validate_image(path)
+                valid.append(path)
+            except ConversionError as e:
+                invalid.append(f"{os.path.basename(path)}: {e}")
+        added = self.add_files(valid)
+        self.update_status(f"已添加 {added} 张图片")
+        if invalid:
+            messagebox.showerror("错误", "以下图片无效，已跳过：\n" + "\n".join(invalid[:20]))
+
+    def select_folder(self):
+        """添加文件夹中所有支持的文件（包括子文件夹，输出时保留目录结构）"""
+        folder = filedialog.askdirectory(title="选择要转换的文件夹")
+        if folder:
+            self.add_folder(folder)
+
+    def add_folder(self, folder):
+        added = self.add_files((path for path, _ in iter_inputs([folder])), base_dir=folder)
+        self.update_status(f"已从 {os.path.basename(folder) or folder} 添加 {added} 个文件")
+        return added
+
+    def on_drop(self, event):
+        """拖放文件/文件夹到列表"""
+        added = 0
+        for path in self.master.tk.splitlist(event.data):
+            if os.path.isdir(path):
+                added += self.add_folder(path)
+            else:
+                added += self.add_files([path])
+        self.update_status(f"已添加 {added} 个文件")
+        return event.action
+
+    def clear_file_list(self):
+        """清空列表中待转换和已结束的行（未完成的任务保留）"""
+        for item in self.tree.get_children():
+            job = self.job_for_item(item)
+            if job is not None and not job.finished:
+                continue
+            self.tree.delete(item)
+            self.list_files.pop(item, None)
+            job_id = self.item_jobs.pop(item, None)
+            if job_id is not None:
+                self.job_items.pop(job_id, None)
+        self.current_file = ""
+        self.entry_path.delete(0, tk.END)
+        self.update_status("就绪 - 等待选择新文件")
+
+    def image_filetypes(self):
+        """图片选择对话框的文件类型列表"""
+        filetypes = [(desc, tuple(ext.split(';'))) for desc, ext in self.SUPPORTED_IMAGE_FORMATS]
+        all_image_exts = []
+        for _, ext in self.SUPPORTED_IMAGE_FORMATS:
+            all_image_exts.extend(ext.split(';'))
+        filetypes.insert(0, ("所有支持的图片格式", tuple(all_image_exts)))
+        return filetypes
+
+    def merge_images(self):
+        """把多张图片按选择顺序合并为一个PDF"""
+        paths = filedialog.askopenfilenames(
+            title="选择要合并的图片（按选择顺序排列页面）",
+            filetypes=self.image_filetypes()
+        )
+        if not paths:
+            return
+
+        pdf_path = filedialog.asksaveasfilename(
+            title="保存合并后的PDF",
+            initialdir=self.output_path or os.path.dirname(paths[0]),
+            initialfile=os.path.splitext(os.path.basename(paths[0]))[0] + "_合并.pdf",
+            defaultextension=".pdf",
+            filetypes=[("PDF 文档", "*.pdf")]
+        )
+        if not pdf_path:
+            return
+
+        def merge(job):
+            result = self.engine.merge_images(paths, pdf_path, progress=job.step)
+            if job.cancel_requested:
+                raise JobCancelled()
+            if not result.ok:
+                raise ConversionError(result.error)
+            return result
+
+        self.submit_job(merge, f"合并 {len(paths)} 张图片", self.add_task_row(pdf_path, "合并PDF"))
+        self.update_status(f"已加入队列: 合并 {len(paths)} 张图片到 {os.path.basename(pdf_path)}")
+
+    def select_output_path(self):
+        """选择输出路径"""
+        path = filedialog.askdirectory(title="选择输出目录")
+        if path:
+            self.output_path = path
+            self.entry_output.delete(0, tk.END)
+            self.entry_output.insert(0, path)
+            self.update_status(f"输出目录设置为: {path}")
+
+    def show_supported_formats(self):
+        """显示支持格式"""
+        doc_formats = "\n".join([
+            f"• {desc} ({ext.replace(';', ', ')})"
+            for desc, ext in self.SUPPORTED_DOC_FORMATS
+        ])
+        image_formats = "\n".join([
+            f"• {desc} ({ext.replace(';', ', ')})"
+            for desc, ext in self.SUPPORTED_IMAGE_FORMATS
+        ])
+        
+        messagebox.showinfo(
+            "支持格式",
+            f"📄 文档支持格式：\n{doc_formats}\n\n"
+            f"🖼️ 图片支持格式：\n{image_formats}\n\n"
+            f"💻 办公软件: {backend_label(self.office_type)}\n"
+            "ℹ️ 注意：图片转换使用PIL库，文档转换使用Office组件"
+        )
+
+    def is_valid_image(self, file_path):
+        """验证图片文件是否有效"""
+        try:
+            self.engine.validate_image(file_path)
+            return True
+        except ConversionError as e:
+            messagebox.showerror("错误", str(e))
+            self.update_status(f"错误: {str(e).split(':')[0]}")
+            return False
+
+    def convert_image_to_pdf(self, image_path, output_path):
+        """将图片转换为PDF"""
+        self.update_status(f"正在转换图片到PDF: {os.path.basename(image_path)}...")
+        try:
+            self.engine.convert_image(image_path, output_path)
+            self.update_status(f"图片转换成功: {os.path.basename(image_path)}")
+            return True
+        except ConversionError as e:
+            messagebox.showerror("错误", str(e))
+            self.update_status(f"错误: {str(e)}")
+            return False
+
+    def extract_text_from_image(self):
+        """从图片中提取文字（列表中选中的图片，未选中时为最近添加的文件）"""
+        image_path = self.current_file
+        for item in self.tree.selection():
+            path = self.tree.set(item, "path")
+            if formats.file_kind(path) == formats.KIND_IMAGE:
+                image_path = path
+                break
+        if not image_path or formats.file_kind(image_path) != formats.KIND_IMAGE:
+            messagebox.showwarning("警告", "请先选择图片文件！")
+            self.update_status("警告: 未选择文件")
+            return
+
+        # 验证图片是否有效
+        if not self.is_valid_image(image_path):
+            return
+
+        def show_text(text):
+            if not text.strip():
+                messagebox.showinfo("提示", "未检测到文字！")
+                self.update_status("提示: 未检测到文字")
+                return
+            # 显示提取结果
+            self.show_ocr_result(text)
+
+        filename = os.path.basename(image_path)
+        self.submit_job(lambda job: self.engine.extract_text(image_path), f"提取文字 {filename}",
+                        self.add_task_row(image_path, "文字提取"), on_done=show_text)
+        self.update_status(f"已加入队列: 从图片中提取文字 {filename}")
+
+    def convert_job(self, job, source, output_dir, base_dir, name):
+        """后台任务：转换列表中的一个文件，name 为 start_conversion 分配的输出文件名"""
+        job.check_cancelled()
+        result = self.engine.convert_file(source, output_dir, base_dir, name=name)
+        if not result.ok:
+            raise ConversionError(result.error)
+        return result
+
+    def start_conversion(self):
+        """开始转换：把列表中所有待转换的文件加入任务队列"""
+        items = [item for item in self.tree.get_children() if item in self.list_files]
+        if not items:
+            messagebox.showwarning("警告", "请先选择要转换的文件！")
+            self.update_status("警告: 未选择文件")
+            return
+        if not self.output_path:
+            messagebox.showwarning("警告", "请先选择输出目录！")
+            self.update_status("警告: 未选择输出目录")
+            return
+
+        # 同名不同扩展名的文件（a.jpg、a.png）会同时转换，输出文件名不能相同，
+        # 包括之前提交、仍在排队或转换中的任务已经占用的文件名
+        files = [self.list_files.pop(item) for item in items]
+        named = self.engine.assign_names(files, self.output_path, claimed=self.output_claims)
+        for item, (source, base_dir, name) in zip(items, named):
+            job = self.submit_job(self.convert_job, f"转换 {os.path.basename(source)}", item,
+                                  source, self.output_path, base_dir, name)
+            self.batch.append(job)
+            # 占用者改为任务：同一个文件在任务结束前再次提交时也使用另一个文件名
+            output = self.engine.output_path_for(source, self.output_path, base_dir, name=name)
+            self.output_claims[path_key(output)] = job.id
+
+        # 提交后即可继续添加文件，不必等待转换完成
+        self.current_file = ""
+        self.entry_path.delete(0, tk.END)
+        self.update_status(f"已加入队列: {len(items)} 个文件，可以继续添加其他文件")
+
+if __name__ == "__main__":
+    # 打包后的程序需要支持多进程并行转换
+    multiprocessing.freeze_support()
+    # 带参数运行时进入命令行批量模式
+    if len(sys.argv) > 1:
+        from topdf.cli import main
+        sys.exit(main())
+    try:
+        # 可选依赖：安装了 tkinterdnd2 时支持拖放文件
+        from tkinterdnd2 import TkinterDnD
+        root = TkinterDnD.Tk()
+    except (ImportError, RuntimeError, tk.TclError):
+        root = tk.Tk()
+    app = DocToPdfConverter(root)
+    root.mainloop()
@@ -0,0 +1,88 @@
+"""测试共用的夹具：只在测试中注册的假文档后端"""
+import threading
+
+import pytest
+
+from topdf import backends
+from topdf.backends import DocumentBackend, register_backend
+
+# 测试用的最小PDF
+FAKE_PDF = b"%PDF-1.4\n%fake\ntrailer\n<< >>\n%%EOF\n"
+
+
+class FakeBackend(DocumentBackend):
+    """不启动办公软件的后端，按文档内容模拟转换结果
+
+    文档内容为 "hang" 时一直卡住直到被 terminate，为 "error" 时抛出非 ConversionError
+    的异常（模拟 COM/UNO 错误），其他内容写出一个最小的PDF。hanging_starts 为接下来
+    启动时卡住（直到被 terminate）的实例数。
+    """
+
+    name = "fake"
+    label = "Fake"
+    # 创建过的全部实例，测试中用来检查回收情况
+    instances = []
+    hanging_starts = 0
+    _instances_lock = threading.Lock()
+
+    def __init__(self):
+        self.started = False
+        self.stopped = False
+        self.terminated = threading.Event()
+        self.converted = []
+        with self._instances_lock:
+            self.instances.append(self)
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def start(self):
+        with self._instances_lock:
+            hang = FakeBackend.hanging_starts > 0
+            FakeBackend.hanging_starts -= hang
+        if hang:
+            self.terminated.wait(30)
+            raise RuntimeError("办公软件启动失败")
+        self.started = True
+
+    def convert(self, doc_path, pdf_path):
+        with open(doc_path, encoding="utf-8") as f:
+            content = f.read().strip()
+        if content == "hang":
+            self.terminated.wait(30)
+            raise RuntimeError("办公软件进程已被结束")
+        if content == "error":
+            raise RuntimeError("RPC 服务器不可用")
+        with open(pdf_path, "wb") as f:
+            f.write(FAKE_PDF)
+        self.converted.append(doc_path)
+
+    def stop(self):
+        self.stopped = True
+
+    def terminate(self):
+        self.terminated.set()
+
+
+@pytest.fixture
+def fake_backend():
+    """注册假后端，测试结束后从注册表中移除"""
+    FakeBackend.instances = []
+    FakeBackend.hanging_starts = 0
+    register_backend(FakeBackend)
+    try:
+        yield FakeBackend
+    finally:
+        backends._BACKENDS.pop(FakeBackend.name, None)
+
+
+@pytest.fixture
+def make_doc(tmp_path):
+    """在临时目录中创建内容为 content 的 .docx 文件（假后端只看文字内容）"""
+    def make(name, content="ok"):
+        path = tmp_path / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    return make
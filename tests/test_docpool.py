@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from topdf.backends import create_backend
+from topdf.docpool import DocumentWorkerPool
+from topdf.engine import ConversionEngine
+from topdf.errors import ConversionError
+
+
+def _pool(docs_per_worker=200, timeout=300):
+    return DocumentWorkerPool(lambda: create_backend("fake"), size=1,
+                              docs_per_worker=docs_per_worker, timeout=timeout)
+
+
+def test_worker_recycled_after_docs_per_worker(fake_backend, make_doc, tmp_path):
+    with _pool(docs_per_worker=2) as pool:
+        for i in range(5):
+            pool.convert(make_doc(f"{i}.docx"), str(tmp_path / f"{i}.pdf"))
+    assert [len(backend.converted) for backend in fake_backend.instances] == [2, 2, 1]
+    assert all(backend.started and backend.stopped for backend in fake_backend.instances)
+
+
+def test_hung_conversion_is_killed_and_reported(fake_backend, make_doc, tmp_path):
+    with _pool(timeout=0.3) as pool:
+        future = pool.submit(make_doc("hang.docx", "hang"), str(tmp_path / "hang.pdf"))
+        with pytest.raises(ConversionError, match="超时"):
+            future.result(timeout=10)
+        hung = fake_backend.instances[0]
+        assert hung.terminated.is_set()
+        # 卡死的实例被替换，后续文档由新实例转换
+        output = str(tmp_path / "next.pdf")
+        assert pool.convert(make_doc("next.docx"), output) == output
+    assert len(fake_backend.instances) == 2
+    assert fake_backend.instances[1].converted
+
+
+def test_pool_continues_after_worker_error(fake_backend, make_doc, tmp_path):
+    with _pool() as pool:
+        with pytest.raises(ConversionError, match="文档转换失败"):
+            pool.convert(make_doc("bad.docx", "error"), str(tmp_path / "bad.pdf"))
+        output = str(tmp_path / "good.pdf")
+        assert pool.convert(make_doc("good.docx"), output) == output
+    failed, fresh = fake_backend.instances
+    # 出错后实例状态不可信，已停止并换成新实例
+    assert failed.stopped and not failed.converted
+    assert fresh.converted
+
+
+def test_engine_converts_documents_with_fake_backend(fake_backend, make_doc, tmp_path):
+    out = str(tmp_path / "out")
+    sources = [make_doc("a.docx"), make_doc("b.docx", "error"), make_doc("c.docx")]
+    with ConversionEngine(output_dir=out, office_type="fake", docs_per_worker=1) as engine:
+        results = {os.path.basename(r.source): r for r in engine.convert_many(sources)}
+    assert results["a.docx"].ok and results["c.docx"].ok
+    assert not results["b.docx"].ok
+    assert sorted(os.listdir(out)) == ["a.pdf", "c.pdf"]
+
+
+def test_hang_during_backend_start_is_killed(fake_backend, make_doc, tmp_path):
+    fake_backend.hanging_starts = 1
+    with _pool(timeout=0.3) as pool:
+        future = pool.submit(make_doc("first.docx"), str(tmp_path / "first.pdf"))
+        with pytest.raises(ConversionError, match="超时"):
+            future.result(timeout=10)
+        stuck = fake_backend.instances[0]
+        assert stuck.terminated.is_set() and not stuck.started
+        output = str(tmp_path / "next.pdf")
+        assert pool.convert(make_doc("next.docx"), output) == output
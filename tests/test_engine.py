@@ -0,0 +1,65 @@
+import os
+
+from PIL import Image
+
+from topdf.engine import ConversionEngine
+
+
+def _make_inputs(directory):
+    os.makedirs(directory)
+    Image.new("RGB", (120, 80), (255, 0, 0)).save(os.path.join(directory, "a.png"))
+    Image.new("RGB", (80, 120), (0, 0, 255)).save(os.path.join(directory, "a.tiff"))
+    Image.new("L", (60, 60), 128).save(os.path.join(directory, "a.bmp"))
+
+
+def _convert(tmp_path, workers):
+    src, out = str(tmp_path / "in"), str(tmp_path / "out")
+    _make_inputs(src)
+    with ConversionEngine(output_dir=out, office_type=None) as engine:
+        results = list(engine.convert_many([src], workers=workers))
+    return results, out
+
+
+def _check_outputs(results, out):
+    assert all(result.ok for result in results), [result.error for result in results]
+    outputs = {os.path.basename(result.source): result.output for result in results}
+    # 先出现的沿用 a.pdf，后面同名的保留源文件扩展名
+    assert outputs == {
+        "a.bmp": os.path.join(out, "a.pdf"),
+        "a.png": os.path.join(out, "a.png.pdf"),
+        "a.tiff": os.path.join(out, "a.tiff.pdf"),
+    }
+    contents = set()
+    for output in outputs.values():
+        with open(output, "rb") as f:
+            data = f.read()
+        assert data.startswith(b"%PDF-") and data.rstrip().endswith(b"%%EOF")
+        contents.add(data)
+    assert len(contents) == 3
+    assert not [name for name in os.listdir(out) if ".part" in name]
+
+
+def test_same_stem_inputs_get_distinct_outputs(tmp_path):
+    _check_outputs(*_convert(tmp_path, workers=1))
+
+
+def test_same_stem_inputs_in_parallel(tmp_path):
+    _check_outputs(*_convert(tmp_path, workers=2))
+
+
+def test_claimed_names_persist_across_batches(tmp_path):
+    out = str(tmp_path / "out")
+    engine = ConversionEngine(output_dir=out, office_type=None)
+    jpg, png = str(tmp_path / "a.jpg"), str(tmp_path / "a.png")
+    claimed = {}
+
+    def names(*sources):
+        items = [(source, None) for source in sources]
+        return [name for _, _, name in engine.assign_names(items, out, claimed=claimed)]
+
+    assert names(jpg) == ["a"]
+    # 之后的批次不会再分到 a.pdf，同一个文件再次转换时沿用原来的名字
+    assert names(png) == ["a.png"]
+    assert names(png, jpg) == ["a.png", "a"]
+    # 同一批中重复出现的文件也不共用输出
+    assert names(jpg, jpg) == ["a", "a.jpg"]
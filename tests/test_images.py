@@ -0,0 +1,97 @@
+import os
+import re
+
+import pytest
+from PIL import Image
+
+from topdf.errors import ConversionError
+from topdf.images import ImageEncodeOptions, convert_image_to_pdf, merge_images_to_pdf
+
+
+def _embedded_sizes(pdf_path):
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    sizes = re.findall(rb"/Width (\d+) /Height (\d+)", data)
+    boxes = re.findall(rb"/MediaBox \[0 0 ([\d.]+) ([\d.]+)\]", data)
+    return ([(int(w), int(h)) for w, h in sizes],
+            [(round(float(w)), round(float(h))) for w, h in boxes])
+
+
+def _scan(path, fmt, dpi=600, size=(1200, 800)):
+    img = Image.new("RGB", size, (250, 250, 240))
+    img.paste((20, 20, 20), (100, 100, 1100, 140))
+    img.save(path, fmt, dpi=(dpi, dpi))
+
+
+def test_max_dpi_downsamples_at_default_page_resolution(tmp_path):
+    for fmt, ext in (("PNG", ".png"), ("JPEG", ".jpg")):
+        source = str(tmp_path / f"scan{ext}")
+        _scan(source, fmt)
+        plain, limited = str(tmp_path / f"plain{ext}.pdf"), str(tmp_path / f"max{ext}.pdf")
+        convert_image_to_pdf(source, plain, ImageEncodeOptions())
+        convert_image_to_pdf(source, limited, ImageEncodeOptions(max_dpi=300))
+
+        plain_sizes, plain_boxes = _embedded_sizes(plain)
+        sizes, boxes = _embedded_sizes(limited)
+        assert plain_sizes == [(1200, 800)]
+        # 600 DPI 的扫描件降到 300 DPI，默认的页面分辨率（--dpi 100）不影响判断
+        assert sizes == [(600, 400)]
+        # 页面尺寸不变：1200 像素 / 100 DPI = 12 英寸
+        assert boxes == plain_boxes == [(864, 576)]
+
+
+def test_max_dpi_without_native_dpi_uses_page_resolution(tmp_path):
+    source = str(tmp_path / "plain.png")
+    Image.new("L", (1000, 500), 200).save(source)
+    output = str(tmp_path / "plain.pdf")
+    convert_image_to_pdf(source, output, ImageEncodeOptions(resolution=200, max_dpi=100))
+    assert _embedded_sizes(output)[0] == [(500, 250)]
+
+
+def _merge_inputs(directory):
+    first = str(directory / "first.png")
+    Image.new("RGB", (100, 50), (255, 0, 0)).save(first)
+    frames = str(directory / "frames.tiff")
+    Image.new("L", (40, 60), 0).save(frames, save_all=True, append_images=[
+        Image.new("L", (70, 30), 255), Image.new("RGB", (20, 20), (0, 0, 255))])
+    last = str(directory / "last.bmp")
+    Image.new("RGB", (30, 90), (0, 255, 0)).save(last)
+    return [first, frames, last]
+
+
+def test_merge_keeps_order_and_every_frame(tmp_path):
+    output = str(tmp_path / "merged.pdf")
+    progress = []
+    pages = merge_images_to_pdf(_merge_inputs(tmp_path), output,
+                                progress=lambda done, total: progress.append((done, total)))
+    assert pages == 5
+    sizes, _ = _embedded_sizes(output)
+    # 图片按给出的顺序排列，多帧TIFF的每一帧各占一页
+    assert sizes == [(100, 50), (40, 60), (70, 30), (20, 20), (30, 90)]
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_merge_failure_leaves_no_partial_output(tmp_path):
+    paths = _merge_inputs(tmp_path)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"\x89PNG\r\n\x1a\n not really a png")
+    output = tmp_path / "merged.pdf"
+    output.write_bytes(b"previous")
+    with pytest.raises(ConversionError, match="broken.png"):
+        merge_images_to_pdf(paths[:1] + [str(broken)] + paths[1:], str(output))
+    # 中途失败时原来的输出不变，也不留下临时文件
+    assert output.read_bytes() == b"previous"
+    assert not [name for name in os.listdir(tmp_path) if ".part" in name]
+
+
+def test_merge_can_be_aborted_from_progress(tmp_path):
+    output = tmp_path / "merged.pdf"
+
+    def progress(done, total):
+        if done == 2:
+            raise ConversionError("已取消")
+
+    with pytest.raises(ConversionError, match="已取消"):
+        merge_images_to_pdf(_merge_inputs(tmp_path), str(output), progress=progress)
+    assert not output.exists()
+    assert not [name for name in os.listdir(tmp_path) if ".part" in name]
@@ -0,0 +1,33 @@
+import threading
+
+from topdf.jobs import CANCELLED, DONE, JobQueue
+
+
+def test_cancel_racing_with_job_start(monkeypatch):
+    release = threading.Event()
+    with JobQueue(workers=1) as jobs:
+        first = jobs.submit(lambda job: release.wait(10), "阻塞")
+        second = jobs.submit(lambda job: "不应执行", "被取消")
+        # 模拟 cancel() 时任务刚被线程池取出：future.cancel() 失败
+        monkeypatch.setattr(second.future, "cancel", lambda: False)
+        assert jobs.cancel(second)
+        release.set()
+        second.future.result(10)
+        first.future.result(10)
+
+        assert first.status == DONE
+        assert second.status == CANCELLED
+        assert second.error
+        assert second.result is None
+        assert jobs.unfinished() == []
+        assert second in jobs.poll()
+
+
+def test_cancel_pending_job():
+    release = threading.Event()
+    with JobQueue(workers=1) as jobs:
+        jobs.submit(lambda job: release.wait(10))
+        pending = jobs.submit(lambda job: None)
+        assert jobs.cancel(pending)
+        assert pending.status == CANCELLED
+        release.set()
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from PIL import Image
+
+from topdf.engine import ConversionEngine
+from topdf.images import ImageEncodeOptions
+from topdf.manifest import ConversionManifest
+
+
+@pytest.fixture
+def incremental(tmp_path):
+    """带清单的引擎，以及返回一次转换中各文件状态的函数"""
+    src, out = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    Image.new("RGB", (60, 40), (255, 0, 0)).save(src / "a.png")
+    Image.new("RGB", (40, 60), (0, 0, 255)).save(src / "b.png")
+    manifest = ConversionManifest(str(tmp_path / "manifest.sqlite3"))
+    engine = ConversionEngine(output_dir=str(out), office_type=None, manifest=manifest)
+
+    def run():
+        results = list(engine.convert_many([str(src)]))
+        assert all(result.ok for result in results), [result.error for result in results]
+        return {os.path.basename(result.source): "skipped" if result.skipped else "converted"
+                for result in results}
+
+    yield engine, src, out, run
+    engine.close()
+    manifest.close()
+
+
+def test_unchanged_files_are_skipped(incremental):
+    engine, src, out, run = incremental
+    assert run() == {"a.png": "converted", "b.png": "converted"}
+    assert run() == {"a.png": "skipped", "b.png": "skipped"}
+    assert len(engine.manifest) == 2
+
+
+def test_touched_but_identical_source_is_skipped(incremental):
+    engine, src, out, run = incremental
+    run()
+    stat = os.stat(src / "a.png")
+    os.utime(src / "a.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    # 修改时间变了但内容相同：按哈希确认后跳过，并更新记录的修改时间
+    assert run()["a.png"] == "skipped"
+    assert engine.manifest.is_current(str(src / "a.png"), str(out / "a.pdf"),
+                                      engine.options_key("image"))
+
+
+def test_changed_content_options_or_output_are_refreshed(incremental):
+    engine, src, out, run = incremental
+    run()
+    Image.new("RGB", (60, 40), (0, 255, 0)).save(src / "a.png")
+    assert run() == {"a.png": "converted", "b.png": "skipped"}
+
+    # 输出被删除或改动过
+    os.remove(out / "a.pdf")
+    with open(out / "b.pdf", "ab") as f:
+        f.write(b"\n% edited")
+    assert run() == {"a.png": "converted", "b.png": "converted"}
+
+    # 转换参数变化
+    engine.image_options = ImageEncodeOptions(quality=50)
+    assert run() == {"a.png": "converted", "b.png": "converted"}
+    assert run() == {"a.png": "skipped", "b.png": "skipped"}
+
+
+def test_forget_forces_reconversion(incremental):
+    engine, src, out, run = incremental
+    run()
+    engine.manifest.forget(str(src / "b.png"))
+    assert run() == {"a.png": "skipped", "b.png": "converted"}
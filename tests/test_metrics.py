@@ -0,0 +1,77 @@
+import os
+import threading
+
+from PIL import Image
+
+from topdf import metrics, pdfs
+
+
+def test_prometheus_file_written_concurrently(tmp_path):
+    path = str(tmp_path / "topdf.prom")
+    # interval=0：每个事件都到期，多个线程同时写文件
+    sink = metrics.PrometheusSink(path, interval=0)
+    threads_count, events_per_thread = 8, 200
+    start = threading.Barrier(threads_count)
+
+    def emit():
+        start.wait()
+        for _ in range(events_per_thread):
+            sink.handle(metrics.StageEvent("encode", 0.01, size=10))
+
+    threads = [threading.Thread(target=emit) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    total = threads_count * events_per_thread
+    assert text == sink.render()
+    assert f'topdf_stage_seconds_count{{stage="encode"}} {total}' in text
+    assert f'topdf_stage_bytes_total{{stage="encode"}} {total * 10}' in text
+    assert os.listdir(tmp_path) == ["topdf.prom"]
+
+
+def test_capture_includes_attached_helper_threads_only():
+    def helper(context=None):
+        if context is None:
+            with metrics.stage("unrelated"):
+                pass
+            return
+        with metrics.attach(context, source="fallback.pdf"), metrics.stage("helper"):
+            pass
+
+    with metrics.capture() as events, metrics.source("doc.pdf"):
+        with metrics.stage("caller"):
+            pass
+        threads = [threading.Thread(target=helper, args=(metrics.current_context(),)),
+                   threading.Thread(target=helper)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    # 辅助线程沿用调用方的源文件；其他线程的事件不被收集
+    assert sorted((event["stage"], event["source"]) for event in events) == [
+        ("caller", "doc.pdf"), ("helper", "doc.pdf")]
+    assert metrics.current_context().capture is None
+
+
+def test_capture_collects_pdf_page_thread_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdfs, "page_count", lambda pdf_path: 3)
+
+    def render_page(pdf_path, page, dpi, out_dir):
+        with metrics.stage("pdf_render"):
+            path = f"{out_dir}/page-{page}.ppm"
+            Image.new("RGB", (50, 70), (255, 255, 255)).save(path)
+        return path
+
+    monkeypatch.setattr(pdfs, "render_page", render_page)
+    with metrics.capture() as events:
+        pdfs.rasterize_pdf("in.pdf", str(tmp_path / "out.pdf"), workers=2,
+                           words_for=lambda img, index: [])
+    # 子进程中按页并行的渲染和解码也随结果带回主进程
+    stages = [event["stage"] for event in events if event["source"] == "in.pdf"]
+    assert stages.count("pdf_render") == 3
+    assert stages.count("decode") >= 3
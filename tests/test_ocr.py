@@ -0,0 +1,173 @@
+import types
+
+import pytest
+from PIL import Image
+
+from topdf import ocr
+from topdf.engine import ConversionEngine
+from topdf.ocrcache import OcrCache
+from topdf.preprocess import PreprocessOptions
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    """不需要 Tesseract：识别结果为左上角像素的灰度，格式与 Tesseract 的输出相同（页末换页符）"""
+    calls = []
+
+    def page(img):
+        return f"gray {img.convert('L').getpixel((0, 0))}\n\f"
+
+    def image_to_string(img, lang, config):
+        calls.append(("single", lang, config))
+        return page(img)
+
+    def run_tesseract(list_path, output_base, extension, lang, config):
+        calls.append(("batch", lang, config))
+        with open(list_path, encoding="utf-8") as f:
+            paths = f.read().split()
+        with open(f"{output_base}.{extension}", "w", encoding="utf-8") as f:
+            for path in paths:
+                with Image.open(path) as img:
+                    f.write(page(img))
+
+    fake = types.SimpleNamespace(image_to_string=image_to_string,
+                                 pytesseract=types.SimpleNamespace(run_tesseract=run_tesseract))
+    monkeypatch.setattr(ocr, "_pytesseract", fake)
+    return calls
+
+
+def _gray(path, value):
+    Image.new("L", (40, 30), value).save(path)
+    return str(path)
+
+
+def test_single_and_batch_cache_the_same_text(tmp_path, fake_tesseract):
+    first, second = _gray(tmp_path / "a.png", 10), _gray(tmp_path / "b.png", 20)
+    single_cache = OcrCache(str(tmp_path / "single.sqlite3"))
+    batch_cache = OcrCache(str(tmp_path / "batch.sqlite3"))
+    try:
+        single = ConversionEngine(office_type=None, ocr_cache=single_cache)
+        batch = ConversionEngine(office_type=None, ocr_cache=batch_cache)
+        assert [single.extract_text(first), single.extract_text(second)] == \
+            batch.extract_text_batch([first, second]) == ["gray 10", "gray 20"]
+        assert [call[0] for call in fake_tesseract] == ["single", "single", "batch"]
+        for path in (first, second):
+            # 两种方式写入缓存的文字相同，之后从缓存读取的结果也相同
+            assert single.extract_text(path) == batch.extract_text(path)
+        assert len(fake_tesseract) == 3
+    finally:
+        single_cache.close()
+        batch_cache.close()
+
+
+def test_cache_key_follows_content_and_options(tmp_path, fake_tesseract):
+    source = _gray(tmp_path / "page.png", 50)
+    copy = _gray(tmp_path / "renamed.png", 50)
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"))
+    try:
+        engine = ConversionEngine(office_type=None, ocr_cache=cache)
+        assert engine.extract_text(source) == "gray 50"
+        # 内容相同、文件名不同：命中缓存
+        assert engine.extract_text(copy) == "gray 50"
+        assert len(fake_tesseract) == 1
+
+        # 语言、Tesseract 参数或预处理方式不同时重新识别
+        engine.extract_text(source, lang="eng")
+        engine.ocr_config = "--psm 6"
+        engine.extract_text(source)
+        engine.ocr_preprocess = PreprocessOptions()
+        engine.extract_text(source)
+        assert len(fake_tesseract) == 4
+        assert fake_tesseract[1][1] == "eng" and fake_tesseract[2][2] == "--psm 6"
+
+        # 内容变化后重新识别
+        _gray(tmp_path / "page.png", 60)
+        assert engine.extract_text(source) == "gray 60"
+        assert len(fake_tesseract) == 5
+    finally:
+        cache.close()
+
+
+def _upright_page():
+    """正立页面：白底，左上方一个黑色方块（模拟一个单词）"""
+    img = Image.new("L", (300, 200), 255)
+    img.paste(0, (40, 30, 120, 50))
+    return img
+
+
+def _dark_box(img):
+    left, top, right, bottom = img.point(lambda v: 255 if v < 128 else 0).getbbox()
+    return left, top, right - left, bottom - top
+
+
+@pytest.mark.parametrize("rotate", [0, 90, 180, 270])
+def test_orientation_apply_and_map_box_round_trip(rotate):
+    upright = _upright_page()
+    # 需要顺时针旋转 rotate 度才正立的扫描件
+    scanned = upright.rotate(rotate, expand=True)
+    osd = ocr.Orientation(rotate, "Latin", orientation_confidence=10.0)
+    turned = osd.apply(scanned)
+    assert turned.size == upright.size
+    assert _dark_box(turned) == _dark_box(upright)
+    assert osd.map_box(_dark_box(turned), scanned.size) == _dark_box(scanned)
+
+
+def test_orientation_ignores_low_confidence_and_picks_languages():
+    osd = ocr.Orientation.parse("Page number: 0\nOrientation in degrees: 270\nRotate: 90\n"
+                                "Orientation confidence: 0.5\nScript: Han\n"
+                                "Script confidence: 3.2\n")
+    assert osd.rotate == 90 and osd.rotation == 0
+    assert osd.map_box((1, 2, 3, 4), (100, 100)) == (1, 2, 3, 4)
+    assert osd.languages("chi_sim+eng") == "chi_sim"
+    # 文字种类不可信或没有对应的语言包时不缩减
+    assert ocr.Orientation(script="Han", script_confidence=0.2).languages("chi_sim+eng") \
+        == "chi_sim+eng"
+    assert ocr.Orientation(script="Arabic", script_confidence=5).languages("eng") == "eng"
+    assert ocr.Orientation.parse("Rotate: nonsense") is None
+
+
+def test_words_from_rotated_scan_use_original_coordinates(tmp_path, fake_tesseract,
+                                                          monkeypatch):
+    scanned = _upright_page().rotate(90, expand=True)
+    seen = []
+
+    def image_to_data(img, lang, config, output_type):
+        # 假 Tesseract 只能识别正立的页面
+        seen.append((img.size, lang))
+        left, top, width, height = _dark_box(img)
+        return {"text": ["word"], "left": [left], "top": [top], "width": [width],
+                "height": [height]}
+
+    monkeypatch.setattr(ocr._pytesseract, "image_to_data", image_to_data, raising=False)
+    monkeypatch.setattr(ocr._pytesseract, "Output",
+                        types.SimpleNamespace(DICT="dict"), raising=False)
+    osd = ocr.Orientation(90, "Latin", orientation_confidence=10.0, script_confidence=5.0)
+    words = ocr.image_to_words(scanned, "chi_sim+eng", osd=osd)
+    assert seen == [((300, 200), "eng")]
+    assert words == [_dark_box(scanned) + ("word",)]
+
+
+def test_osd_result_is_cached_per_page(tmp_path, fake_tesseract, monkeypatch):
+    detected = []
+
+    def image_to_osd(img, config):
+        detected.append(config)
+        return "Rotate: 180\nOrientation confidence: 9\nScript: Latin\nScript confidence: 4\n"
+
+    monkeypatch.setattr(ocr._pytesseract, "image_to_osd", image_to_osd, raising=False)
+    source = tmp_path / "page.png"
+    _upright_page().rotate(180).save(source)
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"))
+    try:
+        engine = ConversionEngine(office_type=None, ocr_cache=cache, ocr_auto=True)
+        first = engine.extract_text(str(source))
+        # 第二页（不同页序号）单独检测；同一页再次检测时直接使用缓存
+        with Image.open(source) as img:
+            assert engine._orientation(img, "digest", 0).rotation == 180
+            assert engine._orientation(img, "digest", 1).rotation == 180
+            assert engine._orientation(img, "digest", 0).rotation == 180
+        assert len(detected) == 3
+        assert engine.extract_text(str(source)) == first
+        assert len(detected) == 3
+    finally:
+        cache.close()
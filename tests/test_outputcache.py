@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import time
+
+from topdf.outputcache import OutputCache
+
+ORIGINAL = b"%PDF-1.4 converted output\n%%EOF\n"
+
+
+def _overwrite(path):
+    """原地修改文件（长度不变），模拟用户编辑输出的PDF"""
+    with open(path, "r+b") as f:
+        f.write(b"%PDF-1.4 EDITED!!")
+
+
+def test_edited_output_does_not_change_later_hits(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    try:
+        key = OutputCache.make_key("content-hash", "options")
+        converted = tmp_path / "converted.pdf"
+        converted.write_bytes(ORIGINAL)
+        cache.store(key, str(converted))
+        # 存入缓存后修改原输出
+        _overwrite(converted)
+
+        first = tmp_path / "first.pdf"
+        assert cache.fetch(key, str(first))
+        assert first.read_bytes() == ORIGINAL
+        # 修改命中时放出的输出
+        _overwrite(first)
+
+        second = tmp_path / "second.pdf"
+        assert cache.fetch(key, str(second))
+        assert second.read_bytes() == ORIGINAL
+    finally:
+        cache.close()
+
+
+def _output(directory, name, size=100):
+    path = directory / f"{name}.pdf"
+    path.write_bytes(name.encode("ascii").ljust(size, b"."))
+    return str(path)
+
+
+def _store(cache, directory, name):
+    # last_used 按时间排序，相邻两次操作之间留出间隔
+    time.sleep(0.01)
+    cache.store(name, _output(directory, name))
+
+
+def _use_from_other_process(cache_dir, max_size, work_dir):
+    """另一个进程：命中 k1（刷新最近使用时间），再存入 k3"""
+    cache = OutputCache(cache_dir, max_size)
+    try:
+        time.sleep(0.01)
+        assert cache.fetch("k1", os.path.join(work_dir, "fetched.pdf"))
+        time.sleep(0.01)
+        output = os.path.join(work_dir, "k3.pdf")
+        with open(output, "wb") as f:
+            f.write(b"k3".ljust(100, b"."))
+        cache.store("k3", output)
+    finally:
+        cache.close()
+
+
+def test_lru_eviction_across_processes(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    cache = OutputCache(cache_dir, max_size=300)
+    try:
+        _store(cache, tmp_path, "k1")
+        _store(cache, tmp_path, "k2")
+        process = multiprocessing.get_context("fork").Process(
+            target=_use_from_other_process, args=(cache_dir, 300, str(tmp_path)))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+        assert len(cache) == 3
+
+        # 超过上限时淘汰最久未使用的 k2：k1 刚被另一个进程命中过
+        _store(cache, tmp_path, "k4")
+        assert len(cache) == 3
+        assert not cache.fetch("k2", str(tmp_path / "k2-again.pdf"))
+        assert not os.path.exists(cache._object_path("k2"))
+        for key in ("k1", "k3", "k4"):
+            target = tmp_path / f"{key}-hit.pdf"
+            assert cache.fetch(key, str(target))
+            assert target.read_bytes().startswith(key.encode("ascii"))
+    finally:
+        cache.close()
+
+
+def test_oversized_output_is_not_cached(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_size=50)
+    try:
+        _store(cache, tmp_path, "big")
+        assert len(cache) == 0
+        assert not cache.fetch("big", str(tmp_path / "out.pdf"))
+    finally:
+        cache.close()
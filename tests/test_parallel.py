@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from topdf.parallel import run_bounded
+
+
+def test_run_bounded_limits_pending_and_reads_lazily():
+    read, running = [], []
+    peak = [0]
+    lock = threading.Lock()
+
+    def items():
+        for index in range(20):
+            read.append(index)
+            yield index
+
+    def work(item):
+        with lock:
+            running.append(item)
+            peak[0] = max(peak[0], len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.remove(item)
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = run_bounded(lambda item: executor.submit(work, item), items(), 3)
+        first = next(results)
+        # 还没取走更多结果时只读取了前几个输入，不会一次为全部输入创建任务
+        assert len(read) <= 4
+        rest = list(results)
+    assert sorted([first] + rest) == [index * 2 for index in range(20)]
+    assert peak[0] <= 3
+
+
+def test_run_bounded_propagates_task_errors():
+    def work(item):
+        if item == 2:
+            raise ValueError("bad item")
+        return item
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="bad item"):
+            list(run_bounded(lambda item: executor.submit(work, item), range(5), 2))
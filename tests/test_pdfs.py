@@ -0,0 +1,72 @@
+import re
+
+from PIL import Image
+
+from topdf import images, pdfs
+
+PAGES = 6
+
+
+def _closed(img):
+    try:
+        img.getpixel((0, 0))
+    except ValueError:
+        return True
+    return False
+
+
+def _fake_poppler(monkeypatch, rendered):
+    """不需要 poppler：页数固定，渲染时画一张带页码灰度的 PPM"""
+    monkeypatch.setattr(pdfs, "page_count", lambda pdf_path: PAGES)
+
+    def render_page(pdf_path, page, dpi, out_dir):
+        rendered.append(page)
+        path = f"{out_dir}/page-{page}.ppm"
+        Image.new("RGB", (170, 220), (page * 30,) * 3).save(path)
+        return path
+
+    monkeypatch.setattr(pdfs, "render_page", render_page)
+
+
+def test_rasterize_with_ocr_decodes_each_page_once(tmp_path, monkeypatch):
+    rendered, ocr_images, written = [], {}, []
+    _fake_poppler(monkeypatch, rendered)
+    write_image_pages = images.write_image_pages
+
+    def words_for(img, index):
+        ocr_images[index] = img
+        return []
+
+    def record(writer, img, *args, **kwargs):
+        # 同时渲染（含OCR）中的页面不超过 workers 的两倍
+        assert max(rendered) - len(written) <= 4
+        written.append(img)
+        return write_image_pages(writer, img, *args, **kwargs)
+
+    monkeypatch.setattr(images, "write_image_pages", record)
+    output = str(tmp_path / "out.pdf")
+    assert pdfs.rasterize_pdf("in.pdf", output, dpi=100, workers=2, words_for=words_for) == PAGES
+
+    assert sorted(rendered) == list(range(1, PAGES + 1))
+    # 写入的就是OCR用过的同一个图片，没有再打开、解码一次
+    assert written == [ocr_images[index] for index in range(PAGES)]
+    # 写完后图片都已关闭
+    for img in written:
+        assert _closed(img)
+    with open(output, "rb") as f:
+        assert re.findall(rb"/Width (\d+) /Height (\d+)", f.read()) == [(b"170", b"220")] * PAGES
+
+
+def test_iter_pages_closes_unconsumed_pages(tmp_path, monkeypatch):
+    rendered, opened = [], []
+    _fake_poppler(monkeypatch, rendered)
+
+    def process(img, index):
+        opened.append(img)
+        return index
+
+    pages = pdfs.iter_pages("in.pdf", workers=2, process=process)
+    assert next(pages)[2] == 0
+    pages.close()
+    # 提前停止时已经解码、还没交给调用方的页面也被关闭
+    assert opened and all(_closed(img) for img in opened)
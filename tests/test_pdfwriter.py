@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from topdf.engine import partial_path
+from topdf.pdfwriter import PdfWriter
+
+
+def test_writer_uses_engine_partial_path(tmp_path):
+    output = str(tmp_path / "out.pdf")
+    with PdfWriter(output) as writer:
+        writer.add_content_page(200, 200, "")
+        # 写入过程中的临时文件与引擎使用同一种命名（out.part.pdf）
+        assert os.listdir(tmp_path) == ["out.part.pdf"]
+        assert os.path.exists(partial_path(output))
+    assert os.listdir(tmp_path) == ["out.pdf"]
+
+
+def test_writer_abort_keeps_previous_output(tmp_path):
+    output = tmp_path / "out.pdf"
+    output.write_bytes(b"previous")
+    with pytest.raises(RuntimeError):
+        with PdfWriter(str(output)) as writer:
+            writer.add_content_page(200, 200, "")
+            raise RuntimeError("stop")
+    assert os.listdir(tmp_path) == ["out.pdf"]
+    assert output.read_bytes() == b"previous"
@@ -0,0 +1,127 @@
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+from topdf import pipeline
+from topdf.engine import ConversionEngine, ConversionResult
+
+
+def _files(directory, sizes):
+    paths = []
+    for index, size in enumerate(sizes):
+        path = directory / f"{index}.bin"
+        path.write_bytes(b"x" * size)
+        paths.append((str(path), None))
+    return paths
+
+
+def test_prefetch_keeps_order_and_respects_limits(tmp_path, monkeypatch):
+    read = []
+    monkeypatch.setattr(pipeline, "read_ahead", lambda path: read.append(path))
+    items = _files(tmp_path, [10, 10, 500, 10, 10])
+    missing = (str(tmp_path / "missing.bin"), None)
+    items.append(missing)
+    skipped = items[3]
+
+    out = list(pipeline.prefetch(items, depth=2, max_bytes=100,
+                                 wanted=lambda item: item is not skipped))
+    assert out == items
+    # 超过 max_bytes 的、不需要的和不存在的文件都不预读
+    assert sorted(read) == sorted(path for path, _ in (items[0], items[1], items[4]))
+
+
+def test_prefetch_read_errors(tmp_path, monkeypatch):
+    items = _files(tmp_path, [10, 10, 10])
+
+    def failing(path):
+        if path == items[1][0]:
+            raise OSError("网络共享断开")
+        return 10
+
+    monkeypatch.setattr(pipeline, "read_ahead", failing)
+    # 读取失败的文件照常产出，由转换报告错误
+    assert list(pipeline.prefetch(items)) == items
+
+    def broken(path):
+        raise RuntimeError("预读线程出错")
+
+    monkeypatch.setattr(pipeline, "read_ahead", broken)
+    with pytest.raises(RuntimeError, match="预读线程出错"):
+        list(pipeline.prefetch(items))
+
+
+def test_prefetch_stops_reading_when_consumer_stops(tmp_path, monkeypatch):
+    read = []
+    monkeypatch.setattr(pipeline, "read_ahead", lambda path: read.append(path))
+    items = _files(tmp_path, [10] * 20)
+    stream = pipeline.prefetch(items, depth=3, workers=1)
+    assert next(stream) == items[0]
+    stream.close()
+    assert len(read) <= 4
+
+
+class _Engine:
+    """只提供 commit_output 的引擎替身"""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def commit_output(self, result):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            threading.Event().wait(0.01)
+            if result.source == self.fail:
+                raise RuntimeError("写入线程出错")
+            result.staged = None
+            return result
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _results(count):
+    results = []
+    for index in range(count):
+        result = ConversionResult(f"{index}.png")
+        result.staged = None if index % 3 == 0 else ("staged", "options", "digest")
+        results.append(result)
+    return results
+
+
+def test_write_behind_yields_every_result_with_bounded_writers():
+    engine = _Engine()
+    results = _results(12)
+    out = list(pipeline.write_behind(engine, iter(results), writers=2))
+    assert sorted(r.source for r in out) == sorted(r.source for r in results)
+    assert all(r.staged is None for r in out)
+    assert engine.peak <= 2
+
+
+def test_write_behind_propagates_unexpected_errors():
+    engine = _Engine(fail="4.png")
+    with pytest.raises(RuntimeError, match="写入线程出错"):
+        list(pipeline.write_behind(engine, iter(_results(12)), writers=2))
+
+
+def test_staged_outputs_are_committed_or_reported(tmp_path):
+    src, out, staging = tmp_path / "in", tmp_path / "out", tmp_path / "staging"
+    src.mkdir()
+    for name in ("a", "b", "c"):
+        Image.new("RGB", (40, 30), (10, 20, 30)).save(src / f"{name}.png")
+    # b.pdf 已被一个目录占用，移动输出时失败
+    os.makedirs(out / "b.pdf")
+    with ConversionEngine(output_dir=str(out), office_type=None) as engine:
+        results = {os.path.basename(r.source): r for r in engine.convert_many(
+            [str(src)], prefetch=2, staging_dir=str(staging))}
+    assert results["a.png"].ok and results["c.png"].ok
+    assert "无法写入输出文件" in results["b.png"].error
+    assert os.path.isfile(out / "a.pdf") and os.path.isfile(out / "c.pdf")
+    # 暂存的文件都已移走或删除
+    assert os.listdir(staging) == []
@@ -0,0 +1,51 @@
+from PIL import Image, ImageOps
+
+from topdf.preprocess import PreprocessOptions, PreprocessResult, deskew, preprocess
+
+
+def _page(size=(800, 600), box=(300, 200, 200, 60)):
+    """白底上一个黑色方块（左, 上, 宽, 高），模拟一个文字框"""
+    img = Image.new("L", size, 255)
+    left, top, width, height = box
+    img.paste(0, (left, top, left + width, top + height))
+    return img
+
+
+def _dark_box(img):
+    left, top, right, bottom = ImageOps.invert(img.convert("L")).point(
+        lambda v: 255 if v > 128 else 0).getbbox()
+    return left, top, right - left, bottom - top
+
+
+def _center(box):
+    return box[0] + box[2] / 2, box[1] + box[3] / 2
+
+
+def test_map_box_undoes_scaling_and_cropping():
+    box = (300, 200, 200, 60)
+    result = preprocess(_page(box=box), PreprocessOptions(target_dpi=150, crop_borders=True),
+                        dpi=300)
+    assert result.scale == 0.5 and result.dpi == 150
+    # 裁掉空白后方块在处理后的图片中靠近左上角
+    assert result.offset != (0, 0)
+    assert result.image.size[0] < 400
+    mapped = result.map_box(*_dark_box(result.image))
+    assert all(abs(a - b) <= 2 for a, b in zip(mapped, box))
+
+
+def test_map_box_undoes_deskew_rotation():
+    box = (500, 120, 160, 40)
+    page = _page(box=box)
+    for angle in (3.0, -4.5):
+        rotated = deskew(page, angle)
+        result = PreprocessResult(rotated, angle=angle, rotated_size=rotated.size)
+        mapped = result.map_box(*_dark_box(rotated))
+        # 旋转后的外接框比原框大，换算回去后中心点与原框一致
+        (x, y), (ox, oy) = _center(mapped), _center(box)
+        assert abs(x - ox) <= 2 and abs(y - oy) <= 2
+
+
+def test_preprocess_without_changes_maps_identity():
+    box = (10, 20, 30, 40)
+    result = preprocess(_page(), PreprocessOptions(grayscale=False))
+    assert result.map_box(*box) == box
@@ -0,0 +1,111 @@
+import asyncio
+import http.client
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from topdf import ocr
+from topdf.engine import ConversionEngine
+from topdf.server import ConversionServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    """在后台线程的事件循环中启动监听 localhost 随机端口的服务"""
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    engine = ConversionEngine(office_type=None)
+    srv = ConversionServer(engine, port=0, workers=4, max_upload=64 * 1024,
+                           spool_dir=str(spool), ocr_batch_wait=0.3)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(srv.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield srv
+    finally:
+        asyncio.run_coroutine_threadsafe(srv.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+        engine.close()
+
+
+def _png(size=(64, 48), color=(255, 255, 255)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _post(server, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=30)
+    try:
+        conn.request("POST", path, body=body)
+        response = conn.getresponse()
+        return response.status, response.getheader("Content-Type"), response.read()
+    finally:
+        conn.close()
+
+
+def test_health(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    conn.request("GET", "/health")
+    response = conn.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read())["status"] == "ok"
+    conn.close()
+
+
+def test_convert_image(server):
+    status, content_type, body = _post(server, "/convert?filename=a.png", _png())
+    assert status == 200
+    assert content_type == "application/pdf"
+    assert body.startswith(b"%PDF-")
+
+
+def test_ocr_requests_are_batched(server, monkeypatch):
+    calls = []
+
+    def fake_images_to_text(images, lang, config="", preprocess=None, osds=None):
+        calls.append(len(images))
+        return [f"page {img.width}" for img in images]
+
+    monkeypatch.setattr(ocr, "images_to_text", fake_images_to_text)
+    widths = [40, 50, 60]
+    with ThreadPoolExecutor(max_workers=len(widths)) as executor:
+        responses = list(executor.map(
+            lambda width: _post(server, "/ocr?filename=p.png&lang=eng", _png((width, 30))),
+            widths))
+    assert [(status, body.decode()) for status, _, body in responses] == [
+        (200, f"page {width}") for width in widths]
+    assert calls == [len(widths)]
+
+
+def test_oversize_upload_rejected(server):
+    status, _, body = _post(server, "/convert?filename=big.png", b"\0" * (128 * 1024))
+    assert status == 413
+    assert "error" in json.loads(body)
+
+
+def test_invalid_upload_hides_spool_path(server):
+    status, _, body = _post(server, "/convert?filename=broken.png", b"not an image")
+    assert status == 422
+    error = json.loads(body)["error"]
+    assert "broken.png" in error
+    assert server.spool_dir not in error
+
+
+def test_unexpected_error_returns_500(server, monkeypatch, capsys):
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server.engine, "convert_image", fail)
+    status, content_type, body = _post(server, "/convert?filename=a.png", _png())
+    assert status == 500
+    assert content_type.startswith("application/json")
+    assert json.loads(body) == {"error": "服务器内部错误"}
+    assert "boom" in capsys.readouterr().err
@@ -0,0 +1,40 @@
+from topdf import textpdf
+
+
+def test_long_line_is_wrapped_chunk_by_chunk(tmp_path, monkeypatch):
+    source = tmp_path / "oneline.txt"
+    source.write_text("中文 words\t和标点，" * 20000, encoding="utf-8")
+
+    whole = tmp_path / "whole.pdf"
+    monkeypatch.setattr(textpdf, "_READ_SIZE", 1 << 20)
+    pages = textpdf.render_text_to_pdf(str(source), str(whole))
+
+    wrapped = []
+    wrap = textpdf._Paginator._wrap
+
+    def record(self, text):
+        wrapped.append(len(text))
+        return wrap(self, text)
+
+    monkeypatch.setattr(textpdf._Paginator, "_wrap", record)
+    monkeypatch.setattr(textpdf, "_READ_SIZE", 1000)
+    chunked = tmp_path / "chunked.pdf"
+    assert textpdf.render_text_to_pdf(str(source), str(chunked)) == pages > 1
+
+    # 每次只折一个块（制表符已展开）加上上一块末尾没排满的一行，不会把整个文件当成一行缓存
+    assert len(wrapped) > 100
+    assert max(wrapped) < 2000
+    assert chunked.read_bytes() == whole.read_bytes()
+
+
+def test_form_feed_at_chunk_boundary(tmp_path, monkeypatch):
+    source = tmp_path / "pages.txt"
+    source.write_text("第一页\f\n第二页\f", encoding="utf-8")
+    expected = tmp_path / "expected.pdf"
+    assert textpdf.render_text_to_pdf(str(source), str(expected)) == 2
+
+    # 换页符正好在块末尾，后面的内容在下一块
+    monkeypatch.setattr(textpdf, "_READ_SIZE", 4)
+    output = tmp_path / "output.pdf"
+    assert textpdf.render_text_to_pdf(str(source), str(output)) == 2
+    assert output.read_bytes() == expected.read_bytes()
@@ -0,0 +1,133 @@
+import os
+import threading
+
+from PIL import Image
+
+from topdf import watch
+from topdf.engine import ConversionEngine
+from topdf.watch import WatchService
+
+
+def _run_until(service, count, timeout=20, callback=None):
+    """在后台线程中运行监视服务，收到 count 个结果后停止，返回全部结果
+
+    callback(结果) 在每个结果到达时调用。
+    """
+    results = []
+    done = threading.Event()
+
+    def on_result(result):
+        if callback is not None:
+            callback(result)
+        results.append(result)
+        if len(results) >= count:
+            done.set()
+
+    service.on_result = on_result
+    thread = threading.Thread(target=service.run)
+    thread.start()
+    try:
+        assert done.wait(timeout), results
+    finally:
+        service.stop()
+        thread.join(timeout)
+    return results
+
+
+def _scanner_drop(directory):
+    Image.new("RGB", (90, 60), (200, 0, 0)).save(os.path.join(directory, "scan.png"))
+    Image.new("RGB", (60, 90), (0, 200, 0)).save(os.path.join(directory, "scan.jpg"))
+    Image.new("L", (50, 50), 90).save(os.path.join(directory, "scan.bmp"))
+
+
+def _check_distinct(results, out):
+    assert all(result.ok for result in results), [result.error for result in results]
+    outputs = sorted(os.path.basename(result.output) for result in results)
+    assert outputs == ["scan.jpg.pdf", "scan.pdf", "scan.png.pdf"]
+    assert sorted(os.listdir(out)) == outputs
+
+
+def test_same_stem_files_get_distinct_outputs(tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    _scanner_drop(src)
+    with ConversionEngine(output_dir=str(out), office_type=None) as engine:
+        service = WatchService(engine, [str(src)], workers=1, settle=0.1, polling=True,
+                               poll_interval=0.05)
+        _check_distinct(_run_until(service, 3), str(out))
+
+
+def test_same_stem_files_in_process_workers(tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    _scanner_drop(src)
+    with ConversionEngine(output_dir=str(out), office_type=None) as engine:
+        service = WatchService(engine, [str(src)], workers=2, settle=0.1, polling=True,
+                               poll_interval=0.05)
+        _check_distinct(_run_until(service, 3), str(out))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_settler_waits_until_file_stops_changing(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(watch.time, "monotonic", clock)
+    path = tmp_path / "scan.png"
+    path.write_bytes(b"x" * 10)
+    settler = watch._Settler(2.0)
+    settler.touch(str(path))
+    assert settler.ready() == []
+
+    # 还在写入：大小变化后重新计时
+    clock.now += 1.5
+    path.write_bytes(b"x" * 20)
+    assert settler.ready() == []
+    clock.now += 1.5
+    assert settler.ready() == []
+    clock.now += 1.0
+    assert settler.ready() == [str(path)]
+    assert len(settler) == 0
+
+
+def test_settler_holds_busy_files_and_drops_deleted_ones(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(watch.time, "monotonic", clock)
+    busy, gone = tmp_path / "busy.png", tmp_path / "gone.png"
+    busy.write_bytes(b"1")
+    gone.write_bytes(b"2")
+    settler = watch._Settler(1.0)
+    settler.touch(str(busy))
+    settler.touch(str(gone))
+    settler.ready()
+    clock.now += 2
+    os.remove(gone)
+    # 正在转换的文件等转换结束后再交出，被删除的文件不再等待
+    assert settler.ready(busy={str(busy)}) == []
+    assert len(settler) == 1
+    assert settler.ready(busy=set()) == [str(busy)]
+
+
+def test_modified_file_is_converted_again(tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    Image.new("RGB", (30, 20), (255, 0, 0)).save(src / "page.png")
+
+    def rescan(result):
+        if b"/Width 30 /Height 20" in (out / "page.pdf").read_bytes():
+            # 转换完成后文件又被覆盖（扫描仪重新扫描）
+            Image.new("RGB", (20, 30), (0, 255, 0)).save(src / "page.png")
+
+    with ConversionEngine(output_dir=str(out), office_type=None) as engine:
+        service = WatchService(engine, [str(src)], workers=1, settle=0.1, polling=True,
+                               poll_interval=0.05)
+        results = _run_until(service, 2, callback=rescan)
+    assert all(result.ok for result in results)
+    # 再次转换沿用同一个输出文件名，内容为新的图片
+    assert [os.path.basename(result.output) for result in results] == ["page.pdf"] * 2
+    assert b"/Width 20 /Height 30" in (out / "page.pdf").read_bytes()
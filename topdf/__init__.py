@@ -0,0 +1,4 @@
+"""文档/图片转PDF转换引擎（无界面，可单独导入或通过 python -m topdf 批量运行）"""
+from .engine import ConversionEngine, ConversionResult, iter_inputs, read_manifest
+from .errors import ConversionError
+from .formats import SUPPORTED_DOC_FORMATS, SUPPORTED_IMAGE_FORMATS, file_kind
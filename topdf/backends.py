@@ -0,0 +1,387 @@
+"""文档转换后端
+
+一个后端实例对应一个长期运行的办公软件进程，由 DocumentWorkerPool
+在同一个工作线程中调用 start / convert / stop，因此 COM 的 STA 要求自然满足。
+后端按名称注册，detect_backend 按平台选择第一个可用的后端。
+"""
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import metrics
+from .errors import ConversionError
+
+# Word 另存为 PDF 的文件格式编号
+WD_FORMAT_PDF = 17
+# 关闭文档时不保存修改
+WD_DO_NOT_SAVE_CHANGES = 0
+
+OFFICE_APP_NAMES = {
+    "word": "Word.Application",
+    "wps": "Kwps.Application",
+}
+
+
+# 已注册的后端：名称 -> 后端类
+_BACKENDS = {}
+
+
+def register_backend(cls):
+    """注册后端类（可用作类装饰器）"""
+    _BACKENDS[cls.name] = cls
+    return cls
+
+
+def backend_names():
+    """所有已注册的后端名称"""
+    return list(_BACKENDS)
+
+
+def get_backend_class(name):
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ConversionError(f"未知的文档转换后端: {name}") from None
+
+
+def backend_label(name):
+    """后端的显示名称"""
+    cls = _BACKENDS.get(name)
+    return cls.label if cls else "无"
+
+
+def detect_backend():
+    """按平台优先级返回第一个可用的后端名称，没有可用后端时返回 None"""
+    if sys.platform == "win32":
+        order = ["word", "wps", "libreoffice"]
+    else:
+        order = ["libreoffice"]
+    for name in order:
+        cls = _BACKENDS.get(name)
+        if cls is not None and cls.is_available():
+            return name
+    return None
+
+
+def create_backend(name):
+    """创建指定名称的后端实例（尚未启动）"""
+    return get_backend_class(name)()
+
+
+class DocumentBackend:
+    """文档转PDF后端接口"""
+
+    name = None
+    label = None
+
+    @classmethod
+    def is_available(cls):
+        """当前机器上是否可以使用该后端（不应启动办公软件）"""
+        return False
+
+    def start(self):
+        """启动办公软件进程"""
+
+    def convert(self, doc_path, pdf_path):
+        """把一个文档转换为PDF，失败时抛出异常"""
+        raise NotImplementedError
+
+    def stop(self):
+        """正常退出办公软件进程"""
+
+    def terminate(self):
+        """强制结束办公软件进程，可能在其他线程中调用（用于处理卡死）"""
+
+
+def _com_registered(prog_id):
+    """检查 COM 组件是否已注册（只查注册表，不启动办公软件）"""
+    if sys.platform != "win32":
+        return False
+    import winreg
+    try:
+        with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, prog_id + "\\CLSID"):
+            return True
+    except OSError:
+        return False
+
+
+class WordComBackend(DocumentBackend):
+    """通过 COM 自动化调用 Word / WPS"""
+
+    def __init__(self, office_type=None):
+        if office_type:
+            self.name = office_type
+        self.app_name = OFFICE_APP_NAMES[self.name]
+        self.app = None
+        self.pid = None
+
+    @classmethod
+    def is_available(cls):
+        return _com_registered(OFFICE_APP_NAMES[cls.name])
+
+    def start(self):
+        import pythoncom
+        import win32com.client
+
+        pythoncom.CoInitialize()
+        try:
+            # DispatchEx 总是启动新的进程，保证每个工作线程独占一个实例
+            self.app = win32com.client.DispatchEx(self.app_name)
+            self.app.Visible = False
+            self.app.DisplayAlerts = 0
+        except Exception as e:
+            pythoncom.CoUninitialize()
+            raise ConversionError(f"无法启动 {self.app_name}: {str(e)}") from e
+        self.pid = self._find_pid()
+
+    def _find_pid(self):
+        """记录办公软件的进程号，卡死时用来强制结束"""
+        try:
+            import win32process
+            return win32process.GetWindowThreadProcessId(self.app.Hwnd)[1]
+        except Exception:
+            return None
+
+    def convert(self, doc_path, pdf_path):
+        with metrics.stage("document_open", source=doc_path):
+            doc = self.app.Documents.Open(
+                os.path.abspath(doc_path),
+                ConfirmConversions=False,
+                ReadOnly=True,
+                AddToRecentFiles=False,
+            )
+        try:
+            with metrics.stage("document_save", source=doc_path):
+                doc.SaveAs(os.path.abspath(pdf_path), FileFormat=WD_FORMAT_PDF)
+        finally:
+            with metrics.stage("document_close", source=doc_path):
+                doc.Close(WD_DO_NOT_SAVE_CHANGES)
+
+    def stop(self):
+        import pythoncom
+
+        try:
+            if self.app:
+                self.app.Quit()
+        except Exception:
+            # 进程已经退出或被强制结束
+            pass
+        finally:
+            self.app = None
+            pythoncom.CoUninitialize()
+
+    def terminate(self):
+        if self.pid:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+@register_backend
+class WordBackend(WordComBackend):
+    name = "word"
+    label = "Microsoft Word"
+
+
+@register_backend
+class WpsBackend(WordComBackend):
+    name = "wps"
+    label = "WPS"
+
+
+# LibreOffice 常见安装位置
+SOFFICE_CANDIDATES = [
+    r'C:\Program Files\LibreOffice\program\soffice.exe',
+    r'C:\Program Files (x86)\LibreOffice\program\soffice.exe',
+    '/Applications/LibreOffice.app/Contents/MacOS/soffice',
+    '/usr/bin/soffice',
+    '/usr/lib/libreoffice/program/soffice',
+    '/opt/libreoffice/program/soffice',
+]
+
+# 启动监听进程后等待其就绪的最长时间（秒）
+SOFFICE_START_TIMEOUT = 60
+
+
+def find_soffice():
+    """查找 LibreOffice 可执行文件，未找到返回 None"""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in SOFFICE_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _uno_props(**kwargs):
+    from com.sun.star.beans import PropertyValue
+    props = []
+    for key, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = key
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+@register_backend
+class LibreOfficeBackend(DocumentBackend):
+    """通过 soffice --headless 转换文档
+
+    能导入 uno 模块时启动一个长期运行的监听进程，通过 UNO 连接在多个文档之间复用；
+    否则退化为每个文档调用一次 soffice --convert-to。
+    每个实例使用独立的用户配置目录，因此多个实例可以同时运行。
+    """
+
+    name = "libreoffice"
+    label = "LibreOffice"
+
+    def __init__(self, soffice=None, use_uno=None):
+        self.soffice = soffice or find_soffice()
+        if use_uno is None:
+            try:
+                import uno  # noqa: F401
+                use_uno = True
+            except ImportError:
+                use_uno = False
+        self.use_uno = use_uno
+        self.process = None
+        self.desktop = None
+        self.profile_dir = None
+
+    @classmethod
+    def is_available(cls):
+        return find_soffice() is not None
+
+    def _base_args(self):
+        profile_url = "file:///" + self.profile_dir.replace("\\", "/").lstrip("/")
+        return [
+            self.soffice,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            f"-env:UserInstallation={profile_url}",
+        ]
+
+    def start(self):
+        if not self.soffice:
+            raise ConversionError("未找到 LibreOffice (soffice)，无法转换文档！")
+        self.profile_dir = tempfile.mkdtemp(prefix="topdf-lo-")
+        if self.use_uno:
+            self._start_listener()
+
+    def _start_listener(self):
+        import uno
+
+        port = _free_port()
+        connection = f"socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        self.process = subprocess.Popen(
+            self._base_args() + [f"--accept={connection}"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + SOFFICE_START_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:{connection}")
+                break
+            except Exception as e:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError(f"无法启动 LibreOffice: {str(e)}") from e
+                time.sleep(0.2)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", ctx)
+
+    def convert(self, doc_path, pdf_path):
+        if self.use_uno:
+            self._convert_uno(doc_path, pdf_path)
+        else:
+            self._convert_subprocess(doc_path, pdf_path)
+
+    def _convert_uno(self, doc_path, pdf_path):
+        import uno
+
+        with metrics.stage("document_open", source=doc_path):
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(doc_path)), "_blank", 0,
+                _uno_props(Hidden=True, ReadOnly=True))
+        if doc is None:
+            raise ConversionError(f"LibreOffice 无法打开文档: {os.path.basename(doc_path)}")
+        try:
+            if doc.supportsService("com.sun.star.text.WebDocument"):
+                filter_name = "writer_web_pdf_Export"
+            elif doc.supportsService("com.sun.star.drawing.DrawingDocument"):
+                filter_name = "draw_pdf_Export"
+            else:
+                filter_name = "writer_pdf_Export"
+            with metrics.stage("document_save", source=doc_path):
+                doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                               _uno_props(FilterName=filter_name))
+        finally:
+            with metrics.stage("document_close", source=doc_path):
+                doc.close(True)
+
+    def _convert_subprocess(self, doc_path, pdf_path):
+        out_dir = tempfile.mkdtemp(prefix="out-", dir=self.profile_dir)
+        try:
+            # 每个文档启动一次 soffice，打开、保存、关闭无法分开计时
+            with metrics.stage("document_convert", source=doc_path):
+                self.process = subprocess.Popen(
+                    self._base_args() + ["--convert-to", "pdf", "--outdir", out_dir,
+                                         os.path.abspath(doc_path)],
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                output = self.process.communicate()[0]
+            produced = os.path.join(
+                out_dir, os.path.splitext(os.path.basename(doc_path))[0] + ".pdf")
+            if self.process.returncode != 0 or not os.path.exists(produced):
+                message = output.decode(errors="replace").strip()
+                raise ConversionError(f"LibreOffice 转换失败: {message}")
+            shutil.move(produced, pdf_path)
+        finally:
+            self.process = None
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def stop(self):
+        try:
+            if self.desktop is not None:
+                self.desktop.terminate()
+        except Exception:
+            # 连接已断开或进程已被强制结束
+            pass
+        self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def terminate(self):
+        process = self.process
+        if process is not None:
+            try:
+                process.kill()
+            except OSError:
+                pass
@@ -0,0 +1 @@
+"""性能基准测试（python -m topdf.bench.<名称>）"""
@@ -0,0 +1,185 @@
+"""基准测试用的样本语料：合成的扫描页，或用户提供的带标注图片
+
+用户语料为一个目录，每张图片旁边放一个同名的 .gt.txt 文件作为正确文字。
+generate_corpus 在本地生成覆盖各种分辨率、色彩模式和多帧图片的文件语料。
+"""
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from ..formats import KIND_IMAGE, file_kind
+
+_SAMPLE_LINES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Invoice number 20231108, total amount 1,284.50",
+    "Pack my box with five dozen liquor jugs.",
+    "Scanned documents are often skewed and noisy.",
+    "Sphinx of black quartz, judge my vow.",
+    "Page 3 of 12, printed on 2023-11-08 at 14:05",
+]
+
+
+class Sample:
+    """一张样本图片及其正确文字"""
+
+    def __init__(self, name, image, truth):
+        self.name = name
+        self.image = image
+        self.truth = truth
+
+
+def _load_font(size, font_path=None):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow 10.1 之前的默认字体不能缩放
+        return ImageFont.load_default()
+
+
+def render_page(lines, dpi=300, skew=0.0, color=False, noise=0, border=0, font_path=None,
+                seed=0):
+    """按指定DPI渲染一页文字，可加倾斜、彩色背景、噪点和扫描黑边"""
+    rng = random.Random(seed)
+    width, height = int(8.27 * dpi / 2), int(11.69 * dpi / 4)
+    font = _load_font(max(8, round(dpi / 300 * 36)), font_path)
+    background = (246, 240, 222) if color else (255, 255, 255)
+    img = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(img)
+    margin = dpi // 4
+    line_height = round(dpi / 300 * 56)
+    for i, line in enumerate(lines):
+        fill = (30, 40, 120) if color else (0, 0, 0)
+        draw.text((margin, margin + i * line_height), line, fill=fill, font=font)
+    if noise:
+        for _ in range(noise * width * height // 10000):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.point((x, y), fill=(rng.randrange(90, 200),) * 3)
+        img = img.filter(ImageFilter.GaussianBlur(0.6))
+    if skew:
+        img = img.rotate(skew, resample=Image.BICUBIC, fillcolor=background)
+    if border:
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, width, border), fill=(20, 20, 20))
+        draw.rectangle((0, 0, border, height), fill=(20, 20, 20))
+    img.info["dpi"] = (dpi, dpi)
+    return img
+
+
+def synthetic_corpus(font_path=None):
+    """生成一组覆盖常见扫描问题的样本"""
+    variants = [
+        ("clean-300dpi", dict(dpi=300)),
+        ("clean-600dpi", dict(dpi=600)),
+        ("color-400dpi", dict(dpi=400, color=True)),
+        ("skew2-300dpi", dict(dpi=300, skew=2.0)),
+        ("skew-4-400dpi", dict(dpi=400, skew=-4.0)),
+        ("noisy-border-600dpi", dict(dpi=600, noise=3, border=60, color=True)),
+        ("low-150dpi", dict(dpi=150)),
+    ]
+    samples = []
+    for index, (name, kwargs) in enumerate(variants):
+        lines = _SAMPLE_LINES[index % 2::2] + _SAMPLE_LINES[:index % 3]
+        image = render_page(lines, font_path=font_path, seed=index, **kwargs)
+        samples.append(Sample(name, image, "\n".join(lines)))
+    return samples
+
+
+def load_corpus(directory):
+    """读取目录中带 .gt.txt 标注的图片"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        truth_path = os.path.splitext(path)[0] + ".gt.txt"
+        if file_kind(path) != KIND_IMAGE or not os.path.exists(truth_path):
+            continue
+        with open(truth_path, encoding="utf-8-sig") as f:
+            truth = f.read()
+        with Image.open(path) as img:
+            # 拷贝后关闭文件，保留 info 中的DPI
+            image = img.convert("RGB") if img.mode == "P" else img.copy()
+        samples.append(Sample(name, image, truth))
+    return samples
+
+
+# 文件语料的规模：页面分辨率列表和每种变体的副本数
+CORPUS_SCALES = {
+    "small": {"dpis": (72, 150), "copies": 1, "frames": 3, "paragraphs": 20},
+    "medium": {"dpis": (150, 300), "copies": 3, "frames": 5, "paragraphs": 200},
+    "large": {"dpis": (300, 600), "copies": 5, "frames": 10, "paragraphs": 2000},
+}
+
+# (色彩模式, 保存格式, 扩展名, 保存参数)
+_IMAGE_VARIANTS = [
+    ("1", "PNG", ".png", {}),
+    ("1", "TIFF", ".tiff", {"compression": "group4"}),
+    ("L", "JPEG", ".jpg", {"quality": 90}),
+    ("L", "PNG", ".png", {}),
+    ("RGB", "JPEG", ".jpg", {"quality": 90}),
+    ("RGB", "PNG", ".png", {}),
+    ("RGB", "BMP", ".bmp", {}),
+    ("RGBA", "PNG", ".png", {}),
+    ("P", "PNG", ".png", {}),
+    ("P", "GIF", ".gif", {}),
+]
+
+
+def _convert_mode(page, mode):
+    if mode == "1":
+        return page.convert("L").point(lambda v: 255 if v > 160 else 0).convert("1")
+    if mode == "RGBA":
+        rgba = page.convert("RGBA")
+        rgba.putalpha(page.convert("L").point(lambda v: 255 if v < 250 else 96))
+        return rgba
+    if mode == "P":
+        return page.convert("P", palette=Image.ADAPTIVE, colors=64)
+    return page.convert(mode)
+
+
+def generate_corpus(directory, scale="small", font_path=None):
+    """在 directory 中生成图片和文档语料，返回 {"images": [...], "documents": [...]}"""
+    settings = CORPUS_SCALES[scale]
+    os.makedirs(directory, exist_ok=True)
+    images, documents = [], []
+    for dpi in settings["dpis"]:
+        for copy in range(settings["copies"]):
+            lines = _SAMPLE_LINES[copy % 3:] + _SAMPLE_LINES[:copy % 3]
+            page = render_page(lines, dpi=dpi, color=True, skew=copy * 0.5, seed=copy,
+                               font_path=font_path)
+            for mode, fmt, ext, params in _IMAGE_VARIANTS:
+                path = os.path.join(directory, f"page-{dpi}dpi-{copy}-{mode}{ext}")
+                _convert_mode(page, mode).save(path, fmt, dpi=(dpi, dpi), **params)
+                images.append(path)
+
+        # 多帧 TIFF 和动画 GIF
+        frames = [render_page(_SAMPLE_LINES[i % len(_SAMPLE_LINES):], dpi=dpi, seed=i,
+                              font_path=font_path)
+                  for i in range(settings["frames"])]
+        path = os.path.join(directory, f"multi-{dpi}dpi.tiff")
+        frames[0].save(path, "TIFF", save_all=True, append_images=frames[1:],
+                       compression="tiff_lzw", dpi=(dpi, dpi))
+        images.append(path)
+        path = os.path.join(directory, f"multi-{dpi}dpi.gif")
+        palette_frames = [_convert_mode(frame, "P") for frame in frames]
+        palette_frames[0].save(path, "GIF", save_all=True, append_images=palette_frames[1:])
+        images.append(path)
+
+    paragraphs = [" ".join(_SAMPLE_LINES[(i + j) % len(_SAMPLE_LINES)] for j in range(4))
+                  for i in range(settings["paragraphs"])]
+    path = os.path.join(directory, "document.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+    documents.append(path)
+    path = os.path.join(directory, "document.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Benchmark</title>"
+                "</head><body>\n")
+        for i, paragraph in enumerate(paragraphs):
+            if i % 10 == 0:
+                f.write(f"<h2>Section {i // 10 + 1}</h2>\n")
+            f.write(f"<p>{paragraph}</p>\n")
+        f.write("</body></html>\n")
+    documents.append(path)
+    return {"images": images, "documents": documents}
@@ -0,0 +1,125 @@
+"""自动检测方向/文字种类（OSD）的吞吐量对比
+
+把样本和它们旋转 90/180/270 度的副本混在一起，分别用固定语言（--lang 全部加载，
+不转正）和自动模式（OSD 检测后转正、只用匹配文字种类的语言）识别，报告每页平均
+耗时（自动模式包括 OSD 本身）、每分钟页数和字符错误率（CER）。需要 osd 语言包。
+
+    python -m topdf.bench.ocr_osd [--corpus 目录] [--lang chi_sim+eng]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+from .. import ocr
+from .corpus import Sample, load_corpus, synthetic_corpus
+from .ocr_preprocess import character_error_rate
+
+# 旋转角度（逆时针）-> 转置方式
+_ROTATIONS = {90: Image.ROTATE_90, 180: Image.ROTATE_180, 270: Image.ROTATE_270}
+
+
+def mixed_corpus(samples):
+    """原样本加上每个样本的三种旋转副本"""
+    mixed = list(samples)
+    for sample in samples:
+        for angle, method in _ROTATIONS.items():
+            image = sample.image.transpose(method)
+            image.info["dpi"] = sample.image.info.get("dpi", (300, 300))
+            mixed.append(Sample(f"{sample.name}-rot{angle}", image, sample.truth))
+    return mixed
+
+
+def _recognize(sample, mode, lang, ocr_config):
+    """识别一页，返回 (文字, 是否转正, 实际使用的语言)"""
+    if mode == "fixed":
+        return ocr.image_to_text(sample.image, lang, ocr_config), False, lang
+    osd = ocr.detect_orientation(sample.image)
+    used = osd.languages(lang) if osd is not None else lang
+    text = ocr.image_to_text(sample.image, lang, ocr_config, osd=osd)
+    return text, bool(osd is not None and osd.rotation), used
+
+
+def run(samples, lang=ocr.DEFAULT_LANG, ocr_config="", repeat=1):
+    """分别以 fixed 和 auto 模式识别全部样本，返回两种模式的汇总结果"""
+    report = []
+    for mode in ("fixed", "auto"):
+        timings, errors, rotated, langs = [], [], 0, {}
+        for sample in samples:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text, turned, used = _recognize(sample, mode, lang, ocr_config)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+            errors.append(character_error_rate(text, sample.truth))
+            rotated += turned
+            langs[used] = langs.get(used, 0) + 1
+        total = sum(timings)
+        report.append({
+            "mode": mode,
+            "pages": len(samples),
+            "mean_seconds": statistics.mean(timings),
+            "total_seconds": total,
+            "pages_per_minute": len(samples) * 60 / total if total else 0.0,
+            "mean_cer": statistics.mean(errors),
+            "rotated": rotated,
+            "langs": langs,
+            "per_sample": {sample.name: {"seconds": t, "cer": e}
+                           for sample, t, e in zip(samples, timings, errors)},
+        })
+    return report
+
+
+def _print_table(report):
+    base = report[0]
+    print(f"{'模式':<8}{'每页耗时(s)':>12}{'页/分钟':>10}{'相对吞吐':>10}{'CER':>9}{'转正页数':>10}")
+    for row in report:
+        relative = row["pages_per_minute"] / base["pages_per_minute"] \
+            if base["pages_per_minute"] else 0.0
+        print(f"{row['mode']:<8}{row['mean_seconds']:>12.3f}{row['pages_per_minute']:>10.1f}"
+              f"{relative:>10.2f}{row['mean_cer']:>9.3f}{row['rotated']:>10}")
+    for row in report:
+        used = ", ".join(f"{lang} x{count}" for lang, count in sorted(row["langs"].items()))
+        print(f"{row['mode']} 使用的语言: {used}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m topdf.bench.ocr_osd",
+                                     description="比较固定语言与自动检测方向/文字种类的OCR吞吐量")
+    parser.add_argument("--corpus", help="样本目录（图片 + 同名 .gt.txt），默认使用合成样本")
+    parser.add_argument("--font", help="合成样本使用的 TrueType 字体（默认使用 Pillow 内置字体）")
+    parser.add_argument("--lang", default=ocr.DEFAULT_LANG, help="OCR 语言（默认 %(default)s）")
+    parser.add_argument("--ocr-config", default="", help="传给 Tesseract 的额外参数")
+    parser.add_argument("--no-rotate", action="store_true", help="不加入旋转副本，只用原样本")
+    parser.add_argument("--repeat", type=int, default=1, help="每页重复次数，取最短耗时")
+    parser.add_argument("--tesseract", help="Tesseract 可执行文件路径")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出完整结果")
+    args = parser.parse_args(argv)
+
+    if args.tesseract:
+        ocr.set_tesseract_path(args.tesseract)
+    elif not ocr.init_tesseract():
+        parser.error("未找到 Tesseract，请用 --tesseract 指定")
+
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.font)
+    if not samples:
+        parser.error("样本目录中没有带 .gt.txt 标注的图片")
+    if not args.no_rotate:
+        samples = mixed_corpus(samples)
+
+    report = run(samples, args.lang, args.ocr_config, max(args.repeat, 1))
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        _print_table(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""启动耗时测量
+
+    python -m topdf.bench.startup [--repeat 5] [--json]
+
+每项都在新的 Python 进程中运行，取多次的中位数：
+
+- import：导入命令行入口、界面模块各自的耗时（进程内计时，不含解释器启动）
+- cli --help：从启动解释器到命令行打印帮助的总耗时
+- probe：检测 Tesseract 和办公软件，cold 为忽略磁盘缓存重新检测，warm 为命中缓存
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 在子进程中执行的代码，最后一行输出耗时（秒）
+_IMPORT_CODE = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_PROBE_CODE = """
+import time
+from topdf import documents, ocr
+start = time.perf_counter()
+ocr.init_tesseract(refresh={refresh})
+documents.detect_office(refresh={refresh})
+print(time.perf_counter() - start)
+"""
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _run_code(code):
+    output = subprocess.run([sys.executable, "-c", code], cwd=_PROJECT_DIR, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def _run_wall(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=_PROJECT_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure(repeat=5):
+    """返回 {项目: 中位数耗时（毫秒）}，无法测量的项目（如缺少 tkinter）为 None"""
+    cases = {
+        "import topdf.cli": lambda: _run_code(_IMPORT_CODE.format(module="topdf.cli")),
+        "import docxtopdf": lambda: _run_code(_IMPORT_CODE.format(module="docxtopdf")),
+        "cli --help": lambda: _run_wall(["-m", "topdf", "--help"]),
+        # 先做一次冷检测，之后的热检测都能命中缓存
+        "probe cold": lambda: _run_code(_PROBE_CODE.format(refresh=True)),
+        "probe warm": lambda: _run_code(_PROBE_CODE.format(refresh=False)),
+    }
+    results = {}
+    for name, run in cases.items():
+        try:
+            run()  # 预热操作系统的文件缓存
+            times = [run() for _ in range(repeat)]
+        except (subprocess.CalledProcessError, ValueError):
+            results[name] = None
+            continue
+        results[name] = statistics.median(times) * 1000
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m topdf.bench.startup",
+                                     description="测量导入和能力检测的启动耗时")
+    parser.add_argument("--repeat", type=int, default=5, help="每项运行次数（默认 %(default)s）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    results = measure(max(args.repeat, 1))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    for name, value in results.items():
+        text = f"{value:8.1f} ms" if value is not None else "     无法测量"
+        print(f"{name:<20}{text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""转换和 OCR 热点路径的基准测试
+
+    python -m topdf.bench.suite -o results.json [--scale medium] [--compare baseline.json]
+
+在本地生成语料（见 corpus.generate_corpus），分阶段计时：图片校验、图片转PDF、
+OCR 和文档转换（没有 Tesseract 或办公软件时跳过对应阶段）。每个阶段在独立的
+子进程中运行，因此记录的峰值内存（RSS）只属于该阶段。结果写入 JSON，
+与之前的结果比较时，耗时、吞吐量、内存或输出大小变差超过阈值即视为性能回退，
+退出码为 1，可用于发布前的自动检查。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import PIL
+
+from .. import ocr
+from .corpus import CORPUS_SCALES, generate_corpus
+
+RESULTS_VERSION = 1
+STAGES = ("validate", "convert_image", "ocr", "convert_document")
+DEFAULT_THRESHOLD = 0.10
+
+# 比较时检查的指标：(名称, 越大越好)
+_METRICS = [
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("throughput", True),
+    ("peak_rss_mb", False),
+    ("output_bytes", False),
+]
+
+
+def _peak_rss_mb():
+    """当前进程（以及已结束的子进程，如 Tesseract）的峰值内存，单位 MB；无法获取时为 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None, None
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024, None
+    # Linux 上单位为 KB，macOS 上为字节
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 / unit / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024 / unit / 1024
+    return own, children
+
+
+def _run_stage(stage, files, work_dir, settings):
+    """在子进程中运行一个阶段，返回 (每个文件的记录, 峰值内存, 子进程峰值内存)"""
+    from ..engine import ConversionEngine
+
+    if settings.get("tesseract"):
+        ocr.set_tesseract_path(settings["tesseract"])
+    engine = ConversionEngine(office_type=settings.get("backend"))
+    samples = []
+    try:
+        for repeat in range(settings["repeat"]):
+            for index, path in enumerate(files):
+                output = os.path.join(work_dir, f"{stage}-{index}.pdf")
+                error = None
+                start = time.perf_counter()
+                try:
+                    if stage == "validate":
+                        engine.validate_image(path)
+                    elif stage == "convert_image":
+                        engine.convert_image(path, output)
+                    elif stage == "ocr":
+                        engine.extract_text(path)
+                    else:
+                        engine.convert_document(path, output)
+                except Exception as e:
+                    error = str(e)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(output) if os.path.exists(output) else 0
+                if repeat == settings["repeat"] - 1:
+                    samples.append({"file": os.path.basename(path), "seconds": elapsed,
+                                    "output_bytes": size, "error": error})
+                elif error is None and os.path.exists(output):
+                    os.remove(output)
+    finally:
+        engine.close()
+    own, children = _peak_rss_mb()
+    return samples, own, children
+
+
+def _percentile(values, fraction):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[round(fraction * 100) - 1]
+
+
+def summarize(samples, peak_rss, peak_child_rss):
+    """汇总一个阶段的记录"""
+    ok = [s for s in samples if s["error"] is None]
+    times = [s["seconds"] for s in ok]
+    summary = {
+        "count": len(samples),
+        "errors": len(samples) - len(ok),
+        "total_seconds": sum(times),
+        "throughput": len(times) / sum(times) if times and sum(times) else None,
+        "p50_ms": _percentile(times, 0.50) * 1000 if times else None,
+        "p95_ms": _percentile(times, 0.95) * 1000 if times else None,
+        "peak_rss_mb": peak_rss,
+        "peak_child_rss_mb": peak_child_rss,
+        "output_bytes": sum(s["output_bytes"] for s in ok),
+        "files": samples,
+    }
+    return summary
+
+
+def _stage_files(stage, corpus):
+    return corpus["documents"] if stage == "convert_document" else corpus["images"]
+
+
+def _skip_reason(stage, settings):
+    if stage == "ocr" and not settings.get("tesseract"):
+        return "未找到 Tesseract"
+    if stage == "convert_document" and not settings.get("backend"):
+        return "未检测到办公软件"
+    return None
+
+
+def run_suite(corpus, stages=STAGES, repeat=1, tesseract=None, backend=None, work_dir=None):
+    """运行所有阶段，返回可写入 JSON 的结果"""
+    settings = {"repeat": max(repeat, 1), "tesseract": tesseract, "backend": backend}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="topdf-bench-", dir=work_dir) as tmp_dir:
+        for stage in stages:
+            reason = _skip_reason(stage, settings)
+            if reason:
+                results[stage] = {"skipped": reason}
+                continue
+            # 每个阶段用新的子进程运行，峰值内存互不影响
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                samples, own, children = executor.submit(
+                    _run_stage, stage, _stage_files(stage, corpus), tmp_dir, settings).result()
+            results[stage] = summarize(samples, own, children)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """比较两次结果，返回 [(阶段, 指标, 基准值, 当前值, 变化比例, 是否回退)]"""
+    rows = []
+    for stage, result in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or "skipped" in result or "skipped" in base:
+            continue
+        for metric, higher_is_better in _METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append((stage, metric, old, new, change, worse > threshold))
+    return rows
+
+
+def _print_summary(results):
+    print(f"{'阶段':<18}{'文件数':>6}{'吞吐量/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'峰值内存MB':>12}{'输出KB':>10}")
+    for stage, result in results.items():
+        if "skipped" in result:
+            print(f"{stage:<18}跳过: {result['skipped']}")
+            continue
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else "-"
+
+        print(f"{stage:<18}{result['count']:>6}{fmt(result['throughput'], '>10.1f')}"
+              f"{fmt(result['p50_ms'], '>10.1f')}{fmt(result['p95_ms'], '>10.1f')}"
+              f"{fmt(result['peak_rss_mb'], '>12.1f')}{result['output_bytes'] / 1024:>10.0f}")
+        if result["errors"]:
+            print(f"  ({result['errors']} 个文件出错)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m topdf.bench.suite",
+                                     description="转换和 OCR 的基准测试")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--scale", choices=sorted(CORPUS_SCALES), default="small",
+                        help="生成语料的规模（默认 %(default)s）")
+    parser.add_argument("--corpus-dir", help="语料目录（默认生成到临时目录，运行结束后删除）")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="要运行的阶段，逗号分隔（默认 %(default)s）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个文件重复次数，只记录最后一次")
+    parser.add_argument("--compare", metavar="BASELINE.json", help="与之前的结果比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="变差超过该比例视为回退（默认 %(default)s）")
+    parser.add_argument("--tesseract", help="Tesseract 可执行文件路径（默认自动检测）")
+    parser.add_argument("--backend", help="文档转换后端（默认自动检测）")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}")
+    tesseract = args.tesseract or ocr.init_tesseract()
+    backend = args.backend
+    if backend is None and "convert_document" in stages:
+        from ..documents import detect_office
+        backend = detect_office()
+
+    with tempfile.TemporaryDirectory(prefix="topdf-corpus-") as tmp_dir:
+        corpus_dir = args.corpus_dir or tmp_dir
+        started = time.perf_counter()
+        corpus = generate_corpus(corpus_dir, args.scale)
+        print(f"已生成语料: {len(corpus['images'])} 张图片, {len(corpus['documents'])} 个文档 "
+              f"({time.perf_counter() - started:.1f}s)")
+        results = {
+            "version": RESULTS_VERSION,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "environment": environment(),
+            "corpus": {"scale": args.scale, "images": len(corpus["images"]),
+                       "documents": len(corpus["documents"])},
+            "stages": run_suite(corpus, stages, args.repeat, tesseract, backend),
+        }
+    _print_summary(results["stages"])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("corpus") != results["corpus"]:
+            print("警告: 两次运行的语料规模不同，比较结果仅供参考")
+        regressions = 0
+        for stage, metric, old, new, change, regressed in compare(results, baseline,
+                                                                    args.threshold):
+            mark = "  <-- 回退" if regressed else ""
+            print(f"{stage:<18}{metric:<14}{old:>12.2f} -> {new:<12.2f}{change:>+8.1%}{mark}")
+            regressions += regressed
+        if regressions:
+            print(f"发现 {regressions} 项性能回退（阈值 {args.threshold:.0%}）")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""本机能力检测（Tesseract、办公软件）的磁盘缓存
+
+检测 Tesseract 和办公软件需要查找文件、查询注册表，有时还要启动子进程，
+每次启动都做一遍会明显拖慢界面出现和命令行的首个文件。检测结果保存在
+cache_dir()/capabilities.json 中，满足以下条件时直接使用：
+
+- PATH 和平台与检测时相同；
+- 检测到的可执行文件仍然存在，且大小和修改时间没有变化（升级或卸载后自动重新检测）；
+- 未超过有效期（找到时 MAX_AGE，没找到时 MISSING_MAX_AGE，安装新软件后很快就能检测到）。
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+from .runtime import cache_dir
+
+CACHE_VERSION = 1
+MAX_AGE = 7 * 24 * 3600
+MISSING_MAX_AGE = 3600
+
+_lock = threading.Lock()
+
+
+def default_cache_path():
+    return os.path.join(cache_dir(), "capabilities.json")
+
+
+def _environment_key():
+    """影响检测结果的环境：平台和 PATH"""
+    data = f"{sys.platform}\0{os.environ.get('PATH', '')}"
+    return hashlib.sha1(data.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _stamp(path):
+    """可执行文件的 (大小, 修改时间)，不存在时为 None"""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load(cache_path):
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION or data.get("environment") != _environment_key():
+        return {}
+    return data.get("entries", {})
+
+
+def _save(cache_path, entries):
+    data = {"version": CACHE_VERSION, "environment": _environment_key(), "entries": entries}
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # 缓存目录不可写时只是每次重新检测
+        pass
+
+
+def _is_valid(entry):
+    age = time.time() - entry.get("checked", 0)
+    if entry.get("value") is None:
+        return age < MISSING_MAX_AGE
+    if age >= MAX_AGE:
+        return False
+    path = entry.get("path")
+    return path is None or _stamp(path) == entry.get("stamp")
+
+
+def cached(name, probe, refresh=False, cache_path=None):
+    """返回名为 name 的检测结果，缓存无效时调用 probe()
+
+    probe 返回 (结果, 用于判断是否变化的文件路径或 None)。refresh 为真时忽略缓存重新检测。
+    """
+    cache_path = cache_path or default_cache_path()
+    with _lock:
+        entries = _load(cache_path)
+        entry = entries.get(name)
+        if not refresh and entry is not None and _is_valid(entry):
+            return entry["value"]
+        value, path = probe()
+        entries[name] = {"value": value, "path": path, "stamp": _stamp(path),
+                         "checked": time.time()}
+        _save(cache_path, entries)
+        return value
+
+
+def remember(name, value, path=None, cache_path=None):
+    """记录用户手动指定的结果（如在界面中选择的 Tesseract 路径），下次启动直接使用"""
+    cache_path = cache_path or default_cache_path()
+    with _lock:
+        entries = _load(cache_path)
+        entries[name] = {"value": value, "path": path, "stamp": _stamp(path),
+                         "checked": time.time()}
+        _save(cache_path, entries)
+
+
+def forget(cache_path=None):
+    """删除缓存，下次使用时重新检测"""
+    try:
+        os.remove(cache_path or default_cache_path())
+    except OSError:
+        pass
@@ -0,0 +1,299 @@
+"""命令行入口：python -m topdf 输入... -o 输出目录"""
+import argparse
+import os
+import signal
+import sys
+
+from . import fonts, metrics, ocr
+from .backends import backend_names
+from .docpool import DEFAULT_DOC_TIMEOUT, DEFAULT_DOCS_PER_WORKER
+from .engine import ConversionEngine, iter_inputs, read_manifest
+from .formats import KIND_IMAGE, file_kind
+from .images import DEFAULT_MAX_IMAGE_PIXELS, ImageEncodeOptions
+from .manifest import DEFAULT_MANIFEST_NAME, ConversionManifest, default_manifest_path
+from .ocrcache import OcrCache, default_ocr_cache_path
+from .outputcache import DEFAULT_OUTPUT_CACHE_SIZE, OutputCache, default_output_cache_path
+from .pdfs import DEFAULT_PDF_DPI
+from .pdfwriter import DEFAULT_QUALITY, DEFAULT_RESOLUTION
+from .pipeline import DEFAULT_PREFETCH_BYTES
+from .preprocess import PreprocessOptions
+from .runtime import setup_environment
+from .watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE, WatchService
+
+
+def _parse_dpi(value):
+    if value.lower() == "auto":
+        return None
+    dpi = float(value)
+    if dpi <= 0:
+        raise argparse.ArgumentTypeError("DPI 必须大于 0")
+    return dpi
+
+
+def _parse_preprocess(value):
+    try:
+        return PreprocessOptions.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="topdf",
+        description="批量将文档/图片转换为PDF（无界面模式）",
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="要转换的文件、目录或通配符（如 'scans/**/*.jpg'）")
+    parser.add_argument("-o", "--output", required=True, help="输出目录")
+    parser.add_argument("-m", "--manifest", action="append", default=[],
+                        help="清单文件，每行一个文件/目录/通配符，可重复指定")
+    parser.add_argument("--no-recursive", action="store_true", help="不递归子目录")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="并行转换图片（或 OCR）的进程数，0 表示使用全部CPU核（默认 1）")
+    parser.add_argument("--max-pending", type=int,
+                        help="同时排队的图片任务上限，用于限制内存占用（默认进程数的两倍）")
+    parser.add_argument("--prefetch", type=int, default=0, metavar="N",
+                        help="在后台预读后面 N 个输入文件，转换时不必等待网络共享或慢速磁盘"
+                             "（默认 0，不预读）")
+    parser.add_argument("--prefetch-size", type=int, metavar="MB",
+                        default=DEFAULT_PREFETCH_BYTES // 1024 ** 2,
+                        help="预读中的文件总大小上限（默认 %(default)s MB）")
+    parser.add_argument("--staging-dir", metavar="PATH",
+                        help="输出先写入该本机目录，再由后台线程移到输出目录，"
+                             "转换不必等待写入网络共享")
+    parser.add_argument("--doc-workers", type=int, default=1,
+                        help="同时运行的办公软件实例数（默认 1）")
+    parser.add_argument("--docs-per-worker", type=int, default=DEFAULT_DOCS_PER_WORKER,
+                        help="每个办公软件实例转换多少个文档后重启（默认 %(default)s）")
+    parser.add_argument("--doc-timeout", type=float, default=DEFAULT_DOC_TIMEOUT,
+                        help="单个文档的转换超时秒数，超时后重启办公软件（默认 %(default)s）")
+    parser.add_argument("--backend", "--office", dest="backend", choices=backend_names(),
+                        help="文档转换后端（默认按平台自动检测）")
+    parser.add_argument("--office-for-text", action="store_true",
+                        help="纯文本/网页/XML 也交给办公软件转换（默认直接排版，不需要办公软件）")
+    parser.add_argument("--font", metavar="PATH[#INDEX]",
+                        help="直接排版纯文本时使用的 TrueType 字体，TTC 字体集合可用 #序号 "
+                             "指定其中的字体（默认自动查找中文字体）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量转换：跳过上次转换后内容和参数都没有变化的文件")
+    parser.add_argument("--incremental-db", metavar="PATH",
+                        help=f"增量转换清单数据库（默认为输出目录下的 {DEFAULT_MANIFEST_NAME}）")
+    parser.add_argument("--output-cache", action="store_true",
+                        help="按内容缓存转换结果：内容相同的文件（改名、复制到其他目录）"
+                             "直接链接或复制上次的输出，不再转换")
+    parser.add_argument("--output-cache-dir", metavar="PATH",
+                        help=f"输出缓存目录（默认 {default_output_cache_path()}）")
+    parser.add_argument("--output-cache-size", type=int, metavar="MB",
+                        default=DEFAULT_OUTPUT_CACHE_SIZE // 1024 ** 2,
+                        help="输出缓存大小上限，超过时淘汰最久未使用的结果（默认 %(default)s MB）")
+    parser.add_argument("--watch", action="store_true",
+                        help="持续监视输入目录，自动转换新放入的文件（按 Ctrl+C 停止），默认启用增量转换")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help="监视模式下文件多少秒内不再变化才开始转换（默认 %(default)s）")
+    parser.add_argument("--polling", action="store_true",
+                        help="监视模式下定时扫描目录，而不是使用 inotify（网络共享目录需要）")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="定时扫描的间隔秒数（默认 %(default)s）")
+    parser.add_argument("--merge", metavar="NAME.pdf",
+                        help="把所有输入图片按顺序合并为输出目录下的一个多页PDF")
+    parser.add_argument("--dpi", type=_parse_dpi, default=DEFAULT_RESOLUTION,
+                        help="页面分辨率，决定PDF页面尺寸；auto 表示使用图片自带的DPI（默认 %(default)s）")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY,
+                        help="重新编码为JPEG时的质量 1-100（默认 %(default)s）")
+    parser.add_argument("--max-dpi", type=float,
+                        help="图片的实际分辨率（像素数 / 原稿尺寸，按图片自带的DPI计算，没有时"
+                             "按 --dpi）超过该值时先降采样再写入PDF，页面尺寸不变")
+    parser.add_argument("--no-jpeg-passthrough", action="store_true",
+                        help="JPEG 图片也解码后重新编码（默认直接嵌入原始JPEG数据）")
+    parser.add_argument("--lossless", action="store_true",
+                        help="非JPEG图片使用无损压缩而不是JPEG")
+    parser.add_argument("--max-pixels", type=int, default=DEFAULT_MAX_IMAGE_PIXELS,
+                        help="单张图片的像素上限，超过视为解压炸弹，0 表示不限制（默认 %(default)s）")
+    parser.add_argument("--searchable", action="store_true",
+                        help="图片转PDF时同时OCR，生成带不可见文字层的可搜索PDF"
+                             "（PDF 输入按页栅格化后OCR）")
+    parser.add_argument("--ocr", action="store_true",
+                        help="对图片或PDF提取文字并输出 .txt，而不是转换为PDF")
+    parser.add_argument("--pdf-rasterize", action="store_true",
+                        help="PDF 输入按页栅格化为图片页（默认原样复制），需要 poppler")
+    parser.add_argument("--pdf-dpi", type=float, default=DEFAULT_PDF_DPI,
+                        help="PDF 栅格化（包括OCR）的分辨率（默认 %(default)s）")
+    parser.add_argument("--pdf-workers", type=int,
+                        help="每个PDF同时栅格化、OCR的页数（默认CPU核数）")
+    parser.add_argument("--lang", default=ocr.DEFAULT_LANG, help="OCR 语言（默认 %(default)s）")
+    parser.add_argument("--ocr-config", default="", help="传给 Tesseract 的额外参数，如 '--psm 6'")
+    parser.add_argument("--ocr-preprocess", metavar="STEPS", type=_parse_preprocess,
+                        help="OCR 前的图片预处理，逗号分隔：gray、dpi[=300]、deskew[=最大角度]、"
+                             "crop、binarize，如 'gray,dpi=300,deskew'（默认不处理）")
+    parser.add_argument("--ocr-auto", action="store_true",
+                        help="OCR 前检测每页的方向和文字种类：自动转正，并只用匹配该文字的 --lang 语言"
+                             "（需要 Tesseract 的 osd 语言包）")
+    parser.add_argument("--ocr-threads", type=int,
+                        help="每个 Tesseract 进程的 OpenMP 线程数（并行时默认 1）")
+    parser.add_argument("--ocr-cache", metavar="PATH",
+                        help=f"OCR 结果缓存数据库（默认 {default_ocr_cache_path()}）")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="不使用 OCR 结果缓存")
+    parser.add_argument("--tesseract", help="Tesseract 可执行文件路径")
+    parser.add_argument("--metrics", metavar="SPEC", action="append", default=[],
+                        help="记录各阶段（解码、编码、OCR、办公软件打开/保存等）的耗时和大小："
+                             "jsonl:路径 写 JSON Lines 日志，prometheus:路径 写 Prometheus 文本文件，"
+                             "可重复指定")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出失败的文件和汇总")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    inputs = list(args.inputs)
+    for manifest in args.manifest:
+        try:
+            inputs.extend(read_manifest(manifest))
+        except OSError as e:
+            parser.error(f"无法读取清单文件 {manifest}: {e}")
+    if not inputs:
+        parser.error("请至少指定一个输入文件、目录、通配符或清单文件")
+    if args.jobs < 0:
+        parser.error("--jobs 不能为负数")
+    if args.doc_workers < 1:
+        parser.error("--doc-workers 至少为 1")
+    if not 1 <= args.quality <= 100:
+        parser.error("--quality 必须在 1 到 100 之间")
+    if args.pdf_dpi <= 0:
+        parser.error("--pdf-dpi 必须大于 0")
+    if args.pdf_workers is not None and args.pdf_workers < 1:
+        parser.error("--pdf-workers 至少为 1")
+    if args.output_cache_size <= 0:
+        parser.error("--output-cache-size 必须大于 0")
+    if args.prefetch < 0:
+        parser.error("--prefetch 不能为负数")
+    if args.prefetch_size <= 0:
+        parser.error("--prefetch-size 必须大于 0")
+    if args.font:
+        try:
+            fonts.load_font(args.font)
+        except fonts.FontError as e:
+            parser.error(str(e))
+    if args.ocr and (args.merge or args.searchable):
+        parser.error("--ocr 不能与 --merge 或 --searchable 同时使用")
+    if args.incremental and args.merge:
+        parser.error("--incremental 不能与 --merge 同时使用")
+    if args.watch:
+        if args.merge:
+            parser.error("--watch 不能与 --merge 同时使用")
+        if args.prefetch or args.staging_dir:
+            parser.error("--watch 不能与 --prefetch 或 --staging-dir 同时使用")
+        not_dirs = [entry for entry in inputs if not os.path.isdir(entry)]
+        if not_dirs:
+            parser.error(f"--watch 的输入必须是目录: {', '.join(not_dirs)}")
+
+    try:
+        sinks = [metrics.create_sink(spec) for spec in args.metrics]
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    setup_environment()
+    for sink in sinks:
+        metrics.add_sink(sink)
+    if args.tesseract:
+        ocr.set_tesseract_path(args.tesseract)
+    elif args.ocr or args.searchable:
+        ocr.init_tesseract()
+    if args.ocr_threads:
+        ocr.set_thread_limit(args.ocr_threads)
+
+    engine_kwargs = {
+        "output_dir": args.output,
+        "ocr_lang": args.lang,
+        "doc_workers": args.doc_workers,
+        "docs_per_worker": args.docs_per_worker,
+        "doc_timeout": args.doc_timeout,
+        "max_image_pixels": args.max_pixels,
+        "ocr_config": args.ocr_config,
+        "ocr_threads": args.ocr_threads,
+        "ocr_preprocess": args.ocr_preprocess,
+        "ocr_auto": args.ocr_auto,
+        "searchable": args.searchable,
+        "pdf_dpi": args.pdf_dpi,
+        "pdf_rasterize": args.pdf_rasterize,
+        "pdf_workers": args.pdf_workers,
+        "office_text": args.office_for_text,
+        "text_font": args.font,
+        "image_options": ImageEncodeOptions(
+            resolution=args.dpi,
+            quality=args.quality,
+            max_dpi=args.max_dpi,
+            jpeg_passthrough=not args.no_jpeg_passthrough,
+            lossless=args.lossless,
+        ),
+    }
+    if args.backend:
+        engine_kwargs["office_type"] = args.backend
+    ocr_cache = None
+    if (args.ocr or args.searchable) and not args.no_ocr_cache:
+        ocr_cache = engine_kwargs["ocr_cache"] = OcrCache(args.ocr_cache)
+    manifest = None
+    if args.incremental or args.incremental_db or args.watch:
+        manifest = engine_kwargs["manifest"] = ConversionManifest(
+            args.incremental_db or default_manifest_path(args.output))
+
+    output_cache = None
+    if args.output_cache or args.output_cache_dir:
+        output_cache = engine_kwargs["output_cache"] = OutputCache(
+            args.output_cache_dir, args.output_cache_size * 1024 ** 2)
+
+    counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+
+    def report(result):
+        if result.skipped:
+            counts["skipped"] += 1
+            if not args.quiet:
+                print(f"[跳过] {result.source} -> {result.output} (未变化)", flush=True)
+        elif result.ok:
+            counts["succeeded"] += 1
+            if not args.quiet:
+                note = "，来自缓存" if result.cached else ""
+                print(f"[成功] {result.source} -> {result.output} ({result.elapsed:.2f}s{note})",
+                      flush=True)
+        else:
+            counts["failed"] += 1
+            print(f"[失败] {result.source}: {result.error}", file=sys.stderr, flush=True)
+
+    with ConversionEngine(**engine_kwargs) as engine:
+        if args.watch:
+            service = WatchService(engine, inputs, recursive=not args.no_recursive,
+                                   ocr_text=args.ocr, workers=args.jobs,
+                                   max_pending=args.max_pending, settle=args.settle,
+                                   polling=args.polling, poll_interval=args.poll_interval,
+                                   on_result=report)
+            # 作为服务运行时收到 SIGTERM 也要等正在转换的文件完成再退出
+            signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+            print(f"正在监视 {', '.join(inputs)}，按 Ctrl+C 停止", flush=True)
+            service.run()
+        elif args.merge:
+            sources = [source for source, _ in iter_inputs(inputs, recursive=not args.no_recursive)
+                       if file_kind(source) == KIND_IMAGE]
+            report(engine.merge_images(sources, os.path.join(args.output, args.merge)))
+        else:
+            for result in engine.convert_many(inputs, recursive=not args.no_recursive,
+                                              ocr_text=args.ocr, workers=args.jobs,
+                                              max_pending=args.max_pending,
+                                              prefetch=args.prefetch,
+                                              prefetch_bytes=args.prefetch_size * 1024 ** 2,
+                                              staging_dir=args.staging_dir):
+                report(result)
+
+    if ocr_cache is not None:
+        ocr_cache.close()
+    if manifest is not None:
+        manifest.close()
+    if output_cache is not None:
+        output_cache.close()
+    metrics.close_sinks()
+
+    summary = f"完成: 成功 {counts['succeeded']} 个, 失败 {counts['failed']} 个"
+    if counts["skipped"]:
+        summary += f", 跳过 {counts['skipped']} 个"
+    print(summary)
+    return 1 if counts["failed"] else 0
@@ -0,0 +1,175 @@
+"""长期运行的办公软件工作池
+
+每个工作线程独占一个后端实例（一个 Word/WPS 进程），在多个文档之间复用，
+避免每个文档都启动、退出一次办公软件。转换指定数量的文档后或卡死时回收实例。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from . import metrics
+from .errors import ConversionError
+
+# 每个实例转换多少个文档后重启，防止办公软件内存泄漏
+DEFAULT_DOCS_PER_WORKER = 200
+# 单个文档的转换超时（秒），超时视为卡死
+DEFAULT_DOC_TIMEOUT = 300
+
+
+def _set_result(future, result=None, error=None):
+    """设置 Future 结果，忽略已被超时处理抢先设置的情况"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class _Worker(threading.Thread):
+    """工作线程：在本线程内创建、使用并销毁后端实例"""
+
+    def __init__(self, pool, index):
+        super().__init__(name=f"topdf-doc-worker-{index}", daemon=True)
+        self.pool = pool
+        self.backend = None
+        self.docs_done = 0
+        self.current = None
+        self.started_at = None
+        self.abandoned = False
+
+    def run(self):
+        try:
+            while not self.abandoned:
+                job = self.pool._jobs.get()
+                if job is None:
+                    break
+                self._run_job(*job)
+        finally:
+            self._stop_backend()
+
+    def _run_job(self, future, doc_path, pdf_path):
+        if not future.set_running_or_notify_cancel():
+            return
+        # 启动实例（Dispatch、等待办公软件就绪）也计入超时，启动时卡死同样会被发现
+        self.current = future
+        self.started_at = time.monotonic()
+        try:
+            if self.backend is None:
+                self.backend = self.pool.backend_factory()
+                with metrics.stage("backend_start", source=doc_path):
+                    self.backend.start()
+                self.docs_done = 0
+            self.backend.convert(doc_path, pdf_path)
+        except Exception as e:
+            if not isinstance(e, ConversionError):
+                e = ConversionError(f"文档转换失败: {str(e)}")
+            _set_result(future, error=e)
+            # 出错后实例状态不可信，重新启动
+            self._stop_backend()
+        else:
+            _set_result(future, pdf_path)
+            self.docs_done += 1
+            if self.docs_done >= self.pool.docs_per_worker:
+                self._stop_backend()
+        finally:
+            self.current = None
+            self.started_at = None
+
+    def _stop_backend(self):
+        backend, self.backend = self.backend, None
+        if backend is not None:
+            try:
+                backend.stop()
+            except Exception:
+                pass
+
+
+class DocumentWorkerPool:
+    """办公软件实例池
+
+    backend_factory 每次调用返回一个新的 DocumentBackend，实例在首次使用时才启动。
+    """
+
+    def __init__(self, backend_factory, size=1, docs_per_worker=DEFAULT_DOCS_PER_WORKER,
+                 timeout=DEFAULT_DOC_TIMEOUT):
+        self.backend_factory = backend_factory
+        self.size = max(size, 1)
+        self.docs_per_worker = max(docs_per_worker, 1)
+        self.timeout = timeout
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._monitor = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise ConversionError("文档转换池已关闭")
+            while len(self._workers) < self.size:
+                self._spawn_worker()
+            if self.timeout and self._monitor is None:
+                self._monitor = threading.Thread(
+                    target=self._watch_hangs, name="topdf-doc-monitor", daemon=True)
+                self._monitor.start()
+
+    def _spawn_worker(self):
+        worker = _Worker(self, len(self._workers))
+        self._workers.append(worker)
+        worker.start()
+
+    def _watch_hangs(self):
+        """检测卡死的实例：结束其进程，让任务失败，并用新的工作线程替换"""
+        interval = min(max(self.timeout / 10, 0.05), 1.0)
+        while not self._closed:
+            time.sleep(interval)
+            now = time.monotonic()
+            with self._lock:
+                for worker in list(self._workers):
+                    started_at, future = worker.started_at, worker.current
+                    if started_at is None or now - started_at < self.timeout:
+                        continue
+                    worker.abandoned = True
+                    self._workers.remove(worker)
+                    _set_result(future, error=ConversionError(
+                        f"文档转换超时（超过 {self.timeout} 秒），已重启办公软件"))
+                    if worker.backend is not None:
+                        try:
+                            worker.backend.terminate()
+                        except Exception:
+                            pass
+                    if not self._closed:
+                        self._spawn_worker()
+
+    def submit(self, doc_path, pdf_path):
+        """提交一个文档，返回 Future，结果为输出的PDF路径"""
+        self._ensure_started()
+        future = Future()
+        self._jobs.put((future, doc_path, pdf_path))
+        return future
+
+    def convert(self, doc_path, pdf_path):
+        """转换一个文档并等待完成，失败抛出 ConversionError"""
+        return self.submit(doc_path, pdf_path).result()
+
+    def close(self, wait=True):
+        """关闭所有办公软件实例"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,35 @@
+"""通过办公软件（Word/WPS/LibreOffice）把文档转换为PDF"""
+from . import capabilities
+from .backends import create_backend, detect_backend, find_soffice
+from .errors import ConversionError
+
+
+def _probe_office():
+    name = detect_backend()
+    # LibreOffice 升级或卸载后 soffice 文件会变化，据此让缓存失效
+    return name, find_soffice() if name == "libreoffice" else None
+
+
+def detect_office(refresh=False):
+    """检测可用的办公软件，返回后端名称（"word"、"wps"、"libreoffice"）或 None
+
+    检测结果缓存在磁盘上（见 capabilities），refresh 为真时忽略缓存重新检测。
+    """
+    return capabilities.cached("office", _probe_office, refresh)
+
+
+def convert_document_to_pdf(doc_path, pdf_path, office_type):
+    """启动一次办公软件将单个文档转换为PDF（批量转换请使用 DocumentWorkerPool）"""
+    if not office_type:
+        raise ConversionError("未检测到Office软件，无法转换文档！")
+
+    backend = create_backend(office_type)
+    backend.start()
+    try:
+        backend.convert(doc_path, pdf_path)
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise ConversionError(f"文档转换失败: {str(e)}") from e
+    finally:
+        backend.stop()
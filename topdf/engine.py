@@ -0,0 +1,762 @@
+"""无界面的批量转换引擎"""
+import errno
+import glob
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from . import documents, images, metrics, ocr, pdfs, pipeline, textpdf
+from .backends import create_backend
+from .docpool import DEFAULT_DOC_TIMEOUT, DEFAULT_DOCS_PER_WORKER, DocumentWorkerPool
+from .errors import ConversionError
+from .hashing import file_digest
+from .formats import KIND_DOCUMENT, KIND_IMAGE, KIND_PDF, TEXT_DOC_EXTS, file_kind
+from .pdfwriter import partial_path
+
+# 检测办公软件前的占位值（区别于“检测过但没有”的 None）
+_NOT_DETECTED = object()
+
+
+def path_key(path):
+    """比较路径是否指向同一文件时使用的键（绝对路径，Windows 上不区分大小写）"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _staging_path(output, staging_dir):
+    """在暂存目录中为 output 创建一个唯一的临时文件名（同名输出互不覆盖）"""
+    root, ext = os.path.splitext(os.path.basename(output))
+    fd, path = tempfile.mkstemp(suffix=ext, prefix=f"{root}.", dir=staging_dir)
+    os.close(fd)
+    return path
+
+
+def _move_output(staged, output):
+    """把暂存的输出移到 output：同一文件系统直接改名，否则先复制为临时文件再原子地替换"""
+    try:
+        os.replace(staged, output)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    tmp_path = partial_path(output)
+    try:
+        shutil.copyfile(staged, tmp_path)
+        os.replace(tmp_path, output)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    _remove_quietly(staged)
+
+
+class ConversionResult:
+    """单个文件的转换结果"""
+
+    def __init__(self, source, output=None, kind=None, error=None, elapsed=0.0, skipped=False,
+                 cached=False):
+        self.source = source
+        self.output = output
+        self.kind = kind
+        self.error = error
+        self.elapsed = elapsed
+        # 增量转换时源文件和参数都没有变化，沿用上次的输出
+        self.skipped = skipped
+        # 内容相同的文件转换过，输出直接取自输出缓存（见 OutputCache）
+        self.cached = cached
+        # 输出写在暂存目录中时为 (暂存文件, 转换参数, 内容哈希)，由 commit_output 移到 output
+        self.staged = None
+        # 在子进程中转换时记录的阶段事件，由主进程转发给指标输出（见 metrics.forward）
+        self.events = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = ("skipped" if self.skipped else "ok") if self.ok else f"error={self.error!r}"
+        return f"ConversionResult({self.source!r}, {status})"
+
+
+def _record_file(result):
+    """整个文件的耗时和输出大小作为 "file" 阶段记入指标
+
+    跳过的文件记为 "file_skipped"，取自输出缓存的记为 "file_cached"。
+    """
+    if not metrics.enabled():
+        return
+    size = None
+    if result.ok and result.output and os.path.exists(result.output):
+        size = os.path.getsize(result.output)
+    name = "file_skipped" if result.skipped else "file_cached" if result.cached else "file"
+    metrics.emit(metrics.StageEvent(name, result.elapsed, result.source, size, result.error))
+
+
+def read_manifest(manifest_path):
+    """读取清单文件：每行一个路径/目录/通配符，# 开头为注释，相对路径相对于清单所在目录"""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not os.path.isabs(line):
+                line = os.path.join(base_dir, line)
+            entries.append(line)
+    return entries
+
+
+def iter_inputs(inputs, recursive=True):
+    """展开文件、目录和通配符，生成 (源文件, 相对根目录) 元组
+
+    从目录展开得到的文件会带上该目录作为相对根目录，输出时保留子目录结构；
+    直接给出的文件和通配符匹配结果的相对根目录为 None。不支持的格式会被跳过。
+    """
+    seen = set()
+
+    def emit(path, base_dir):
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen or file_kind(path) is None:
+            return None
+        seen.add(key)
+        return path, base_dir
+
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                for name in sorted(files):
+                    item = emit(os.path.join(root, name), entry)
+                    if item:
+                        yield item
+                if not recursive:
+                    break
+        elif glob.has_magic(entry):
+            for path in sorted(glob.glob(entry, recursive=recursive)):
+                if os.path.isfile(path):
+                    item = emit(path, None)
+                    if item:
+                        yield item
+        else:
+            # 普通文件即使扩展名不支持也交给引擎，由转换结果报告错误
+            key = os.path.normcase(os.path.abspath(entry))
+            if key not in seen:
+                seen.add(key)
+                yield entry, None
+
+
+class ConversionEngine:
+    """文档/图片转PDF引擎，不依赖任何界面，可在服务器上无人值守运行"""
+
+    def __init__(self, output_dir=None, office_type=_NOT_DETECTED, ocr_lang=ocr.DEFAULT_LANG,
+                 doc_workers=1, docs_per_worker=DEFAULT_DOCS_PER_WORKER,
+                 doc_timeout=DEFAULT_DOC_TIMEOUT, backend_factory=None, image_options=None,
+                 max_image_pixels=None, ocr_config="", ocr_cache=None, ocr_threads=None,
+                 searchable=False, ocr_preprocess=None, manifest=None,
+                 pdf_dpi=pdfs.DEFAULT_PDF_DPI, pdf_rasterize=False, pdf_workers=None,
+                 office_text=False, text_font=None, output_cache=None, ocr_auto=False):
+        self.output_dir = output_dir
+        self.ocr_lang = ocr_lang
+        # Tesseract 额外参数（如 "--psm 6"）、识别结果缓存（OcrCache）和每个进程的线程数
+        self.ocr_config = ocr_config
+        self.ocr_cache = ocr_cache
+        self.ocr_threads = ocr_threads
+        # OCR 前的图片预处理（PreprocessOptions），None 表示把原图直接交给 Tesseract
+        self.ocr_preprocess = ocr_preprocess
+        # 识别前先用 OSD 检测方向和文字种类：自动转正，只加载需要的语言包
+        self.ocr_auto = ocr_auto
+        # 图片转PDF时是否同时OCR并附加不可见文字层（可搜索PDF）
+        self.searchable = searchable
+        self.image_options = image_options or images.ImageEncodeOptions()
+        # 解压炸弹像素上限，None 表示使用全局设置
+        self.max_image_pixels = max_image_pixels
+        # PDF 输入：默认原样复制；pdf_rasterize 或 searchable 时按 pdf_dpi 栅格化，
+        # 每个PDF由 pdf_workers 个线程按页并行渲染和OCR（None 表示CPU核数）
+        self.pdf_dpi = pdf_dpi
+        self.pdf_rasterize = pdf_rasterize
+        self.pdf_workers = pdf_workers
+        # 纯文本/网页/XML 默认直接排版，不需要办公软件；office_text 时仍交给办公软件。
+        # text_font 为排版使用的字体（"路径" 或 "路径#序号"），None 表示自动查找中文字体
+        self.office_text = office_text
+        self.text_font = text_font
+        # 增量转换清单（ConversionManifest），设置后跳过未变化的文件
+        self.manifest = manifest
+        # 按内容寻址的输出缓存（OutputCache），内容相同的文件只转换一次
+        self.output_cache = output_cache
+        self._office_type = office_type
+        # 办公软件实例池参数，实例池在第一次转换文档时才创建
+        self.doc_workers = max(doc_workers, 1)
+        self.docs_per_worker = docs_per_worker
+        self.doc_timeout = doc_timeout
+        self.backend_factory = backend_factory
+        self._doc_pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def office_type(self):
+        """使用的文档转换后端名称（见 backends.backend_names），首次访问时才自动检测"""
+        if self._office_type is _NOT_DETECTED:
+            self._office_type = documents.detect_office()
+        return self._office_type
+
+    @office_type.setter
+    def office_type(self, value):
+        self._office_type = value
+
+    @property
+    def document_pool(self):
+        """复用的办公软件实例池，首次访问时创建"""
+        with self._pool_lock:
+            if self._doc_pool is None:
+                factory = self.backend_factory
+                if factory is None:
+                    office_type = self.office_type
+                    if not office_type:
+                        raise ConversionError("未检测到Office软件，无法转换文档！")
+                    factory = lambda: create_backend(office_type)
+                self._doc_pool = DocumentWorkerPool(
+                    factory,
+                    size=self.doc_workers,
+                    docs_per_worker=self.docs_per_worker,
+                    timeout=self.doc_timeout,
+                )
+            return self._doc_pool
+
+    def close(self):
+        """退出所有仍在运行的办公软件实例"""
+        with self._pool_lock:
+            pool, self._doc_pool = self._doc_pool, None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def renders_text(self, source):
+        """该文档是否直接排版为PDF（不经办公软件）"""
+        return not self.office_text and os.path.splitext(source)[1].lower() in TEXT_DOC_EXTS
+
+    def options_key(self, kind, ocr_text=False, source=None):
+        """影响输出内容的参数描述，按文件类型区分：修改图片参数不会让文档重新转换
+
+        文档的描述与转换方式有关，需要提供 source 才能区分直接排版的纯文本类文档。
+        """
+        if ocr_text:
+            key = f"text:{self.ocr_lang}:{self._cache_config()}"
+            return f"{key}:pdf:{self.pdf_dpi}" if kind == KIND_PDF else key
+        if kind == KIND_PDF:
+            if not (self.pdf_rasterize or self.searchable):
+                return "pdf:copy"
+            key = f"pdf:{self.pdf_dpi}:{self.image_options.key()}"
+            if self.searchable:
+                key += f":searchable:{self.ocr_lang}:{self._cache_config()}"
+            return key
+        if kind == KIND_IMAGE:
+            key = f"image:{self.image_options.key()}"
+            if self.searchable:
+                key += f":searchable:{self.ocr_lang}:{self._cache_config()}"
+            return key
+        if kind == KIND_DOCUMENT and source is not None and self.renders_text(source):
+            return f"document:text:{self.text_font or 'auto'}"
+        return f"document:{self.office_type}"
+
+    def output_path_for(self, source, output_dir=None, base_dir=None, ext=".pdf", name=None):
+        """生成输出路径：默认与源文件同名，从目录展开的文件保留相对子目录
+
+        name 为输出文件名（不含扩展名），用于避开同名冲突（见 assign_names）。
+        """
+        output_dir = output_dir or self.output_dir
+        if not output_dir:
+            raise ConversionError("未指定输出目录！")
+        if name is None:
+            name = os.path.splitext(os.path.basename(source))[0]
+        name += ext
+        if base_dir:
+            rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(source)),
+                                      os.path.abspath(base_dir))
+            if rel_dir != os.curdir:
+                output_dir = os.path.join(output_dir, rel_dir)
+        return os.path.join(output_dir, name)
+
+    def validate_image(self, image_path):
+        """验证图片文件是否有效（只检查文件头），无效时抛出 ConversionError"""
+        images.validate_image(image_path, self.max_image_pixels)
+
+    def convert_image(self, image_path, pdf_path, searchable=None):
+        """图片转PDF（打开时校验，只解码一次），失败抛出 ConversionError
+
+        searchable 为真时在同一次解码上做OCR，生成带不可见文字层的可搜索PDF。
+        """
+        if searchable is None:
+            searchable = self.searchable
+        words_for = self._words_provider(image_path) if searchable else None
+        images.convert_image_to_pdf(image_path, pdf_path, self.image_options,
+                                    self.max_image_pixels, words_for)
+
+    def _cache_config(self):
+        """缓存键中的识别参数：预处理方式、是否自动检测方向不同，识别结果也不同"""
+        config = self.ocr_config
+        if self.ocr_preprocess is not None:
+            config += f"\0preprocess={self.ocr_preprocess.key()}"
+        if self.ocr_auto:
+            config += "\0auto"
+        return config
+
+    def _orientation(self, img, digest=None, index=0):
+        """ocr_auto 时检测一页的方向和文字种类（ocr.Orientation），否则返回 None
+
+        设置了 ocr_cache 且提供了文件内容哈希时，检测结果按哈希和页序号缓存。
+        """
+        if not self.ocr_auto:
+            return None
+        key = None
+        if digest is not None and self.ocr_cache is not None:
+            key = self.ocr_cache.make_key(f"{digest}#{index}", "osd")
+            cached = self.ocr_cache.get(key)
+            if cached is not None:
+                data = json.loads(cached)
+                return ocr.Orientation.from_dict(data) if data else None
+        osd = ocr.detect_orientation(img)
+        if key is not None:
+            self.ocr_cache.put(key, json.dumps(osd.to_dict() if osd else None))
+        return osd
+
+    def _words_provider(self, image_path, variant=""):
+        """返回 words_for(帧, 帧序号) 函数：识别一帧的文字框，设置了缓存时按内容哈希缓存
+
+        variant 区分同一文件的不同识别方式（如PDF的栅格化分辨率）。
+        """
+        digest = None
+        if self.ocr_cache is not None and os.path.exists(image_path):
+            digest = file_digest(image_path)
+        lang, config, preprocess = self.ocr_lang, self.ocr_config, self.ocr_preprocess
+        cache_config = "words\0" + self._cache_config() + variant
+
+        def words_for(frame, index):
+            key = None
+            if digest is not None:
+                key = self.ocr_cache.make_key(f"{digest}#{index}", lang, cache_config)
+                cached = self.ocr_cache.get(key)
+                if cached is not None:
+                    return [tuple(word) for word in json.loads(cached)]
+            words = ocr.image_to_words(frame, lang, config, preprocess,
+                                       self._orientation(frame, digest, index))
+            if key is not None:
+                self.ocr_cache.put(key, json.dumps(words, ensure_ascii=False))
+            return words
+
+        return words_for
+
+    def convert_document(self, doc_path, pdf_path):
+        """文档转PDF，失败抛出 ConversionError
+
+        办公软件先写入临时文件，成功后才替换为目标文件，其他程序不会读到写了一半的PDF。
+        纯文本/网页/XML 默认直接排版（见 textpdf），不需要办公软件。
+        """
+        if not os.path.exists(doc_path):
+            raise ConversionError(f"文件不存在: {doc_path}")
+        if self.renders_text(doc_path):
+            textpdf.render_text_to_pdf(doc_path, pdf_path, self.text_font)
+            return
+        tmp_path = partial_path(pdf_path)
+        try:
+            self.document_pool.convert(doc_path, tmp_path)
+            os.replace(tmp_path, pdf_path)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+
+    def _pdf_page_workers(self):
+        workers = self.pdf_workers or os.cpu_count() or 1
+        if workers > 1:
+            # 多个 Tesseract 同时运行时，每个进程各自开满线程只会互相争抢CPU
+            ocr.set_thread_limit(self.ocr_threads or 1)
+        return workers
+
+    def convert_pdf(self, source, pdf_path, searchable=None):
+        """PDF 输入：默认校验后原样复制，不需要办公软件，失败抛出 ConversionError
+
+        设置了 pdf_rasterize 或 searchable 时按页栅格化，searchable 时各页并行OCR，
+        生成带不可见文字层的可搜索PDF。
+        """
+        if searchable is None:
+            searchable = self.searchable
+        if not (searchable or self.pdf_rasterize):
+            tmp_path = partial_path(pdf_path)
+            try:
+                pdfs.copy_pdf(source, tmp_path)
+                os.replace(tmp_path, pdf_path)
+            except BaseException:
+                _remove_quietly(tmp_path)
+                raise
+            return
+        words_for = None
+        if searchable:
+            words_for = self._words_provider(source, f"\0pdf_dpi={self.pdf_dpi}")
+        pdfs.rasterize_pdf(source, pdf_path, self.pdf_dpi, self.image_options,
+                           self._pdf_page_workers(), words_for)
+
+    def extract_pdf_text(self, pdf_path, lang=None):
+        """栅格化PDF并按页并行识别文字，失败抛出 ConversionError
+
+        设置了 ocr_cache 时每页按 PDF 内容哈希和页序号缓存。
+        """
+        lang = lang or self.ocr_lang
+        digest = file_digest(pdf_path) if self.ocr_cache is not None else None
+        cache_config = f"{self._cache_config()}\0pdf_dpi={self.pdf_dpi}"
+
+        def text_for(img, index):
+            key = None
+            if digest is not None:
+                key = self.ocr_cache.make_key(f"{digest}#{index}", lang, cache_config)
+                text = self.ocr_cache.get(key)
+                if text is not None:
+                    return text
+            text = ocr.image_to_text(img, lang, self.ocr_config, self.ocr_preprocess,
+                                     self._orientation(img, digest, index))
+            if key is not None:
+                self.ocr_cache.put(key, text)
+            return text
+
+        return pdfs.extract_text(pdf_path, text_for, self.pdf_dpi, self._pdf_page_workers())
+
+    def extract_text(self, image_path, lang=None):
+        """从图片中提取文字，失败抛出 ConversionError
+
+        设置了 ocr_cache 时先按文件内容哈希查缓存，命中则不解码也不调用 Tesseract。
+        """
+        lang = lang or self.ocr_lang
+        key = digest = None
+        if self.ocr_cache is not None:
+            if not os.path.exists(image_path):
+                raise ConversionError(f"文件不存在: {image_path}")
+            with metrics.stage("ocr_cache_lookup", source=image_path):
+                digest = file_digest(image_path)
+                key = self.ocr_cache.make_key(digest, lang, self._cache_config())
+                text = self.ocr_cache.get(key)
+            if text is not None:
+                return text
+        if self.ocr_auto:
+            with metrics.source(image_path), \
+                    images.open_image(image_path, self.max_image_pixels) as img:
+                text = ocr.image_to_text(img, lang, self.ocr_config, self.ocr_preprocess,
+                                         self._orientation(img, digest))
+        else:
+            text = ocr.extract_text(image_path, lang=lang, config=self.ocr_config,
+                                    max_pixels=self.max_image_pixels,
+                                    preprocess=self.ocr_preprocess)
+        if key is not None:
+            self.ocr_cache.put(key, text)
+        return text
+
+    def extract_text_batch(self, image_paths, lang=None):
+        """用一个 Tesseract 进程识别多张图片，返回与 image_paths 对应的列表
+
+        列表中每一项是识别出的文字，或该图片的 ConversionError（一张图片无效不影响其他图片）。
+        缓存命中的图片不参与识别。
+        """
+        lang = lang or self.ocr_lang
+        results = [None] * len(image_paths)
+        keys = [None] * len(image_paths)
+        digests = [None] * len(image_paths)
+        pending = []
+        with ExitStack() as stack:
+            for index, image_path in enumerate(image_paths):
+                try:
+                    if self.ocr_cache is not None:
+                        if not os.path.exists(image_path):
+                            raise ConversionError(f"文件不存在: {image_path}")
+                        digests[index] = file_digest(image_path)
+                        keys[index] = self.ocr_cache.make_key(digests[index], lang,
+                                                              self._cache_config())
+                        text = self.ocr_cache.get(keys[index])
+                        if text is not None:
+                            results[index] = text
+                            continue
+                    img = stack.enter_context(images.open_image(image_path, self.max_image_pixels))
+                    pending.append((index, img))
+                except ConversionError as e:
+                    results[index] = e
+            if pending:
+                try:
+                    osds = None
+                    if self.ocr_auto:
+                        osds = [self._orientation(img, digests[index]) for index, img in pending]
+                    texts = ocr.images_to_text([img for _, img in pending], lang, self.ocr_config,
+                                               self.ocr_preprocess, osds)
+                except ConversionError as e:
+                    texts = [e] * len(pending)
+                for (index, _), text in zip(pending, texts):
+                    results[index] = text
+                    if keys[index] is not None and isinstance(text, str):
+                        self.ocr_cache.put(keys[index], text)
+        return results
+
+    def _produce(self, source, output, options, convert):
+        """调用 convert() 生成输出；设置了输出缓存时先按内容哈希查找，命中则不再转换
+
+        返回 (源文件内容哈希, 是否命中缓存)，没有输出缓存时哈希为 None。
+        """
+        cache = self.output_cache
+        if cache is None:
+            convert()
+            return None, False
+        with metrics.stage("hash", size=os.path.getsize(source)):
+            digest = file_digest(source)
+        key = cache.make_key(digest, options)
+        with cache.locked(key):
+            if cache.fetch(key, output):
+                return digest, True
+            convert()
+            cache.store(key, output)
+        return digest, False
+
+    def _finish(self, result, target, options, digest):
+        """记录成功的转换：暂存的输出留给 commit_output，否则直接写入清单"""
+        if target != result.output:
+            result.staged = (target, options, digest)
+        elif self.manifest is not None:
+            self.manifest.record(result.source, result.output, options, digest)
+
+    def commit_output(self, result):
+        """把暂存的输出移到 result.output 并补记清单和指标，失败记录在结果中"""
+        staged, options, digest = result.staged
+        result.staged = None
+        start = time.perf_counter()
+        try:
+            with metrics.stage("output_commit", source=result.source,
+                               size=os.path.getsize(staged)):
+                _move_output(staged, result.output)
+            if self.manifest is not None:
+                self.manifest.record(result.source, result.output, options, digest)
+        except Exception as e:
+            _remove_quietly(staged)
+            result.error = f"无法写入输出文件: {str(e)}"
+        result.elapsed += time.perf_counter() - start
+        _record_file(result)
+        return result
+
+    def convert_file(self, source, output_dir=None, base_dir=None, staging_dir=None, name=None):
+        """转换单个文件，错误记录在返回结果中而不是抛出
+
+        提供 staging_dir（本机目录）时输出先写入该目录，result.staged 记录暂存文件，
+        由调用方用 commit_output 移到输出目录（见 pipeline.write_behind）。
+        name 为输出文件名（不含扩展名），默认与源文件同名。
+        """
+        start = time.perf_counter()
+        kind = file_kind(source)
+        result = ConversionResult(source, kind=kind)
+        target = None
+        try:
+            if kind is None:
+                raise ConversionError(f"不支持的文件格式: {os.path.basename(source)}")
+            pdf_path = self.output_path_for(source, output_dir, base_dir, name=name)
+            options = None
+            if self.manifest is not None or self.output_cache is not None:
+                options = self.options_key(kind, source=source)
+            if self.manifest is not None and self.manifest.is_current(source, pdf_path, options):
+                result.output, result.skipped = pdf_path, True
+            else:
+                os.makedirs(os.path.dirname(pdf_path) or ".", exist_ok=True)
+                target = pdf_path if staging_dir is None else _staging_path(pdf_path, staging_dir)
+
+                def convert():
+                    if kind == KIND_IMAGE:
+                        self.convert_image(source, target)
+                    elif kind == KIND_PDF:
+                        self.convert_pdf(source, target)
+                    else:
+                        self.convert_document(source, target)
+
+                with metrics.source(source):
+                    digest, result.cached = self._produce(source, target, options, convert)
+                result.output = pdf_path
+                self._finish(result, target, options, digest)
+        except ConversionError as e:
+            result.error = str(e)
+        except Exception as e:
+            result.error = f"转换过程中发生错误: {str(e)}"
+        if result.error is not None and target is not None and staging_dir is not None:
+            _remove_quietly(target)
+        result.elapsed = time.perf_counter() - start
+        if result.staged is None:
+            _record_file(result)
+        return result
+
+    def merge_images(self, image_paths, pdf_path, progress=None):
+        """按顺序把多张图片合并为一个多页PDF，错误记录在返回结果中
+
+        progress(已完成数, 总数) 为可选的进度回调，在回调中抛出 ConversionError 可中止合并。
+        """
+        start = time.perf_counter()
+        result = ConversionResult(pdf_path, kind=KIND_IMAGE)
+        try:
+            image_paths = list(image_paths)
+            for image_path in image_paths:
+                if file_kind(image_path) != KIND_IMAGE:
+                    raise ConversionError(f"只能合并图片文件: {os.path.basename(image_path)}")
+            os.makedirs(os.path.dirname(pdf_path) or ".", exist_ok=True)
+            images.merge_images_to_pdf(image_paths, pdf_path, self.image_options,
+                                       self.max_image_pixels,
+                                       self._words_provider if self.searchable else None,
+                                       progress)
+            result.output = pdf_path
+        except ConversionError as e:
+            result.error = str(e)
+        except Exception as e:
+            result.error = f"图片合并失败: {str(e)}"
+        result.elapsed = time.perf_counter() - start
+        _record_file(result)
+        return result
+
+    def extract_text_to_file(self, source, output_dir=None, base_dir=None, staging_dir=None,
+                             name=None):
+        """对图片（或栅格化后的PDF）执行文字识别并写入同名 .txt 文件
+
+        staging_dir 和 name 的含义与 convert_file 相同。
+        """
+        start = time.perf_counter()
+        kind = file_kind(source)
+        result = ConversionResult(source, kind=kind)
+        target = None
+        try:
+            if kind not in (KIND_IMAGE, KIND_PDF):
+                raise ConversionError(f"仅支持从图片或PDF中提取文字: {os.path.basename(source)}")
+            txt_path = self.output_path_for(source, output_dir, base_dir, ext=".txt", name=name)
+            options = None
+            if self.manifest is not None or self.output_cache is not None:
+                options = self.options_key(kind, ocr_text=True)
+            if self.manifest is not None and self.manifest.is_current(source, txt_path, options):
+                result.output, result.skipped = txt_path, True
+            else:
+                os.makedirs(os.path.dirname(txt_path) or ".", exist_ok=True)
+                target = txt_path if staging_dir is None else _staging_path(txt_path, staging_dir)
+
+                def extract():
+                    if kind == KIND_PDF:
+                        text = self.extract_pdf_text(source)
+                    else:
+                        text = self.extract_text(source)
+                    tmp_path = partial_path(target)
+                    try:
+                        with open(tmp_path, "w", encoding="utf-8") as f:
+                            f.write(text)
+                        os.replace(tmp_path, target)
+                    except BaseException:
+                        _remove_quietly(tmp_path)
+                        raise
+
+                with metrics.source(source):
+                    digest, result.cached = self._produce(source, target, options, extract)
+                result.output = txt_path
+                self._finish(result, target, options, digest)
+        except ConversionError as e:
+            result.error = str(e)
+        except Exception as e:
+            result.error = f"文字提取失败: {str(e)}"
+        if result.error is not None and target is not None and staging_dir is not None:
+            _remove_quietly(target)
+        result.elapsed = time.perf_counter() - start
+        if result.staged is None:
+            _record_file(result)
+        return result
+
+    def convert_many(self, inputs, output_dir=None, recursive=True, ocr_text=False,
+                     workers=1, max_pending=None, prefetch=0,
+                     prefetch_bytes=pipeline.DEFAULT_PREFETCH_BYTES, staging_dir=None):
+        """批量转换文件/目录/通配符，逐个产出 ConversionResult
+
+        workers 大于 1 时图片分发到多进程并行转换（OCR 模式下为并行的 Tesseract 进程）；
+        doc_workers 大于 1 时多个办公软件实例同时转换文档。并行时结果按完成顺序产出。
+        prefetch 大于 0 时后台预读后面的输入文件；提供 staging_dir 时输出先写入该
+        本机目录，由后台线程移到输出目录（见 pipeline），转换不必等待读写。
+        """
+        items = self.assign_names(iter_inputs(inputs, recursive=recursive), output_dir,
+                                  ".txt" if ocr_text else ".pdf")
+        if prefetch:
+            items = pipeline.prefetch(
+                items, prefetch, prefetch_bytes,
+                wanted=lambda item: self._needs_input(item, output_dir, ocr_text))
+        if staging_dir is not None:
+            os.makedirs(staging_dir, exist_ok=True)
+        results = self._convert_items(items, output_dir, ocr_text, workers, max_pending,
+                                      staging_dir)
+        if staging_dir is not None:
+            results = pipeline.write_behind(self, results)
+        yield from results
+
+    def assign_names(self, items, output_dir=None, ext=".pdf", claimed=None):
+        """为 (源文件, 相对根目录) 分配不冲突的输出文件名，产出 (源文件, 相对根目录, 文件名)
+
+        同一目录中的 a.jpg、a.png、a.docx 默认都会输出为 a.pdf：先出现的沿用 a.pdf，
+        后面的保留源文件扩展名（a.png.pdf），仍然冲突时再加序号（a.png-2.pdf）。
+        输入按固定顺序展开，同一批输入每次得到的文件名相同。
+
+        claimed 为调用方保存的 {path_key(输出路径): 占用者} 字典，分配的输出路径以
+        path_key(源文件) 为占用者加入其中：跨批次保存它（如监视文件夹、界面的任务队列）
+        时，之前分配的名字不会再分给其他文件，同一个源文件再次转换时沿用原来的名字。
+        """
+        claimed = {} if claimed is None else claimed
+        # 本次调用分配过的路径：同一个文件重复出现时也不共用输出
+        assigned = set()
+        for source, base_dir in items:
+            owner = path_key(source)
+            basename = os.path.basename(source)
+            candidates = [os.path.splitext(basename)[0], basename]
+            name = None
+            for index in itertools.count(2):
+                candidate = candidates.pop(0) if candidates else f"{basename}-{index}"
+                try:
+                    path = self.output_path_for(source, output_dir, base_dir, ext, candidate)
+                except ConversionError:
+                    # 没有输出目录，由转换报告错误
+                    break
+                key = path_key(path)
+                if key not in assigned and claimed.get(key, owner) == owner:
+                    claimed[key] = owner
+                    assigned.add(key)
+                    name = candidate
+                    break
+            yield source, base_dir, name
+
+    def _needs_input(self, item, output_dir, ocr_text):
+        """转换是否需要读取该文件：增量转换中没有变化的文件会被跳过，不必预读"""
+        source, base_dir, name = item
+        kind = file_kind(source)
+        if kind is None:
+            return False
+        if self.manifest is None:
+            return True
+        output = self.output_path_for(source, output_dir, base_dir,
+                                      ext=".txt" if ocr_text else ".pdf", name=name)
+        options = self.options_key(kind, ocr_text=ocr_text, source=source)
+        return not self.manifest.is_current(source, output, options)
+
+    def _convert_items(self, items, output_dir, ocr_text, workers, max_pending, staging_dir):
+        if ocr_text and workers != 1:
+            from .parallel import extract_text_parallel
+            yield from extract_text_parallel(self, items, output_dir, workers=workers,
+                                             max_pending=max_pending, staging_dir=staging_dir)
+            return
+        if not ocr_text and (workers != 1 or self.doc_workers > 1):
+            from .parallel import convert_parallel
+            yield from convert_parallel(self, items, output_dir, workers=workers,
+                                        max_pending=max_pending, staging_dir=staging_dir)
+            return
+        handler = self.extract_text_to_file if ocr_text else self.convert_file
+        for source, base_dir, name in items:
+            yield handler(source, output_dir, base_dir, staging_dir, name)
@@ -0,0 +1,5 @@
+"""转换过程中使用的异常类型"""
+
+
+class ConversionError(Exception):
+    """转换失败（文件无效、转换组件不可用等）"""
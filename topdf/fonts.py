@@ -0,0 +1,513 @@
+"""文本渲染使用的中文字体：读取 TrueType 字体并把用到的字形子集嵌入PDF
+
+只依赖标准库。支持 TrueType 轮廓（glyf 表）的 .ttf 和 .ttc 字体，如 Windows 自带的
+宋体、黑体、微软雅黑，Linux 上的文泉驿、Droid Sans Fallback。子集保留原来的字形编号
+（未用到的字形清空），PDF 中以字形编号作为 CID（Identity-H 编码、CIDToGIDMap 恒等映射），
+组合字形引用的部件也不需要重新编号。
+
+找不到可用字体时退回 PDF 阅读器自带的 STSong-Light（Adobe-GB1 预定义字体，不嵌入），
+在装有中文字体的阅读器中同样可以显示。
+"""
+import bisect
+import hashlib
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+
+# 常见的中文字体位置，(路径, TTC 中的字体序号)
+FONT_CANDIDATES = [
+    (r"C:\Windows\Fonts\simsun.ttc", 0),
+    (r"C:\Windows\Fonts\msyh.ttc", 0),
+    (r"C:\Windows\Fonts\msyh.ttf", 0),
+    (r"C:\Windows\Fonts\simhei.ttf", 0),
+    ("/usr/share/fonts/truetype/wqy/wqy-microhei.ttc", 0),
+    ("/usr/share/fonts/wqy-microhei/wqy-microhei.ttc", 0),
+    ("/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc", 0),
+    ("/usr/share/fonts/wqy-zenhei/wqy-zenhei.ttc", 0),
+    ("/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf", 0),
+    ("/usr/share/fonts/google-droid/DroidSansFallback.ttf", 0),
+    ("/Library/Fonts/Arial Unicode.ttf", 0),
+]
+
+# 子集字体需要的表（cmap 由子集重新生成）
+_REQUIRED_TABLES = (b"head", b"hhea", b"maxp", b"hmtx", b"loca", b"glyf", b"cmap")
+# 字形微调（hinting）用到的表，存在时原样保留
+_HINTING_TABLES = (b"cvt ", b"fpgm", b"prep")
+
+# 组合字形的标志位
+_ARG_1_AND_2_ARE_WORDS = 0x0001
+_WE_HAVE_A_SCALE = 0x0008
+_MORE_COMPONENTS = 0x0020
+_WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+_WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+_FALLBACK_FONT_NAME = "STSong-Light"
+_ASTRAL_CHARS = re.compile("[\U00010000-\U0010FFFF]")
+
+
+class FontError(Exception):
+    """字体文件无法读取或格式不支持"""
+
+
+def _checksum(data):
+    data = data + b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+class TrueTypeFont:
+    """只读的 TrueType 字体：字符到字形的映射、字形宽度和子集生成
+
+    除字形轮廓（glyf 表，通常占字体的大部分）外的表在打开时读入，轮廓在生成子集时
+    才按需从文件读取。可以在多个线程之间共享。
+    """
+
+    def __init__(self, path, index=0):
+        self.path = path
+        self.index = index
+        with open(path, "rb") as f:
+            self._tables = self._read_directory(f, index)
+            for tag in _REQUIRED_TABLES:
+                if tag not in self._tables:
+                    raise FontError(f"字体缺少 {tag.decode().strip()} 表: {path}")
+            self._data = {tag: self._read_table(f, tag)
+                          for tag in (b"head", b"hhea", b"maxp", b"hmtx", b"loca", b"cmap",
+                                      b"OS/2", b"name") + _HINTING_TABLES
+                          if tag in self._tables}
+        head, hhea = self._data[b"head"], self._data[b"hhea"]
+        self.units_per_em = struct.unpack_from(">H", head, 18)[0]
+        self.bbox = struct.unpack_from(">4h", head, 36)
+        long_loca = struct.unpack_from(">h", head, 50)[0] == 1
+        self.ascent, self.descent = struct.unpack_from(">hh", hhea, 4)
+        self.num_hmetrics = struct.unpack_from(">H", hhea, 34)[0]
+        self.num_glyphs = struct.unpack_from(">H", self._data[b"maxp"], 4)[0]
+        self._advances = struct.unpack_from(f">{self.num_hmetrics * 2}H",
+                                            self._data[b"hmtx"])[0::2]
+        loca = self._data[b"loca"]
+        if long_loca:
+            self._loca = struct.unpack_from(f">{self.num_glyphs + 1}I", loca)
+        else:
+            self._loca = [offset * 2 for offset in
+                          struct.unpack_from(f">{self.num_glyphs + 1}H", loca)]
+        self._lookup = self._parse_cmap(self._data[b"cmap"])
+        self.cap_height = self.ascent
+        os2 = self._data.get(b"OS/2")
+        if os2 and len(os2) >= 90 and struct.unpack_from(">H", os2, 0)[0] >= 2:
+            self.cap_height = struct.unpack_from(">h", os2, 88)[0]
+        self.postscript_name = self._postscript_name()
+        self._gid_cache = {}
+        self._lock = threading.Lock()
+
+    def _read_directory(self, f, index):
+        tag = f.read(4)
+        offset = 0
+        if tag == b"ttcf":
+            f.seek(8)
+            count = struct.unpack(">I", f.read(4))[0]
+            if index >= count:
+                raise FontError(f"字体集合中只有 {count} 个字体: {self.path}")
+            f.seek(12 + index * 4)
+            offset = struct.unpack(">I", f.read(4))[0]
+            f.seek(offset)
+            tag = f.read(4)
+        if tag == b"OTTO":
+            raise FontError(f"不支持 CFF 轮廓的 OpenType 字体: {self.path}")
+        if tag not in (b"\0\1\0\0", b"true"):
+            raise FontError(f"不是 TrueType 字体: {self.path}")
+        num_tables = struct.unpack(">H", f.read(2))[0]
+        f.seek(offset + 12)
+        tables = {}
+        for _ in range(num_tables):
+            tag, _, table_offset, length = struct.unpack(">4sIII", f.read(16))
+            tables[tag] = (table_offset, length)
+        return tables
+
+    def _read_table(self, f, tag):
+        offset, length = self._tables[tag]
+        f.seek(offset)
+        data = f.read(length)
+        if len(data) != length:
+            raise FontError(f"字体文件被截断: {self.path}")
+        return data
+
+    def _parse_cmap(self, cmap):
+        """选出 Unicode 映射子表，返回 lookup(码位) -> 字形编号"""
+        count = struct.unpack_from(">H", cmap, 2)[0]
+        subtables = {}
+        for i in range(count):
+            platform, encoding, offset = struct.unpack_from(">HHI", cmap, 4 + i * 8)
+            subtables[(platform, encoding)] = offset
+        for key in ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3)):
+            offset = subtables.get(key)
+            if offset is None:
+                continue
+            fmt = struct.unpack_from(">H", cmap, offset)[0]
+            if fmt == 12:
+                return self._cmap_format12(cmap, offset)
+            if fmt == 4:
+                return self._cmap_format4(cmap, offset)
+        raise FontError(f"字体没有可用的 Unicode 字符映射: {self.path}")
+
+    @staticmethod
+    def _cmap_format4(cmap, offset):
+        seg_count = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+        ends = struct.unpack_from(f">{seg_count}H", cmap, offset + 14)
+        starts = struct.unpack_from(f">{seg_count}H", cmap, offset + 16 + seg_count * 2)
+        deltas = struct.unpack_from(f">{seg_count}h", cmap, offset + 16 + seg_count * 4)
+        range_base = offset + 16 + seg_count * 6
+        range_offsets = struct.unpack_from(f">{seg_count}H", cmap, range_base)
+
+        def lookup(code):
+            i = bisect.bisect_left(ends, code)
+            if code > 0xFFFF or i >= seg_count or starts[i] > code:
+                return 0
+            if range_offsets[i] == 0:
+                return (code + deltas[i]) & 0xFFFF
+            address = range_base + i * 2 + range_offsets[i] + (code - starts[i]) * 2
+            if address + 2 > len(cmap):
+                return 0
+            gid = struct.unpack_from(">H", cmap, address)[0]
+            return (gid + deltas[i]) & 0xFFFF if gid else 0
+
+        return lookup
+
+    @staticmethod
+    def _cmap_format12(cmap, offset):
+        count = struct.unpack_from(">I", cmap, offset + 12)[0]
+        groups = struct.unpack_from(f">{count * 3}I", cmap, offset + 16)
+        starts, ends, first_gids = groups[0::3], groups[1::3], groups[2::3]
+
+        def lookup(code):
+            i = bisect.bisect_right(starts, code) - 1
+            if i < 0 or code > ends[i]:
+                return 0
+            return first_gids[i] + code - starts[i]
+
+        return lookup
+
+    def _postscript_name(self):
+        """name 表中的 PostScript 名称（只保留PDF名称中安全的字符）"""
+        name = self._data.get(b"name")
+        value = None
+        if name:
+            count, string_offset = struct.unpack_from(">HH", name, 2)
+            for i in range(count):
+                platform, encoding, _, name_id, length, offset = struct.unpack_from(
+                    ">6H", name, 6 + i * 12)
+                if name_id != 6:
+                    continue
+                raw = name[string_offset + offset:string_offset + offset + length]
+                value = raw.decode("utf-16-be" if platform in (0, 3) else "latin-1",
+                                   errors="ignore")
+                break
+        value = value or os.path.splitext(os.path.basename(self.path))[0]
+        return "".join(ch for ch in value if ch.isascii() and (ch.isalnum() or ch == "-")) or "Font"
+
+    def glyph_id(self, char):
+        """字符对应的字形编号，字体中没有该字符时为 0（.notdef）"""
+        gid = self._gid_cache.get(char)
+        if gid is None:
+            gid = self._lookup(ord(char))
+            if gid >= self.num_glyphs:
+                gid = 0
+            self._gid_cache[char] = gid
+        return gid
+
+    def advance(self, gid):
+        """字形的前进宽度，单位为 1/1000 字号"""
+        advance = self._advances[min(gid, self.num_hmetrics - 1)]
+        return round(advance * 1000 / self.units_per_em)
+
+    def _glyph_data(self, f, gid):
+        start, end = self._loca[gid], self._loca[gid + 1]
+        if end <= start:
+            return b""
+        offset = self._tables[b"glyf"][0]
+        f.seek(offset + start)
+        return f.read(end - start)
+
+    @staticmethod
+    def _components(data):
+        """组合字形引用的部件字形编号"""
+        if len(data) < 10 or struct.unpack_from(">h", data, 0)[0] >= 0:
+            return []
+        components = []
+        pos = 10
+        while pos + 4 <= len(data):
+            flags, gid = struct.unpack_from(">HH", data, pos)
+            components.append(gid)
+            pos += 4 + (4 if flags & _ARG_1_AND_2_ARE_WORDS else 2)
+            if flags & _WE_HAVE_A_SCALE:
+                pos += 2
+            elif flags & _WE_HAVE_AN_X_AND_Y_SCALE:
+                pos += 4
+            elif flags & _WE_HAVE_A_TWO_BY_TWO:
+                pos += 8
+            if not flags & _MORE_COMPONENTS:
+                break
+        return components
+
+    def subset(self, chars_by_gid):
+        """只包含指定字形（及其组合部件）的字体文件，返回字节串
+
+        chars_by_gid 为 {字形编号: 字符}，用于生成子集的 cmap。字形编号保持不变。
+        """
+        glyphs = {}
+        pending = set(chars_by_gid) | {0}
+        with self._lock, open(self.path, "rb") as f:
+            while pending:
+                gid = pending.pop()
+                if gid in glyphs or gid >= self.num_glyphs:
+                    continue
+                glyphs[gid] = self._glyph_data(f, gid)
+                pending.update(self._components(glyphs[gid]))
+        num_glyphs = max(glyphs) + 1
+
+        glyf = bytearray()
+        loca = []
+        for gid in range(num_glyphs):
+            loca.append(len(glyf))
+            data = glyphs.get(gid, b"")
+            glyf += data + b"\0" * (-len(data) % 4)
+        loca.append(len(glyf))
+
+        # 水平度量：未用到的字形写 0，压缩后几乎不占空间
+        num_hmetrics = min(self.num_hmetrics, num_glyphs)
+        hmtx = self._data[b"hmtx"]
+        metrics = bytearray()
+        for gid in range(num_hmetrics):
+            metrics += hmtx[gid * 4:gid * 4 + 4] if gid in glyphs else b"\0\0\0\0"
+        for gid in range(num_hmetrics, num_glyphs):
+            pos = self.num_hmetrics * 4 + (gid - self.num_hmetrics) * 2
+            metrics += hmtx[pos:pos + 2] if gid in glyphs else b"\0\0"
+
+        head = bytearray(self._data[b"head"])
+        head[8:12] = b"\0\0\0\0"
+        struct.pack_into(">h", head, 50, 1)
+        hhea = bytearray(self._data[b"hhea"])
+        struct.pack_into(">H", hhea, 34, num_hmetrics)
+        maxp = bytearray(self._data[b"maxp"])
+        struct.pack_into(">H", maxp, 4, num_glyphs)
+        tables = {
+            b"head": bytes(head),
+            b"hhea": bytes(hhea),
+            b"maxp": bytes(maxp),
+            b"hmtx": bytes(metrics),
+            b"loca": struct.pack(f">{len(loca)}I", *loca),
+            b"glyf": bytes(glyf),
+            b"cmap": self._subset_cmap(chars_by_gid),
+        }
+        for tag in _HINTING_TABLES:
+            if tag in self._data:
+                tables[tag] = self._data[tag]
+        return _build_sfnt(tables)
+
+    @staticmethod
+    def _subset_cmap(chars_by_gid):
+        """子集的字符映射（Windows Unicode 完整字符集，格式 12），供不读 CID 映射的程序使用"""
+        pairs = sorted((ord(char), gid) for gid, char in chars_by_gid.items() if gid)
+        groups = []
+        for code, gid in pairs:
+            if groups and code == groups[-1][1] + 1 and gid == groups[-1][2] + code - groups[-1][0]:
+                groups[-1][1] = code
+            else:
+                groups.append([code, code, gid])
+        body = b"".join(struct.pack(">III", *group) for group in groups)
+        subtable = struct.pack(">HHIII", 12, 0, 16 + len(body), 0, len(groups)) + body
+        return struct.pack(">HHHHI", 0, 1, 3, 10, 12) + subtable
+
+
+def _build_sfnt(tables):
+    tags = sorted(tables)
+    count = len(tags)
+    selector = count.bit_length() - 1
+    search_range = (1 << selector) * 16
+    header = struct.pack(">IHHHH", 0x00010000, count, search_range, selector,
+                         count * 16 - search_range)
+    offset = 12 + 16 * count
+    directory, body = [], []
+    head_offset = 0
+    for tag in tags:
+        data = tables[tag]
+        if tag == b"head":
+            head_offset = offset
+        directory.append(struct.pack(">4sIII", tag, _checksum(data), offset, len(data)))
+        body.append(data + b"\0" * (-len(data) % 4))
+        offset += len(body[-1])
+    font = bytearray(header + b"".join(directory) + b"".join(body))
+    adjustment = (0xB1B0AFBA - _checksum(bytes(font))) & 0xFFFFFFFF
+    struct.pack_into(">I", font, head_offset + 8, adjustment)
+    return bytes(font)
+
+
+def _to_unicode(pairs):
+    """CID 到 Unicode 的映射，pairs 为 [(CID, 字符), ...]"""
+    lines = [
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+    ]
+    pairs = sorted(pairs)
+    for i in range(0, len(pairs), 100):
+        block = pairs[i:i + 100]
+        lines.append(f"{len(block)} beginbfchar")
+        lines.extend(f"<{cid:04X}> <{char.encode('utf-16-be').hex().upper()}>"
+                     for cid, char in block)
+        lines.append("endbfchar")
+    lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+    return "\n".join(lines).encode()
+
+
+class EmbeddedFont:
+    """一个PDF文件中使用的嵌入字体：记录用到的字形，写入时生成子集"""
+
+    embedded = True
+
+    def __init__(self, font):
+        self.font = font
+        self._chars = {}
+        # 字符 -> 内容流中的编码，每个字符只查一次 cmap
+        self._codes = {}
+
+    def covers(self, char):
+        """字体中是否有该字符的字形"""
+        return self.font.glyph_id(char) != 0
+
+    def width(self, char):
+        """字符宽度，单位为 1/1000 字号"""
+        return self.font.advance(self.font.glyph_id(char))
+
+    def encode(self, text):
+        """内容流中的字符串（十六进制，两字节字形编号）"""
+        codes = self._codes
+        for char in set(text).difference(codes):
+            gid = self.font.glyph_id(char)
+            self._chars.setdefault(gid, char)
+            codes[char] = f"{gid:04X}"
+        return "".join(map(codes.__getitem__, text))
+
+    def write(self, writer, font_id):
+        """把字体对象写入 writer（PdfWriter），font_id 为页面引用的预留编号"""
+        font = self.font
+        data = font.subset(self._chars)
+        # 子集字体名称带 6 个大写字母的前缀，不同子集不会被阅读器当作同一个字体
+        digest = hashlib.sha1(repr(sorted(self._chars)).encode()).digest()
+        tag = "".join(chr(ord("A") + b % 26) for b in digest[:6])
+        name = f"{tag}+{font.postscript_name}"
+        scale = 1000 / font.units_per_em
+        bbox = " ".join(str(round(v * scale)) for v in font.bbox)
+
+        file_id, descriptor_id, cid_font_id, cmap_id = (writer.reserve_object() for _ in range(4))
+        compressed = zlib.compress(data)
+        writer.write_object(file_id, f"/Filter /FlateDecode /Length1 {len(data)}", compressed)
+        writer.write_object(
+            descriptor_id,
+            f"<< /Type /FontDescriptor /FontName /{name} /Flags 4 /FontBBox [{bbox}] "
+            f"/ItalicAngle 0 /Ascent {round(font.ascent * scale)} "
+            f"/Descent {round(font.descent * scale)} /CapHeight {round(font.cap_height * scale)} "
+            f"/StemV 80 /FontFile2 {file_id} 0 R >>")
+        widths = " ".join(f"{gid} [{font.advance(gid)}]" for gid in sorted(self._chars))
+        writer.write_object(
+            cid_font_id,
+            f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} "
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /CIDToGIDMap /Identity "
+            f"/DW 1000 /W [{widths}] >>")
+        writer.write_object(cmap_id, "", _to_unicode(self._chars.items()))
+        writer.write_object(
+            font_id,
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{name} /Encoding /Identity-H "
+            f"/DescendantFonts [{cid_font_id} 0 R] /ToUnicode {cmap_id} 0 R >>")
+
+
+class StandardCjkFont:
+    """不嵌入的 Adobe-GB1 预定义字体 STSong-Light，由阅读器提供字形
+
+    UniGB-UCS2-H 编码直接使用两字节的 Unicode 码位；宽度按全角、半角两种估计。
+    """
+
+    embedded = False
+
+    def covers(self, char):
+        return True
+
+    def width(self, char):
+        code = ord(char)
+        return 500 if code < 0x2E80 or 0xFF61 <= code <= 0xFFDC else 1000
+
+    def encode(self, text):
+        # 基本多文种平面以外的字符没有两字节编码，显示为问号
+        return _ASTRAL_CHARS.sub("?", text).encode("utf-16-be").hex().upper()
+
+    def write(self, writer, font_id):
+        descriptor_id, cid_font_id = writer.reserve_object(), writer.reserve_object()
+        writer.write_object(
+            descriptor_id,
+            f"<< /Type /FontDescriptor /FontName /{_FALLBACK_FONT_NAME} /Flags 6 "
+            "/FontBBox [-25 -254 1000 880] /ItalicAngle 0 /Ascent 880 /Descent -120 "
+            "/CapHeight 880 /StemV 93 >>")
+        writer.write_object(
+            cid_font_id,
+            f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{_FALLBACK_FONT_NAME} "
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /DW 1000 /W [1 95 500] >>")
+        writer.write_object(
+            font_id,
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{_FALLBACK_FONT_NAME} "
+            f"/Encoding /UniGB-UCS2-H /DescendantFonts [{cid_font_id} 0 R] >>")
+
+
+# 已打开的字体：(路径, 序号) -> TrueTypeFont，同一进程中只解析一次
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def _parse_spec(spec):
+    """"路径" 或 "路径#序号"（TTC 字体集合中的第几个字体）"""
+    path, sep, index = spec.rpartition("#")
+    if sep and index.isdigit():
+        return path, int(index)
+    return spec, 0
+
+
+def load_font(spec=None):
+    """打开指定的字体（"路径" 或 "路径#序号"），未指定时查找常见的中文字体
+
+    返回 TrueTypeFont，找不到可用字体时返回 None；指定的字体无法使用时抛出 FontError。
+    """
+    if spec:
+        candidates = [_parse_spec(spec)]
+    else:
+        candidates = FONT_CANDIDATES
+        if sys.platform == "win32":
+            windir = os.environ.get("WINDIR", r"C:\Windows")
+            candidates = [(path.replace(r"C:\Windows", windir, 1), index)
+                          for path, index in candidates]
+        candidates = [(path, index) for path, index in candidates if os.path.exists(path)]
+    for path, index in candidates:
+        key = (os.path.abspath(path), index)
+        with _fonts_lock:
+            font = _fonts.get(key)
+            if font is None:
+                try:
+                    font = _fonts[key] = TrueTypeFont(path, index)
+                except (OSError, struct.error, FontError) as e:
+                    if spec:
+                        raise FontError(f"无法使用字体 {spec}: {e}") from e
+                    continue
+        return font
+    return None
+
+
+def document_font(spec=None):
+    """为一个PDF文件创建字体：有可用的中文字体时嵌入子集，否则使用 STSong-Light"""
+    font = load_font(spec)
+    return EmbeddedFont(font) if font is not None else StandardCjkFont()
@@ -0,0 +1,60 @@
+"""支持的文件格式定义"""
+import os
+
+# 支持的文档格式
+SUPPORTED_DOC_FORMATS = [
+    ('Word 文档', '*.doc;*.docx'),
+    ('Word 模板', '*.dot;*.dotx'),
+    ('启用宏的文档', '*.docm;*.dotm'),
+    ('富文本格式', '*.rtf'),
+    ('纯文本', '*.txt'),
+    ('网页格式', '*.htm;*.html'),
+    ('OpenDocument', '*.odt'),
+    ('XML 文档', '*.xml'),
+    ('PDF 文档', '*.pdf')
+]
+
+# 支持的图片格式
+SUPPORTED_IMAGE_FORMATS = [
+    ('JPEG 图片', '*.jpg;*.jpeg'),
+    ('PNG 图片', '*.png'),
+    ('BMP 图片', '*.bmp'),
+    ('GIF 图片', '*.gif'),
+    ('TIFF 图片', '*.tiff')
+]
+
+
+def generate_supported_extensions(formats):
+    """生成带点的扩展名集合"""
+    exts = set()
+    for _, formats_str in formats:
+        if formats_str == '*.*':
+            continue
+        for ext in formats_str.split(';'):
+            exts.add(ext.lower().replace("*", ""))
+    return exts
+
+
+SUPPORTED_DOC_EXTS = generate_supported_extensions(SUPPORTED_DOC_FORMATS)
+SUPPORTED_IMAGE_EXTS = generate_supported_extensions(SUPPORTED_IMAGE_FORMATS)
+
+# 文件类型
+KIND_IMAGE = "image"
+KIND_DOCUMENT = "document"
+# PDF 不经办公软件，直接复制或用 poppler 栅格化（见 pdfs）
+KIND_PDF = "pdf"
+PDF_EXTS = {".pdf"}
+# 纯文本、网页和 XML 文档可以不经办公软件直接排版（见 textpdf）
+TEXT_DOC_EXTS = {".txt", ".htm", ".html", ".xml"}
+
+
+def file_kind(path):
+    """根据扩展名判断文件类型，不支持的格式返回 None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PDF_EXTS:
+        return KIND_PDF
+    if ext in SUPPORTED_IMAGE_EXTS:
+        return KIND_IMAGE
+    if ext in SUPPORTED_DOC_EXTS:
+        return KIND_DOCUMENT
+    return None
@@ -0,0 +1,14 @@
+"""文件内容哈希"""
+import hashlib
+
+# 分块读取大小，避免把大文件整个读入内存
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path, algorithm="sha256"):
+    """计算文件内容的十六进制哈希值"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,586 @@
+"""图片校验与图片转PDF"""
+import io
+import math
+import os
+import struct
+import zlib
+
+from PIL import Image, ImageFile, ImageSequence, UnidentifiedImageError, features
+
+from . import metrics
+from .errors import ConversionError
+from .pdfwriter import DEFAULT_QUALITY, DEFAULT_RESOLUTION, PdfWriter
+
+# 允许加载损坏的图片
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+# 解压炸弹像素上限（默认沿用 Pillow 的设置），统一由 open_image 在解码前检查，
+# 因此关闭 Pillow 自带的全局检查，避免与可配置的上限冲突
+DEFAULT_MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS or 89478485
+_max_image_pixels = DEFAULT_MAX_IMAGE_PIXELS
+Image.MAX_IMAGE_PIXELS = None
+
+# 可以直接嵌入PDF的JPEG色彩模式
+_PASSTHROUGH_MODES = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}
+# Adobe 风格的 CMYK JPEG 数据是反相存储的
+_CMYK_INVERTED_DECODE = "/Decode [1 0 1 0 1 0 1 0]"
+
+# 超过该像素数的帧按横条带处理：逐条读取（或解码）、转换、编码并写入，
+# 色彩转换、降采样和编码的内存与条带大小而不是整幅图片成正比
+LARGE_IMAGE_PIXELS = 40_000_000
+# 每个条带的目标像素数
+STRIP_PIXELS = 4_000_000
+# 未压缩像素数据的原始格式 -> 每像素位数，用于按行直接从文件读取
+_RAW_BITS = {"1": 1, "1;I": 1, "L": 8, "L;I": 8, "P": 8, "LA": 16, "RGB": 24, "BGR": 24,
+             "RGBX": 32, "BGRX": 32, "RGBA": 32, "BGRA": 32, "CMYK": 32}
+# 可以原样写入PDF的 PNG 颜色类型 -> (通道数, 允许的位深)
+_PNG_COLOR_TYPES = {0: (1, (1, 2, 4, 8)), 2: (3, (8,)), 3: (1, (1, 2, 4, 8))}
+# 转写大数据时每次读取的字节数
+_COPY_CHUNK = 1 << 20
+
+
+class ImageEncodeOptions:
+    """图片写入PDF时的编码参数
+
+    resolution: 页面分辨率(DPI)，决定页面尺寸；为 None 时使用图片自带的DPI
+    quality: 重新编码为JPEG时的质量
+    max_dpi: 图片的实际分辨率（按自带DPI计算，见 _frame_options）超过该值时先降采样再编码，
+              页面尺寸不变
+    jpeg_passthrough: JPEG 源文件不解码，直接嵌入原始数据
+    lossless: 非JPEG数据使用无损的 Flate 压缩而不是JPEG
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION, quality=DEFAULT_QUALITY, max_dpi=None,
+                 jpeg_passthrough=True, lossless=False):
+        self.resolution = resolution
+        self.quality = quality
+        self.max_dpi = max_dpi
+        self.jpeg_passthrough = jpeg_passthrough
+        self.lossless = lossless
+
+    def key(self):
+        """用于比较/缓存的参数元组"""
+        return (self.resolution, self.quality, self.max_dpi, self.jpeg_passthrough, self.lossless)
+
+
+DEFAULT_ENCODE_OPTIONS = ImageEncodeOptions()
+
+
+def set_max_image_pixels(max_pixels):
+    """设置全局的解压炸弹像素上限，None 或 0 表示不限制"""
+    global _max_image_pixels
+    _max_image_pixels = max_pixels or None
+
+
+def open_image(file_path, max_pixels=None):
+    """打开图片并做轻量校验，返回未解码的图片对象（调用方负责关闭）
+
+    只读取文件头和结构信息，像素数据留给后续的转换或OCR解码，
+    因此每次操作最多只读取、解码一次文件。max_pixels 为 None 时使用全局上限。
+    """
+    # 检查文件是否存在
+    if not os.path.exists(file_path):
+        raise ConversionError(f"文件不存在: {file_path}")
+
+    try:
+        with metrics.stage("open", source=file_path):
+            img = Image.open(file_path)
+    except (IOError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise ConversionError(f"无效的图片文件: {str(e)}") from e
+
+    limit = _max_image_pixels if max_pixels is None else max_pixels
+    if limit and img.width * img.height > limit:
+        img.close()
+        raise ConversionError(
+            f"无效的图片文件: 图片像素数 {img.width}x{img.height} 超过上限 {limit}，"
+            "可能是解压炸弹")
+    return img
+
+
+def validate_image(file_path, max_pixels=None):
+    """验证图片文件是否有效（不解码像素），无效时抛出 ConversionError"""
+    with open_image(file_path, max_pixels):
+        pass
+
+
+def _native_dpi(img):
+    """图片自带的DPI (水平, 垂直)，没有或无效时返回 None"""
+    dpi = img.info.get("dpi")
+    if dpi and len(dpi) == 2 and dpi[0] and dpi[1] and dpi[0] > 1 and dpi[1] > 1:
+        return float(dpi[0]), float(dpi[1])
+    return None
+
+
+def _image_dpi(img, options):
+    """页面分辨率 (水平, 垂直)：优先使用指定值，否则使用图片自带的DPI
+
+    传真等图片的水平和垂直分辨率不同（如 204x98），指定分辨率时按图片自带的比例
+    调整垂直分辨率，页面不会被压扁。多帧图片的每一帧都可能不同，应按帧调用。
+    """
+    native = _native_dpi(img)
+    if options.resolution:
+        resolution = float(options.resolution)
+        if native is None:
+            return resolution, resolution
+        return resolution, resolution * native[1] / native[0]
+    return native or (DEFAULT_RESOLUTION, DEFAULT_RESOLUTION)
+
+
+def _frame_options(img, dpi, options):
+    """把 max_dpi 换算为页面分辨率 dpi 的单位，返回该帧使用的编码参数
+
+    max_dpi 限制的是图片内容的实际分辨率：像素数 / 原稿的物理尺寸。图片自带DPI时
+    原稿的物理尺寸为像素数 / 自带DPI，与 --dpi 决定的页面尺寸无关；没有自带DPI时
+    页面尺寸就是物理尺寸。降采样的判断和目标尺寸都按页面分辨率计算（缩小解码后
+    两者同比例变化），因此只需按比例换算上限。
+    """
+    native = _native_dpi(img)
+    if not options.max_dpi or native is None or native[0] == dpi[0]:
+        return options
+    return ImageEncodeOptions(options.resolution, options.quality,
+                              options.max_dpi * dpi[0] / native[0],
+                              options.jpeg_passthrough, options.lossless)
+
+
+def _needs_downsample(size, dpi, options):
+    return bool(options.max_dpi) and max(dpi) > options.max_dpi and min(size) > 1
+
+
+def _flatten(frame):
+    """去掉透明通道，透明区域铺白色背景"""
+    if frame.mode == "P":
+        frame = frame.convert("RGBA") if "transparency" in frame.info else frame.convert("RGB")
+    if frame.mode in ("RGBA", "LA", "PA", "La", "RGBa"):
+        rgba = frame.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return frame
+
+
+def _normalize_mode(frame):
+    """转换为PDF可直接表示的色彩模式：二值 1、灰度 L、彩色 RGB 或 CMYK"""
+    if frame.mode in ("1", "L", "RGB", "CMYK"):
+        return frame
+    frame = _flatten(frame)
+    if frame.mode in ("1", "L", "RGB", "CMYK"):
+        return frame
+    if frame.mode.startswith("I") or frame.mode == "F":
+        return frame.convert("L")
+    return frame.convert("RGB")
+
+
+def _downsample_size(size, dpi, options):
+    """按 max_dpi 降采样后的 (像素尺寸, 新DPI)，水平、垂直分别计算"""
+    x_scale = min(options.max_dpi / dpi[0], 1.0)
+    y_scale = min(options.max_dpi / dpi[1], 1.0)
+    target = (max(1, round(size[0] * x_scale)), max(1, round(size[1] * y_scale)))
+    return target, (dpi[0] * target[0] / size[0], dpi[1] * target[1] / size[1])
+
+
+def _resize(frame, size, box=None):
+    if frame.mode == "1":
+        # 二值图先按灰度缩放再阈值化，避免最近邻缩放丢失细线
+        resized = frame.convert("L").resize(size, Image.LANCZOS, box=box)
+        return resized.convert("1", dither=Image.NONE)
+    return frame.resize(size, Image.LANCZOS, box=box)
+
+
+def _downsample(frame, dpi, options):
+    """按 max_dpi 降采样，返回 (新图片, 新DPI)"""
+    size, new_dpi = _downsample_size(frame.size, dpi, options)
+    return _resize(frame, size), new_dpi
+
+
+def _draft_jpeg(img, dpi, options):
+    """需要降采样的JPEG让解码器直接按 1/2、1/4、1/8 缩小解码，返回缩小后的DPI
+
+    必须在解码前调用；缩小后的尺寸不小于降采样的目标，余下的部分仍由 _downsample 完成。
+    """
+    if img.format != "JPEG" or not _needs_downsample(img.size, dpi, options):
+        return dpi
+    size = img.size
+    img.draft(img.mode, _downsample_size(size, dpi, options)[0])
+    if img.size == size:
+        return dpi
+    return dpi[0] * img.width / size[0], dpi[1] * img.height / size[1]
+
+
+def _encode_ccitt(frame):
+    """二值图使用 CCITT G4 编码，返回 (数据, 附加字典项)，不支持时返回 None"""
+    if not features.check("libtiff"):
+        return None
+    buf = io.BytesIO()
+    frame.save(buf, "TIFF", compression="group4", tiffinfo={278: frame.height})
+    with Image.open(io.BytesIO(buf.getvalue())) as tiff:
+        offsets = tiff.tag_v2.get(273)
+        counts = tiff.tag_v2.get(279)
+    if not offsets or len(offsets) != 1:
+        return None
+    data = buf.getbuffer()[offsets[0]:offsets[0] + counts[0]].tobytes()
+    parms = (f"/DecodeParms << /K -1 /BlackIs1 true /Columns {frame.width} "
+             f"/Rows {frame.height} >>")
+    return data, parms
+
+
+def _tiff_ccitt_strip(frame, image_path):
+    """CCITT G4 压缩且只有一个条带的TIFF帧（传真、扫描件常见）可以不解码直接嵌入PDF
+
+    返回 (数据, 附加字典项)，不满足条件时返回 None。
+    """
+    if (image_path is None or frame.format != "TIFF" or frame.mode != "1"
+            or frame.info.get("compression") != "group4"):
+        return None
+    tags = frame.tag_v2
+    offsets, counts = tags.get(273), tags.get(279)
+    # 多条带时每个条带是独立的编码流，无法直接拼接；位序反转（FillOrder=2）的数据也不能直接使用
+    if not offsets or len(offsets) != 1 or not counts or tags.get(266, 1) != 1:
+        return None
+    with metrics.stage("read", size=counts[0]), open(image_path, "rb") as f:
+        f.seek(offsets[0])
+        data = f.read(counts[0])
+    if len(data) != counts[0]:
+        return None
+    # PhotometricInterpretation 为 1（BlackIsZero）时编码中的“白”游程实际是黑色
+    black_is_1 = "true" if tags.get(262, 0) == 1 else "false"
+    parms = (f"/DecodeParms << /K -1 /BlackIs1 {black_is_1} /Columns {frame.width} "
+             f"/Rows {frame.height} >>")
+    return data, parms
+
+
+def _raw_rows(frame, image_path):
+    """未压缩的 TIFF/BMP/PPM 等帧按行区域直接从文件读取像素，不解码整幅图片
+
+    返回 read(起始行, 结束行) 函数，得到该区域的图片；数据经过压缩或格式不支持时返回 None。
+    """
+    if image_path is None or not frame.tile:
+        return None
+    segments = []
+    layout = None
+    for tile in frame.tile:
+        decoder, box, offset, args = tile[:4]
+        if isinstance(args, str):
+            args = (args,)
+        args = tuple(args) + (0, 1)[len(args) - 1:]
+        if (decoder != "raw" or box[0] != 0 or box[2] != frame.width
+                or box[1] != (segments[-1][1] if segments else 0)
+                or layout not in (None, args[:3])):
+            return None
+        layout = args[:3]
+        segments.append((box[1], box[3], offset))
+    rawmode, stride, orientation = layout
+    bits = _RAW_BITS.get(rawmode)
+    if (bits is None or segments[-1][1] != frame.height or orientation not in (1, -1)
+            or (orientation == -1 and len(segments) > 1)
+            or (frame.mode == "P" and frame.palette is None)):
+        return None
+    stride = stride or (frame.width * bits + 7) // 8
+
+    def read(top, bottom):
+        data = bytearray()
+        with open(image_path, "rb") as f:
+            for seg_top, seg_bottom, offset in segments:
+                start, end = max(top, seg_top), min(bottom, seg_bottom)
+                if start >= end:
+                    continue
+                # 自下而上存储（BMP）时，文件中的第一行是图片的最后一行
+                row = start - seg_top if orientation == 1 else frame.height - end
+                f.seek(offset + row * stride)
+                data += f.read((end - start) * stride)
+        # 文件被截断时缺少的行按黑色补齐，与 LOAD_TRUNCATED_IMAGES 的行为一致
+        data += bytes((bottom - top) * stride - len(data))
+        strip = Image.frombytes(frame.mode, (frame.width, bottom - top), bytes(data), "raw",
+                                rawmode, stride, orientation)
+        if frame.mode == "P":
+            strip.putpalette(frame.palette)
+            if "transparency" in frame.info:
+                strip.info["transparency"] = frame.info["transparency"]
+        return strip
+
+    return read
+
+
+def _png_chunks(f):
+    """依次产出 PNG 数据块的 (类型, 数据起始位置, 长度)"""
+    f.seek(8)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack(">I4s", header)
+        yield chunk_type, f.tell(), length
+        if chunk_type == b"IEND":
+            return
+        f.seek(length + 4, os.SEEK_CUR)
+
+
+def _png_idat(frame, image_path):
+    """非隔行、无透明度的 PNG 可以把 IDAT 压缩数据原样写入PDF（FlateDecode + PNG 预测器）
+
+    不解码也不重新压缩，内存占用与图片大小无关。返回 (长度, 数据块迭代器, 色彩空间,
+    位深, 附加字典项)，不满足条件时返回 None。
+    """
+    if image_path is None or frame.format != "PNG" or getattr(frame, "n_frames", 1) != 1:
+        return None
+    with open(image_path, "rb") as f:
+        header = f.read(8)
+        chunks = list(_png_chunks(f)) if header == b"\x89PNG\r\n\x1a\n" else []
+        if not chunks or chunks[0][0] != b"IHDR" or chunks[0][2] < 13:
+            return None
+        f.seek(chunks[0][1])
+        width, height, bits, color_type, _, _, interlace = struct.unpack(">IIBBBBB", f.read(13))
+        palette = None
+        for chunk_type, offset, length in chunks:
+            if chunk_type == b"PLTE":
+                f.seek(offset)
+                palette = f.read(length)
+    types = {chunk_type for chunk_type, _, _ in chunks}
+    parts = [(offset, length) for chunk_type, offset, length in chunks if chunk_type == b"IDAT"]
+    if (color_type not in _PNG_COLOR_TYPES or bits not in _PNG_COLOR_TYPES[color_type][1]
+            or interlace or b"tRNS" in types or not parts or (width, height) != frame.size
+            or (color_type == 3 and not palette)):
+        return None
+    colors = _PNG_COLOR_TYPES[color_type][0]
+    if color_type == 3:
+        color_space = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    else:
+        color_space = "/DeviceRGB" if colors == 3 else "/DeviceGray"
+    parms = (f"/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {bits} "
+             f"/Columns {width} >>")
+
+    def read():
+        with open(image_path, "rb") as f:
+            for offset, length in parts:
+                f.seek(offset)
+                while length > 0:
+                    chunk = f.read(min(length, _COPY_CHUNK))
+                    if not chunk:
+                        raise ConversionError("PNG 文件被截断")
+                    length -= len(chunk)
+                    yield chunk
+
+    total = sum(length for _, length in parts)
+    return total, read(), color_space, bits, parms
+
+
+def _page_words(words, height, dpi):
+    """把像素坐标（原点在左上角）的文字框换算为PDF坐标（点，原点在左下角）"""
+    x_scale, y_scale = 72.0 / dpi[0], 72.0 / dpi[1]
+    return [(left * x_scale, (height - top - h) * y_scale, w * x_scale, h * y_scale, text)
+            for left, top, w, h, text in words]
+
+
+def _encode(frame, options):
+    """编码已转换色彩模式的图片，返回 (数据, 色彩空间, 位数, 过滤器, 附加字典项)"""
+    extra = ""
+    with metrics.stage("encode") as timing:
+        if frame.mode == "1":
+            color_space, bits = "/DeviceGray", 1
+            ccitt = _encode_ccitt(frame)
+            if ccitt is not None:
+                data, extra = ccitt
+                filter_name = "CCITTFaxDecode"
+            else:
+                data, filter_name = zlib.compress(frame.tobytes()), "FlateDecode"
+        else:
+            color_space, bits = _PASSTHROUGH_MODES[frame.mode], 8
+            if options.lossless:
+                data, filter_name = zlib.compress(frame.tobytes()), "FlateDecode"
+            else:
+                buf = io.BytesIO()
+                frame.save(buf, "JPEG", quality=options.quality)
+                data, filter_name = buf.getvalue(), "DCTDecode"
+                if frame.mode == "CMYK":
+                    extra = _CMYK_INVERTED_DECODE
+        timing.size = len(data)
+    return data, color_space, bits, filter_name, extra
+
+
+def _encode_strips(read_rows, size, target, options):
+    """把 read_rows(起始行, 结束行) 读出的区域逐条转换、缩放到 target 并编码
+
+    依次产出 PdfWriter.add_strip_page 需要的条带。缩放时每个条带多读几行相邻的像素，
+    重采样滤波器因此能看到条带外的像素，拼接处不会出现接缝。
+    """
+    width, height = size
+    target_width, target_height = target
+    y_scale = target_height / height
+    # 条带大小按源图片的像素计算，降采样时每个条带读取的源区域同样受限
+    step = max(1, int(STRIP_PIXELS / width * y_scale))
+    # LANCZOS 的支撑半径是 3 个目标像素
+    margin = math.ceil(3 / y_scale) + 1
+    for top in range(0, target_height, step):
+        bottom = min(top + step, target_height)
+        if target == size:
+            with metrics.stage("decode"):
+                strip = read_rows(top, bottom)
+            with metrics.stage("color_convert"):
+                strip = _normalize_mode(strip)
+        else:
+            src_top, src_bottom = top / y_scale, bottom / y_scale
+            first = max(0, math.floor(src_top) - margin)
+            last = min(height, math.ceil(src_bottom) + margin)
+            with metrics.stage("decode"):
+                strip = read_rows(first, last)
+            with metrics.stage("color_convert"):
+                strip = _normalize_mode(strip)
+            with metrics.stage("resample"):
+                strip = _resize(strip, (target_width, bottom - top),
+                                box=(0, src_top - first, width, src_bottom - first))
+        data, color_space, bits, filter_name, extra = _encode(strip, options)
+        yield data, bottom - top, color_space, bits, filter_name, extra
+
+
+def _write_large_frame(writer, frame, dpi, options, words=None, image_path=None):
+    """按条带写入超大的帧，words 已换算为页面坐标"""
+    if _needs_downsample(frame.size, dpi, options):
+        target, page_dpi = _downsample_size(frame.size, dpi, options)
+    else:
+        target, page_dpi = frame.size, dpi
+    read_rows = _raw_rows(frame, image_path)
+    if read_rows is None:
+        # 压缩格式只能整幅解码，但后续的转换和编码仍按条带进行，不产生整幅的副本
+        with metrics.stage("decode"):
+            frame.load()
+
+        def read_rows(top, bottom):
+            return frame.crop((0, top, frame.width, bottom))
+
+    strips = _encode_strips(read_rows, frame.size, target, options)
+    writer.add_strip_page(strips, target[0], target[1], resolution=page_dpi, words=words)
+
+
+def _write_frame(writer, frame, dpi, options, words=None, image_path=None):
+    """编码一帧并写为一页，words 为该帧的OCR文字框（像素坐标）"""
+    if words:
+        words = _page_words(words, frame.height, dpi)
+    large = frame.width * frame.height > LARGE_IMAGE_PIXELS
+    if not _needs_downsample(frame.size, dpi, options):
+        ccitt = _tiff_ccitt_strip(frame, image_path)
+        if ccitt is not None:
+            data, extra = ccitt
+            with metrics.stage("write", size=len(data)):
+                writer.add_image_page(data, frame.width, frame.height, "/DeviceGray", bits=1,
+                                      filter_name="CCITTFaxDecode", resolution=dpi, extra=extra,
+                                      words=words)
+            return
+        # PNG 本身就是无损的 Flate 数据：要求无损或图片很大时直接转写，省去解码和重新压缩
+        png = _png_idat(frame, image_path) if options.lossless or large else None
+        if png is not None:
+            length, chunks, color_space, bits, extra = png
+            with metrics.stage("write", size=length):
+                writer.add_image_page((length, chunks), frame.width, frame.height, color_space,
+                                      bits=bits, filter_name="FlateDecode", resolution=dpi,
+                                      extra=extra, words=words)
+            return
+    if large:
+        _write_large_frame(writer, frame, dpi, options, words, image_path)
+        return
+
+    with metrics.stage("decode"):
+        frame.load()
+    with metrics.stage("color_convert"):
+        frame = _normalize_mode(frame)
+    if _needs_downsample(frame.size, dpi, options):
+        with metrics.stage("resample"):
+            frame, dpi = _downsample(frame, dpi, options)
+
+    data, color_space, bits, filter_name, extra = _encode(frame, options)
+    with metrics.stage("write", size=len(data)):
+        writer.add_image_page(data, frame.width, frame.height, color_space, bits=bits,
+                              filter_name=filter_name, resolution=dpi, extra=extra, words=words)
+
+
+def _write_jpeg_passthrough(writer, img, image_path, dpi, words=None):
+    """把JPEG文件的原始数据直接写为一页（不重新编码）"""
+    with metrics.stage("read") as timing:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        timing.size = len(data)
+    extra = _CMYK_INVERTED_DECODE if img.mode == "CMYK" and "adobe" in img.info else ""
+    if words:
+        words = _page_words(words, img.height, dpi)
+    with metrics.stage("write", size=len(data)):
+        writer.add_image_page(data, img.width, img.height, _PASSTHROUGH_MODES[img.mode],
+                              filter_name="DCTDecode", resolution=dpi, extra=extra, words=words)
+
+
+def _can_passthrough(img, image_path, dpi, options):
+    return (options.jpeg_passthrough and image_path is not None and img.format == "JPEG"
+            and img.mode in _PASSTHROUGH_MODES and getattr(img, "n_frames", 1) == 1
+            and not _needs_downsample(img.size, dpi, options))
+
+
+def write_image_pages(writer, img, options=None, image_path=None, words_for=None):
+    """把图片的每一帧依次写为PDF的一页，任一时刻只保留一帧解码后的数据
+
+    提供 image_path 且图片为JPEG（或单条带的 CCITT G4 TIFF 帧）时，可以不解码直接嵌入原始数据。
+    超过 LARGE_IMAGE_PIXELS 的帧按条带处理，未压缩的像素按行区域直接从文件读取。
+    分辨率按帧读取，每页的尺寸和色彩模式可以各不相同。
+    提供 words_for(帧, 帧序号) 时对每一帧做OCR，并把结果写为不可见文字层
+    （OCR 与图片编码共用同一次解码）。
+    """
+    options = options or DEFAULT_ENCODE_OPTIONS
+    dpi = _image_dpi(img, options)
+    if img.format == "JPEG":
+        options = _frame_options(img, dpi, options)
+    if _can_passthrough(img, image_path, dpi, options):
+        words = words_for(img, 0) if words_for else None
+        _write_jpeg_passthrough(writer, img, image_path, dpi, words)
+        return
+    if words_for is None:
+        # 不做OCR时JPEG可以缩小解码（OCR 需要原始分辨率的图片）
+        dpi = _draft_jpeg(img, dpi, options)
+    if img.format == "JPEG":
+        # JPEG 只有一帧，分辨率可能已按缩小解码调整
+        words = words_for(img, 0) if words_for else None
+        _write_frame(writer, img, dpi, options, words, image_path)
+        return
+    for index, frame in enumerate(ImageSequence.Iterator(img)):
+        words = words_for(frame, index) if words_for else None
+        dpi = _image_dpi(frame, options)
+        _write_frame(writer, frame, dpi, _frame_options(frame, dpi, options), words, image_path)
+
+
+def convert_image_to_pdf(image_path, output_path, options=None, max_pixels=None,
+                         words_for=None):
+    """将图片转换为PDF（多帧图片的每一帧各占一页），可选附加OCR文字层"""
+    with metrics.source(image_path), open_image(image_path, max_pixels) as img:
+        write_image_to_pdf(img, output_path, options, image_path, words_for)
+
+
+def write_image_to_pdf(img, output_path, options=None, image_path=None, words_for=None):
+    """把已打开的图片写为PDF，失败抛出 ConversionError"""
+    try:
+        with PdfWriter(output_path) as writer:
+            write_image_pages(writer, img, options, image_path, words_for)
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise ConversionError(f"图片转换失败: {str(e)}") from e
+
+
+def merge_images_to_pdf(image_paths, output_path, options=None, max_pixels=None,
+                        words_provider=None, progress=None):
+    """按顺序把多张图片（包括多帧TIFF的每一帧）合并为一个多页PDF，返回页数
+
+    words_provider(图片路径) 返回该图片的 words_for 函数时，为每页附加OCR文字层。
+    progress(已完成数, 总数) 在每张图片写完后调用，抛出异常即中止合并（不留下半个PDF）。
+    """
+    image_paths = list(image_paths)
+    with PdfWriter(output_path) as writer:
+        for done, image_path in enumerate(image_paths, 1):
+            words_for = words_provider(image_path) if words_provider else None
+            try:
+                with metrics.source(image_path), open_image(image_path, max_pixels) as img:
+                    write_image_pages(writer, img, options, image_path, words_for)
+            except ConversionError as e:
+                raise ConversionError(f"图片合并失败: {os.path.basename(image_path)}: {e}") from e
+            except (IOError, Image.DecompressionBombError) as e:
+                raise ConversionError(
+                    f"图片合并失败: {os.path.basename(image_path)}: {str(e)}") from e
+            if progress is not None:
+                progress(done, len(image_paths))
+        if not writer.page_count:
+            raise ConversionError("没有可合并的图片！")
+        return writer.page_count
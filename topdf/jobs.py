@@ -0,0 +1,191 @@
+"""后台任务队列
+
+界面线程只负责提交任务和刷新显示，转换、OCR 等耗时操作在工作线程中执行。
+任务的状态变化通过线程安全的队列通知界面，界面用定时轮询（Tk 的 after）
+调用 JobQueue.poll() 取出有变化的任务，工作线程从不直接操作界面控件。
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import ConversionError
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATUS_LABELS = {
+    PENDING: "排队中",
+    RUNNING: "进行中",
+    DONE: "完成",
+    FAILED: "失败",
+    CANCELLED: "已取消",
+}
+
+
+class JobCancelled(ConversionError):
+    """任务被取消（由 Job.check_cancelled 抛出）"""
+
+    def __init__(self, message="任务已取消"):
+        super().__init__(message)
+
+
+class Job:
+    """一个后台任务及其当前状态
+
+    取消是协作式的：排队中的任务直接取消；正在执行的任务只设置取消标记，
+    由任务函数在安全的位置（如合并图片时每写完一页）调用 check_cancelled 或 report 结束。
+    """
+
+    def __init__(self, job_id, description, events):
+        self.id = job_id
+        self.description = description
+        self.status = PENDING
+        self.progress = None
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+        self.future = None
+        self._cancel = threading.Event()
+        self._events = events
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def status_label(self):
+        label = STATUS_LABELS[self.status]
+        if self.status == RUNNING and self.progress is not None:
+            label += f" {self.progress:.0%}"
+        return label
+
+    def check_cancelled(self):
+        """已请求取消时抛出 JobCancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, progress=None, message=None):
+        """在工作线程中报告进度（0~1）和说明文字，已请求取消时抛出 JobCancelled"""
+        self.check_cancelled()
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        self._notify()
+
+    def step(self, done, total):
+        """按已完成数量报告进度，可直接作为 progress(done, total) 回调使用"""
+        self.report(done / total if total else None, f"{done}/{total}")
+
+    def _notify(self):
+        self._events.put(self)
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.description!r}, {self.status})"
+
+
+class JobQueue:
+    """用线程池执行任务的队列，可以在前面的任务运行时继续提交新任务"""
+
+    def __init__(self, workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1),
+                                            thread_name_prefix="topdf-job")
+        self._events = queue.Queue()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, description="", *args, **kwargs):
+        """提交任务 func(job, *args, **kwargs)，返回 Job；函数的返回值保存在 job.result"""
+        job = Job(next(self._ids), description, self._events)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, func, args, kwargs)
+        job._notify()
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            # cancel() 请求取消时任务恰好已开始执行，future.cancel() 没有成功，
+            # 由这里把任务标记为已取消，否则它会一直停在排队中
+            job.status = CANCELLED
+            job.error = "任务已取消"
+            job._notify()
+            return
+        job.status = RUNNING
+        job._notify()
+        start = time.perf_counter()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = DONE
+            job.progress = 1.0
+        except JobCancelled as e:
+            job.status = CANCELLED
+            job.error = str(e)
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.elapsed = time.perf_counter() - start
+            job._notify()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """所有任务（按提交顺序）"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def unfinished(self):
+        return [job for job in self.jobs() if not job.finished]
+
+    def cancel(self, job):
+        """取消任务，返回是否已取消或已请求取消"""
+        if job.finished:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.error = "任务已取消"
+            job._notify()
+        return True
+
+    def cancel_all(self):
+        """取消所有未完成的任务，返回取消的数量"""
+        return sum(self.cancel(job) for job in self.unfinished())
+
+    def poll(self):
+        """取出自上次调用以来状态有变化的任务（不阻塞，按变化的先后顺序，不重复）"""
+        changed = {}
+        while True:
+            try:
+                job = self._events.get_nowait()
+            except queue.Empty:
+                break
+            changed.pop(job.id, None)
+            changed[job.id] = job
+        return list(changed.values())
+
+    def shutdown(self, cancel=True, wait=True):
+        """关闭线程池；cancel 为真时先取消所有未完成的任务"""
+        if cancel:
+            self.cancel_all()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
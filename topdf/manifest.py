@@ -0,0 +1,101 @@
+"""增量转换清单
+
+记录每个源文件上次成功转换时的大小、修改时间、内容哈希、转换参数和输出文件，
+重新运行时未变化的文件直接跳过。判断只需一次主键查询和两次 stat：
+大小和修改时间都没变时不读文件内容；变了才计算哈希，内容相同（例如只是被复制或 touch）
+仍然跳过。转换参数按文件类型分别记录，只修改图片参数不会让文档重新转换。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from .hashing import file_digest
+
+DEFAULT_MANIFEST_NAME = ".topdf-manifest.sqlite3"
+
+
+def default_manifest_path(output_dir):
+    """默认清单放在输出目录中，和输出文件一起移动或删除"""
+    return os.path.join(output_dir, DEFAULT_MANIFEST_NAME)
+
+
+def _source_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ConversionManifest:
+    """线程安全的转换清单（SQLite），多个进程可以共用同一个数据库文件"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " source TEXT NOT NULL,"
+                " output TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " options TEXT NOT NULL,"
+                " output_size INTEGER NOT NULL,"
+                " converted REAL NOT NULL,"
+                " PRIMARY KEY (source, output))")
+
+    def is_current(self, source, output, options):
+        """源文件、转换参数和输出文件都没有变化时返回 True"""
+        try:
+            st = os.stat(source)
+            output_size = os.path.getsize(output)
+        except OSError:
+            return False
+        key, output_key = _source_key(source), _source_key(output)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, digest, options, output_size FROM entries"
+                " WHERE source = ? AND output = ?", (key, output_key)).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, digest, recorded_options, recorded_output_size = row
+        if recorded_options != options or recorded_output_size != output_size:
+            return False
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            return True
+        # 修改时间变了但内容可能没变：按内容哈希确认，相同则更新记录
+        if st.st_size != size or file_digest(source) != digest:
+            return False
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET mtime_ns = ? WHERE source = ? AND output = ?",
+                (st.st_mtime_ns, key, output_key))
+        return True
+
+    def record(self, source, output, options, digest=None):
+        """记录一次成功的转换，digest 为已经算好的源文件内容哈希（避免重复读取文件）"""
+        st = os.stat(source)
+        digest = digest or file_digest(source)
+        output_size = os.path.getsize(output)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (source, output, size, mtime_ns, digest, options, output_size, converted)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_source_key(source), _source_key(output), st.st_size, st.st_mtime_ns,
+                 digest, options, output_size, time.time()))
+
+    def forget(self, source):
+        """删除某个源文件的全部记录，下次运行时重新转换"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE source = ?", (_source_key(source),))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,415 @@
+"""分阶段计时与结构化指标
+
+转换过程中的各个阶段（打开/校验、解码、色彩转换、编码、写入、OCR、办公软件打开/保存/关闭等）
+用 stage() 包起来，结束时产生一个 StageEvent（耗时、数据大小、是否出错），
+交给已注册的输出（sink）：JSON Lines 日志、Prometheus 文本文件或进程内回调。
+没有注册任何输出时 stage() 直接返回空操作，几乎没有额外开销。
+
+进程池中的子进程不直接写输出：事件随转换结果带回主进程再转发（见 capture / forward），
+因此多个进程共用一个 Prometheus 文件时也不会互相覆盖。
+"""
+import json
+import os
+import threading
+import time
+
+# 已注册的输出，事件在产生它的线程中同步分发
+_sinks = []
+_sinks_lock = threading.Lock()
+# 当前线程正在处理的源文件，自动记录到该线程产生的事件中
+_local = threading.local()
+
+# Prometheus 耗时直方图的桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class StageEvent:
+    """一个阶段的一次执行
+
+    stage: 阶段名称，如 "decode"、"ocr"、"document_save"
+    seconds: 耗时
+    source: 正在处理的源文件（未知时为 None）
+    size: 该阶段处理或产出的字节数（如编码后的图片数据大小），不适用时为 None
+    error: 阶段抛出的异常描述，成功时为 None
+    """
+
+    def __init__(self, stage, seconds=0.0, source=None, size=None, error=None, timestamp=None,
+                 pid=None):
+        self.stage = stage
+        self.seconds = seconds
+        self.source = source
+        self.size = size
+        self.error = error
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.pid = os.getpid() if pid is None else pid
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "time": self.timestamp,
+            "stage": self.stage,
+            "seconds": self.seconds,
+            "source": self.source,
+            "size": self.size,
+            "error": self.error,
+            "pid": self.pid,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["stage"], data["seconds"], data.get("source"), data.get("size"),
+                   data.get("error"), data.get("time"), data.get("pid"))
+
+    def __repr__(self):
+        return f"StageEvent({self.stage!r}, {self.seconds:.4f}s)"
+
+
+class _Stage:
+    """stage() 返回的计时上下文，可在块内设置 size"""
+
+    __slots__ = ("stage", "source", "size", "_start")
+
+    def __init__(self, stage, source, size):
+        self.stage = stage
+        self.source = source
+        self.size = size
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        error = None
+        if exc_type is not None:
+            error = f"{exc_type.__name__}: {exc}"
+        emit(StageEvent(self.stage, seconds, self.source or current_source(), self.size, error))
+        return False
+
+
+class _NullStage:
+    """没有输出时使用的空操作上下文"""
+
+    __slots__ = ()
+    size = None
+    source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        # 允许调用方无条件地设置 size
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def enabled():
+    """是否注册了任何输出"""
+    return bool(_sinks)
+
+
+def stage(name, source=None, size=None):
+    """为一个阶段计时：with metrics.stage("encode") as s: ...; s.size = len(data)"""
+    if not _sinks:
+        return _NULL_STAGE
+    return _Stage(name, source, size)
+
+
+def emit(event):
+    """把事件分发给所有输出，输出本身的错误不影响转换"""
+    for sink in list(_sinks):
+        try:
+            sink.handle(event)
+        except Exception:
+            pass
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def detach_sinks():
+    """移除所有输出但不关闭：fork 出的子进程继承了父进程的输出，由父进程负责写入"""
+    with _sinks_lock:
+        del _sinks[:]
+
+
+def close_sinks():
+    """移除并关闭所有输出（写出尚未落盘的数据）"""
+    with _sinks_lock:
+        sinks = list(_sinks)
+        del _sinks[:]
+    for sink in sinks:
+        sink.close()
+
+
+class _SourceContext:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._previous = getattr(_local, "source", None)
+        _local.source = self.path
+
+    def __exit__(self, *exc):
+        _local.source = self._previous
+        return False
+
+
+def source(path):
+    """在 with 块内把当前线程产生的事件标记为属于 path"""
+    return _SourceContext(path)
+
+
+def current_source():
+    return getattr(_local, "source", None)
+
+
+class _Context:
+    """一个线程的事件上下文：源文件和正在收集事件的 capture"""
+
+    def __init__(self, source, capture):
+        self.source = source
+        self.capture = capture
+
+
+def current_context():
+    """当前线程的事件上下文，交给辅助线程用 attach 恢复"""
+    return _Context(current_source(), getattr(_local, "capture", None))
+
+
+class _Attach:
+    def __init__(self, context, source):
+        self.context = context
+        self.source = source
+
+    def __enter__(self):
+        self._previous = (getattr(_local, "source", None), getattr(_local, "capture", None))
+        _local.source = self.context.source or self.source
+        _local.capture = self.context.capture
+
+    def __exit__(self, *exc):
+        _local.source, _local.capture = self._previous
+        return False
+
+
+def attach(context, source=None):
+    """在辅助线程的 with 块内使用 current_context() 得到的上下文
+
+    块内的事件与调用方的事件一样标记源文件（上下文中没有时为 source），并由调用方的
+    capture 收集。
+    """
+    return _Attach(context, source)
+
+
+class _CaptureSink:
+    """收集属于这次 capture 的事件（用于子进程把事件带回主进程）
+
+    只收集 capture 所在的线程，以及用 attach 带上其上下文的辅助线程产生的事件。
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def handle(self, event):
+        if getattr(_local, "capture", None) is self:
+            self.events.append(event.to_dict())
+
+    def close(self):
+        pass
+
+
+class _Capture:
+    def __init__(self):
+        self.sink = _CaptureSink()
+
+    def __enter__(self):
+        self._previous = getattr(_local, "capture", None)
+        _local.capture = self.sink
+        add_sink(self.sink)
+        return self.sink.events
+
+    def __exit__(self, *exc):
+        remove_sink(self.sink)
+        _local.capture = self._previous
+        return False
+
+
+def capture():
+    """with metrics.capture() as events: ... 收集块内产生的事件（字典列表）
+
+    其他线程的事件不收集，除非它们用 attach 带上了当前线程的上下文（见 pdfs.iter_pages）。
+    """
+    return _Capture()
+
+
+def forward(events):
+    """把子进程带回的事件（capture 得到的字典列表）分发给本进程的输出"""
+    for data in events or ():
+        emit(StageEvent.from_dict(data))
+
+
+class CallbackSink:
+    """进程内回调：每个事件调用一次 callback(event)，在产生事件的线程中调用"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def handle(self, event):
+        self.callback(event)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """每个事件写为一行 JSON，适合日志收集系统
+
+    以追加方式打开，每行单独写入并刷新，程序异常退出也不会丢失已完成阶段的记录。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fp = open(path, "a", encoding="utf-8")
+
+    def handle(self, event):
+        line = json.dumps(event.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fp.write(line)
+            self._fp.flush()
+
+    def close(self):
+        with self._lock:
+            self._fp.close()
+
+
+class _StageStats:
+    __slots__ = ("count", "errors", "seconds", "size", "buckets")
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.size = 0
+        self.buckets = [0] * bucket_count
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusSink:
+    """按阶段累计的 Prometheus 指标
+
+    render() 返回 Prometheus 文本格式，提供 path 时定期（最多每 interval 秒一次）
+    以及 close() 时原子地写入该文件，供 node_exporter 的 textfile collector 采集。
+    """
+
+    def __init__(self, path=None, interval=5.0, buckets=DEFAULT_BUCKETS, prefix="topdf"):
+        self.path = path
+        self.interval = interval
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._stats = {}
+        self._lock = threading.Lock()
+        # 写文件串行执行，多个线程同时到期时不会交错写入
+        self._write_lock = threading.Lock()
+        self._last_write = 0.0
+
+    def handle(self, event):
+        with self._lock:
+            stats = self._stats.get(event.stage)
+            if stats is None:
+                stats = self._stats[event.stage] = _StageStats(len(self.buckets))
+            stats.count += 1
+            stats.seconds += event.seconds
+            if event.size:
+                stats.size += event.size
+            if event.error is not None:
+                stats.errors += 1
+            for index, bound in enumerate(self.buckets):
+                if event.seconds <= bound:
+                    stats.buckets[index] += 1
+                    break
+            now = time.monotonic()
+            due = self.path and now - self._last_write >= self.interval
+            if due:
+                # 在同一个临界区中更新时间，同时到期的其他线程不会重复写入
+                self._last_write = now
+        if due:
+            self._write_file()
+
+    def render(self):
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds 各转换阶段的耗时",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self._lock:
+            stats = sorted(self._stats.items())
+            for name, s in stats:
+                label = f'stage="{_label(name)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, s.buckets):
+                    cumulative += count
+                    lines.append(f'{p}_stage_seconds_bucket{{{label},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{p}_stage_seconds_bucket{{{label},le="+Inf"}} {s.count}')
+                lines.append(f"{p}_stage_seconds_sum{{{label}}} {s.seconds:.6f}")
+                lines.append(f"{p}_stage_seconds_count{{{label}}} {s.count}")
+            lines += [f"# HELP {p}_stage_errors_total 各阶段出错的次数",
+                      f"# TYPE {p}_stage_errors_total counter"]
+            lines += [f'{p}_stage_errors_total{{stage="{_label(name)}"}} {s.errors}'
+                      for name, s in stats]
+            lines += [f"# HELP {p}_stage_bytes_total 各阶段处理或产出的字节数",
+                      f"# TYPE {p}_stage_bytes_total counter"]
+            lines += [f'{p}_stage_bytes_total{{stage="{_label(name)}"}} {s.size}'
+                      for name, s in stats]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """写入文件（先写临时文件再替换，采集器不会读到写了一半的内容）"""
+        if not self.path:
+            return
+        with self._lock:
+            self._last_write = time.monotonic()
+        self._write_file()
+
+    def _write_file(self):
+        with self._write_lock:
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.write()
+
+
+def create_sink(spec):
+    """从字符串创建输出："jsonl:路径" 或 "prometheus:路径"（也可写作 "prom:路径"）"""
+    kind, sep, path = spec.partition(":")
+    kind = kind.strip().lower()
+    if not sep or not path:
+        raise ValueError(f"指标输出格式应为 jsonl:路径 或 prometheus:路径: {spec}")
+    if kind in ("jsonl", "json"):
+        return JsonLinesSink(path)
+    if kind in ("prometheus", "prom"):
+        return PrometheusSink(path)
+    raise ValueError(f"未知的指标输出类型: {kind}")
@@ -0,0 +1,342 @@
+"""基于 Tesseract 的文字识别
+
+pytesseract 会连带导入 numpy 等模块，耗时比本包其余部分加起来还多，
+因此在第一次识别时才导入（见 _tesseract），只转换文档或图片时不付出这部分启动开销。
+
+可选的方向和文字种类检测（detect_orientation）在缩小的副本上运行 Tesseract OSD，
+识别前把页面转正，并只加载检测到的文字种类对应的语言包（见 Orientation）。
+"""
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+from . import capabilities, metrics
+from .errors import ConversionError
+from .images import open_image
+from .preprocess import preprocess as preprocess_image
+from .preprocess import rescale, to_grayscale
+from .runtime import default_tesseract_path
+
+DEFAULT_LANG = 'chi_sim+eng'
+
+# OSD 使用的缩略图最长边：判断方向和文字种类不需要原图的分辨率
+_OSD_MAX_SIZE = 1600
+# 置信度低于这些值时不旋转、不缩减语言（文字太少或版面复杂时 OSD 并不可靠）
+MIN_ORIENTATION_CONFIDENCE = 2.0
+MIN_SCRIPT_CONFIDENCE = 1.0
+
+# OSD 识别出的文字种类 -> 该文字的语言包
+_SCRIPT_LANGS = {
+    "Han": {"chi_sim", "chi_tra", "chi_sim_vert", "chi_tra_vert"},
+    "Latin": {"eng", "fra", "deu", "spa", "ita", "por", "nld", "pol", "ces", "swe", "dan",
+              "nor", "fin", "hun", "ron", "tur", "vie", "ind", "msa", "lat"},
+    "Japanese": {"jpn", "jpn_vert"},
+    "Hangul": {"kor", "kor_vert"},
+    "Korean": {"kor", "kor_vert"},
+    "Cyrillic": {"rus", "ukr", "bel", "bul", "srp", "mkd"},
+    "Arabic": {"ara", "fas", "urd"},
+    "Greek": {"ell"},
+    "Hebrew": {"heb"},
+    "Thai": {"tha"},
+    "Devanagari": {"hin", "mar", "nep", "san"},
+}
+
+# 顺时针旋转角度 -> Pillow 的无损转置（Image.rotate 的角度是逆时针）
+_TRANSPOSE = {90: Image.ROTATE_270, 180: Image.ROTATE_180, 270: Image.ROTATE_90}
+
+# 常见的 Tesseract 安装位置
+TESSERACT_CANDIDATES = [
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    '/usr/bin/tesseract',
+    '/usr/local/bin/tesseract'
+]
+
+_tesseract_cmd = default_tesseract_path()
+# 已导入的 pytesseract 模块
+_pytesseract = None
+
+
+def _tesseract():
+    """导入 pytesseract（只在第一次调用时导入）"""
+    global _pytesseract
+    if _pytesseract is None:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+        _pytesseract = pytesseract
+    return _pytesseract
+
+
+def set_tesseract_path(path):
+    """手动指定 Tesseract 可执行文件"""
+    global _tesseract_cmd
+    _tesseract_cmd = path
+    if _pytesseract is not None:
+        _pytesseract.pytesseract.tesseract_cmd = path
+
+
+def get_tesseract_path():
+    return _tesseract_cmd
+
+
+def _probe_tesseract():
+    """查找 Tesseract：先查常见安装位置，再查 PATH，返回 (路径, 路径) 或 (None, None)"""
+    for path in TESSERACT_CANDIDATES:
+        if os.path.exists(path):
+            return path, path
+    path = shutil.which("tesseract")
+    return (path, path) if path else (None, None)
+
+
+def init_tesseract(refresh=False):
+    """自动检测 Tesseract 路径，成功返回路径，未找到返回 None
+
+    检测结果缓存在磁盘上（见 capabilities），refresh 为真时忽略缓存重新检测。
+    """
+    path = capabilities.cached("tesseract", _probe_tesseract, refresh)
+    if path:
+        set_tesseract_path(path)
+    return path
+
+
+def set_thread_limit(threads):
+    """限制每个 Tesseract 进程使用的 OpenMP 线程数
+
+    多个 Tesseract 并行运行时，每个进程再各自开满线程只会互相争抢CPU，
+    批量识别时通常设为 1 吞吐量最高。None 表示不限制。
+    """
+    if threads:
+        os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    else:
+        os.environ.pop("OMP_THREAD_LIMIT", None)
+
+
+class Orientation:
+    """Tesseract OSD 的结果
+
+    rotate: 使页面正立需要顺时针旋转的角度（0/90/180/270）
+    script: 文字种类（如 "Han"、"Latin"），未知时为 None
+    """
+
+    def __init__(self, rotate=0, script=None, orientation_confidence=0.0,
+                 script_confidence=0.0):
+        self.rotate = rotate
+        self.script = script
+        self.orientation_confidence = orientation_confidence
+        self.script_confidence = script_confidence
+
+    @classmethod
+    def parse(cls, text):
+        """解析 image_to_osd 的输出（"Rotate: 90" 这样的多行文本）"""
+        fields = {}
+        for line in text.splitlines():
+            name, sep, value = line.partition(":")
+            if sep:
+                fields[name.strip()] = value.strip()
+        try:
+            return cls(int(fields.get("Rotate", 0)) % 360, fields.get("Script") or None,
+                       float(fields.get("Orientation confidence", 0)),
+                       float(fields.get("Script confidence", 0)))
+        except ValueError:
+            return None
+
+    def to_dict(self):
+        return {"rotate": self.rotate, "script": self.script,
+                "orientation_confidence": self.orientation_confidence,
+                "script_confidence": self.script_confidence}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    @property
+    def rotation(self):
+        """可信时需要的旋转角度，否则为 0"""
+        if self.rotate in _TRANSPOSE and self.orientation_confidence >= MIN_ORIENTATION_CONFIDENCE:
+            return self.rotate
+        return 0
+
+    def languages(self, lang):
+        """从 lang（如 "chi_sim+eng"）中只保留检测到的文字种类需要的语言包
+
+        文字种类不可靠或 lang 中没有对应的语言包时原样返回。
+        """
+        if self.script_confidence < MIN_SCRIPT_CONFIDENCE:
+            return lang
+        wanted = _SCRIPT_LANGS.get(self.script, ())
+        selected = [name for name in lang.split("+") if name in wanted]
+        return "+".join(selected) if selected else lang
+
+    def apply(self, img):
+        """返回转正后的图片（90 度的倍数，用转置实现，不损失像素）"""
+        rotation = self.rotation
+        return img.transpose(_TRANSPOSE[rotation]) if rotation else img
+
+    def map_box(self, box, size):
+        """把转正后图片上的文字框 (左, 上, 宽, 高) 换算回原图坐标，size 为原图尺寸"""
+        left, top, width, height = box
+        rotation = self.rotation
+        if rotation == 90:
+            return top, size[1] - left - width, height, width
+        if rotation == 180:
+            return size[0] - left - width, size[1] - top - height, width, height
+        if rotation == 270:
+            return size[0] - top - height, left, height, width
+        return box
+
+    def __repr__(self):
+        return (f"Orientation(rotate={self.rotate}, script={self.script!r}, "
+                f"confidence={self.orientation_confidence:g}/{self.script_confidence:g})")
+
+
+def detect_orientation(img):
+    """在缩小的灰度副本上运行 Tesseract OSD，检测页面方向和文字种类
+
+    返回 Orientation；文字太少、缺少 osd.traineddata 等原因无法判断时返回 None，
+    此时按原方向和全部语言识别。
+    """
+    config = "--psm 0"
+    sample = to_grayscale(img)
+    scale = min(1.0, _OSD_MAX_SIZE / max(sample.size))
+    if scale < 1:
+        sample = rescale(sample, scale)
+        dpi = img.info.get("dpi")
+        if dpi and dpi[0] and dpi[0] > 1:
+            config += f" --dpi {max(round(float(dpi[0]) * scale), 70)}"
+    try:
+        with metrics.stage("ocr_osd"):
+            return Orientation.parse(_tesseract().image_to_osd(sample, config=config))
+    except Exception:
+        return None
+
+
+def _orient(img, lang, osd):
+    """按 OSD 结果转正图片并缩减语言，返回 (图片, 语言)"""
+    if osd is None:
+        return img, lang
+    return osd.apply(img), osd.languages(lang)
+
+
+def _prepare(img, config, preprocess):
+    """按 PreprocessOptions 预处理图片，返回 (图片, PreprocessResult 或 None, 参数)"""
+    if preprocess is None:
+        return img, None, config
+    dpi = img.info.get("dpi")
+    dpi = float(dpi[0]) if dpi and dpi[0] and dpi[0] > 1 else None
+    try:
+        with metrics.stage("ocr_preprocess"):
+            result = preprocess_image(img, preprocess, dpi)
+    except Exception as e:
+        raise ConversionError(f"图片预处理失败: {str(e)}") from e
+    if result.dpi and result.scale != 1:
+        # 缩放后告诉 Tesseract 实际分辨率，避免它按图片里过时的DPI估计字号
+        config = f"{config} --dpi {round(result.dpi)}".strip()
+    return result.image, result, config
+
+
+def _page_text(text):
+    """去掉一页识别结果末尾的空白和换页符
+
+    Tesseract 在每页之后输出换页符，这样逐张识别和批量识别（按换页符拆分）得到的同一页
+    文字完全相同，缓存的结果不因识别方式而不同。
+    """
+    return text.rstrip()
+
+
+def image_to_text(img, lang=DEFAULT_LANG, config="", preprocess=None, osd=None):
+    """识别已打开图片中的文字，preprocess 为可选的 PreprocessOptions
+
+    osd 为 detect_orientation 的结果，提供时先转正图片并只使用需要的语言包。
+    """
+    img, lang = _orient(img, lang, osd)
+    img, _, config = _prepare(img, config, preprocess)
+    try:
+        with metrics.stage("ocr"):
+            text = _tesseract().image_to_string(img, lang=lang, config=config)
+    except Exception as e:
+        raise ConversionError(f"文字提取失败: {str(e)}") from e
+    return _page_text(text)
+
+
+def image_to_words(img, lang=DEFAULT_LANG, config="", preprocess=None, osd=None):
+    """识别已打开图片中的单词及其位置，返回 [(左, 上, 宽, 高, 文字), ...]，单位为原图像素"""
+    size = img.size
+    img, lang = _orient(img, lang, osd)
+    img, result, config = _prepare(img, config, preprocess)
+    try:
+        with metrics.stage("ocr"):
+            pytesseract = _tesseract()
+            data = pytesseract.image_to_data(img, lang=lang, config=config,
+                                             output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        raise ConversionError(f"文字提取失败: {str(e)}") from e
+    words = []
+    for i, text in enumerate(data["text"]):
+        if text.strip():
+            box = (data["left"][i], data["top"][i], data["width"][i], data["height"][i])
+            if result is not None:
+                box = result.map_box(*box)
+            if osd is not None:
+                box = osd.map_box(box, size)
+            words.append(box + (text.strip(),))
+    return words
+
+
+def images_to_text(images, lang=DEFAULT_LANG, config="", preprocess=None, osds=None):
+    """用一个 Tesseract 进程识别多张已打开的图片，返回与 images 对应的文字列表
+
+    每启动一次 Tesseract 都要重新加载语言数据（chi_sim 约 40MB），小图片时这部分
+    开销往往比识别本身还大。Tesseract 支持以“每行一个图片路径”的列表文件作为输入，
+    各页文字之间用换页符分隔，据此拆回每张图片的结果。与逐张识别一样只识别第一帧。
+    osds 为与 images 对应的 OSD 结果列表，语言不同的图片分成几批识别。
+    """
+    if osds is not None and any(osd is not None for osd in osds):
+        groups = {}
+        for index, (img, osd) in enumerate(zip(images, osds)):
+            img, image_lang = _orient(img, lang, osd)
+            groups.setdefault(image_lang, []).append((index, img))
+        results = [None] * len(images)
+        for image_lang, members in groups.items():
+            texts = images_to_text([img for _, img in members], image_lang, config, preprocess)
+            for (index, _), text in zip(members, texts):
+                results[index] = text
+        return results
+    if len(images) <= 1:
+        return [image_to_text(img, lang, config, preprocess) for img in images]
+    with tempfile.TemporaryDirectory(prefix="topdf-ocr-") as tmp_dir:
+        paths = []
+        for index, img in enumerate(images):
+            prepared, result, _ = _prepare(img, "", preprocess)
+            if prepared.mode not in ("1", "L", "RGB"):
+                prepared = prepared.convert("RGB")
+            path = os.path.join(tmp_dir, f"{index}.png")
+            # 预处理后的分辨率写在图片里，Tesseract 会读取，不必按图片分别传 --dpi
+            dpi = result.dpi if result is not None else None
+            prepared.save(path, dpi=(dpi, dpi) if dpi else img.info.get("dpi", (0, 0)))
+            paths.append(path)
+        list_path = os.path.join(tmp_dir, "list.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(paths) + "\n")
+        output_base = os.path.join(tmp_dir, "out")
+        try:
+            with metrics.stage("ocr_batch"):
+                _tesseract().pytesseract.run_tesseract(list_path, output_base, "txt", lang,
+                                                       config)
+            with open(output_base + ".txt", encoding="utf-8") as f:
+                pages = f.read().split("\f")
+        except Exception as e:
+            raise ConversionError(f"文字提取失败: {str(e)}") from e
+    if len(pages) < len(images):
+        # 输出页数对不上（如某张图片被 Tesseract 跳过），退回逐张识别
+        return [image_to_text(img, lang, config, preprocess) for img in images]
+    return [_page_text(page) for page in pages[:len(images)]]
+
+
+def extract_text(image_path, lang=DEFAULT_LANG, config="", max_pixels=None, preprocess=None,
+                 orient=False):
+    """从图片中提取文字，orient 为真时先检测方向和文字种类"""
+    with metrics.source(image_path), open_image(image_path, max_pixels) as img:
+        osd = detect_orientation(img) if orient else None
+        return image_to_text(img, lang, config, preprocess, osd)
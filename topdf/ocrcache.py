@@ -0,0 +1,57 @@
+"""OCR 结果缓存
+
+以 (文件内容哈希, 语言, Tesseract 参数) 为键把识别结果保存在 SQLite 中，
+重新处理同一批文件（例如中途崩溃后重跑）时跳过已经识别过的页面。
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .runtime import cache_dir
+
+DEFAULT_OCR_CACHE_NAME = "ocr-cache.sqlite3"
+
+
+def default_ocr_cache_path():
+    return os.path.join(cache_dir(), DEFAULT_OCR_CACHE_NAME)
+
+
+class OcrCache:
+    """线程安全的 OCR 结果缓存，多个进程可以共用同一个数据库文件"""
+
+    def __init__(self, path=None):
+        self.path = path or default_ocr_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr ("
+                " key TEXT PRIMARY KEY,"
+                " text TEXT NOT NULL,"
+                " created REAL NOT NULL)")
+
+    @staticmethod
+    def make_key(content_hash, lang, config=""):
+        """缓存键：内容哈希 + 语言 + 识别参数，任一变化都会重新识别"""
+        options = hashlib.sha256(f"{lang}\0{config}".encode("utf-8")).hexdigest()[:16]
+        return f"{content_hash}:{options}"
+
+    def get(self, key):
+        """返回缓存的文字，未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr (key, text, created) VALUES (?, ?, ?)",
+                (key, text, time.time()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,179 @@
+"""按内容寻址的转换结果缓存
+
+以 (源文件内容哈希, 转换参数) 为键，把转换好的输出文件保存在本地缓存目录中。
+内容相同的文件换了名字或目录再次出现时（重发的附件、复制的文件），直接从缓存中
+复制出输出文件，不再解码、调用办公软件或OCR。缓存总大小有上限，超过时
+按最近使用时间淘汰（LRU）。索引保存在 SQLite 中，多个进程可以共用同一个缓存目录。
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import metrics
+from .runtime import cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_OUTPUT_CACHE_NAME = "output-cache"
+# 默认缓存大小上限：2 GB
+DEFAULT_OUTPUT_CACHE_SIZE = 2 * 1024 ** 3
+
+_INDEX_NAME = "index.sqlite3"
+# Linux 的 FICLONE ioctl：在 Btrfs、XFS 等文件系统上创建写时复制的副本（reflink）
+_FICLONE = 0x40049409
+
+
+def default_output_cache_path():
+    return os.path.join(cache_dir(), DEFAULT_OUTPUT_CACHE_NAME)
+
+
+def _reflink(src, dst):
+    """创建写时复制的副本，文件系统不支持时返回 False"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def _place(src, dst):
+    """把 src 的内容放到 dst：优先 reflink，文件系统不支持时复制
+
+    不使用硬链接：用户的输出文件和缓存共用同一份数据时，原地修改输出会改坏缓存，
+    之后的命中得到的是修改过的内容。先写入临时文件再替换，其他程序不会读到不完整的文件。
+    """
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        if not _reflink(src, tmp):
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class OutputCache:
+    """线程安全的输出缓存，path 为缓存目录，max_size 为总大小上限（字节）"""
+
+    def __init__(self, path=None, max_size=DEFAULT_OUTPUT_CACHE_SIZE):
+        self.path = path or default_output_cache_path()
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        # 正在转换的键 -> [锁, 引用数]：同一批次中内容相同的文件只转换一次
+        self._key_locks = {}
+        self._conn = sqlite3.connect(os.path.join(self.path, _INDEX_NAME), timeout=30,
+                                     check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                " key TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)")
+
+    @staticmethod
+    def make_key(content_hash, options):
+        """缓存键：源文件内容哈希 + 转换参数（见 ConversionEngine.options_key）"""
+        return hashlib.sha256(f"{content_hash}\0{options}".encode("utf-8")).hexdigest()
+
+    def _object_path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    @contextmanager
+    def locked(self, key):
+        """同一进程中同一个键的查找和写入串行执行，后到的线程等前一个转换完成后直接命中"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def fetch(self, key, output_path):
+        """命中时把缓存的输出放到 output_path 并返回 True，未命中返回 False"""
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM outputs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        path = self._object_path(key)
+        try:
+            # 缓存目录中的文件被截断或替换时大小不符，不再使用
+            if os.path.getsize(path) != row[0]:
+                raise OSError("缓存文件已被修改")
+            with metrics.stage("cache_fetch", size=row[0]):
+                _place(path, output_path)
+        except OSError:
+            self._discard(key)
+            return False
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE outputs SET last_used = ? WHERE key = ?",
+                               (time.time(), key))
+        return True
+
+    def store(self, key, output_path):
+        """把转换好的输出存入缓存，超过大小上限时淘汰最久未使用的条目"""
+        size = os.path.getsize(output_path)
+        if size > self.max_size:
+            return
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _place(output_path, path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outputs (key, size, last_used) VALUES (?, ?, ?)",
+                (key, size, time.time()))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+            if total <= self.max_size:
+                return
+            rows = self._conn.execute("SELECT key, size FROM outputs ORDER BY last_used")
+            victims = []
+            for key, size in rows:
+                if total <= self.max_size:
+                    break
+                victims.append(key)
+                total -= size
+        for key in victims:
+            self._discard(key)
+
+    def _discard(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+        try:
+            os.remove(self._object_path(key))
+        except OSError:
+            pass
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,181 @@
+"""并行批量转换
+
+图片的解码和PDF编码都是CPU密集型操作，每个文件互相独立，
+因此按文件分发到进程池即可随核数近似线性扩展；
+文档则由多个线程分别交给办公软件实例池中的不同实例（直接排版的纯文本类文档与图片一样
+在进程池中转换）；
+OCR 由线程调度多个并行的 Tesseract 子进程。
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from . import metrics, ocr
+from .formats import KIND_IMAGE, file_kind
+
+
+def default_workers():
+    """默认进程数：CPU 核数"""
+    return os.cpu_count() or 1
+
+
+# 子进程中复用的转换引擎，由 _init_worker 创建
+_worker_engine = None
+_worker_metrics = False
+
+
+def uses_process(engine, source):
+    """该文件是否在子进程中转换：图片和直接排版的纯文本类文档是纯CPU计算，不需要办公软件"""
+    return file_kind(source) == KIND_IMAGE or engine.renders_text(source)
+
+
+def _worker_settings(engine):
+    """传给子进程的引擎参数（只包含可以 pickle 的值）"""
+    cache = engine.ocr_cache
+    output_cache = engine.output_cache
+    return {
+        "engine_kwargs": {
+            "ocr_lang": engine.ocr_lang,
+            "ocr_config": engine.ocr_config,
+            "ocr_threads": engine.ocr_threads,
+            "ocr_preprocess": engine.ocr_preprocess,
+            "ocr_auto": engine.ocr_auto,
+            "searchable": engine.searchable,
+            "image_options": engine.image_options,
+            "max_image_pixels": engine.max_image_pixels,
+            "pdf_dpi": engine.pdf_dpi,
+            "pdf_rasterize": engine.pdf_rasterize,
+            "pdf_workers": engine.pdf_workers,
+            "office_text": engine.office_text,
+            "text_font": engine.text_font,
+        },
+        "ocr_cache_path": cache.path if cache is not None else None,
+        "manifest_path": engine.manifest.path if engine.manifest is not None else None,
+        "output_cache": ((output_cache.path, output_cache.max_size)
+                         if output_cache is not None else None),
+        "tesseract_cmd": ocr.get_tesseract_path(),
+        # 主进程注册了指标输出时，子进程收集阶段事件随结果带回
+        "metrics": metrics.enabled(),
+    }
+
+
+def _init_worker(settings):
+    """子进程初始化：创建引擎并打开自己的缓存连接"""
+    global _worker_engine, _worker_metrics
+    from .engine import ConversionEngine
+    from .manifest import ConversionManifest
+    from .ocrcache import OcrCache
+    from .outputcache import OutputCache
+
+    # 子进程的事件随结果带回主进程统一输出，不能再直接写入继承来的输出
+    metrics.detach_sinks()
+    ocr.set_tesseract_path(settings["tesseract_cmd"])
+    engine_kwargs = dict(settings["engine_kwargs"])
+    if engine_kwargs["searchable"]:
+        ocr.set_thread_limit(engine_kwargs["ocr_threads"] or 1)
+    if settings["ocr_cache_path"]:
+        engine_kwargs["ocr_cache"] = OcrCache(settings["ocr_cache_path"])
+    if settings["manifest_path"]:
+        engine_kwargs["manifest"] = ConversionManifest(settings["manifest_path"])
+    if settings["output_cache"]:
+        engine_kwargs["output_cache"] = OutputCache(*settings["output_cache"])
+    _worker_engine = ConversionEngine(office_type=None, **engine_kwargs)
+    _worker_metrics = settings.get("metrics", False)
+
+
+def _convert_in_worker(source, output_dir, base_dir, staging_dir=None, name=None):
+    """在子进程中转换单个文件（必须是模块级函数才能被 pickle）"""
+    if not _worker_metrics:
+        return _worker_engine.convert_file(source, output_dir, base_dir, staging_dir, name)
+    with metrics.capture() as events:
+        result = _worker_engine.convert_file(source, output_dir, base_dir, staging_dir, name)
+    result.events = events
+    return result
+
+
+def run_bounded(submit, items, max_pending):
+    """按完成顺序产出 submit(item) 返回的 Future 的结果，同时最多只有 max_pending 个任务在排队或执行
+
+    items 按需惰性读取，不会一次性为成千上万个文件创建任务。
+    """
+    pending = set()
+    items = iter(items)
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < max_pending:
+            try:
+                item = next(items)
+            except StopIteration:
+                exhausted = True
+                break
+            pending.add(submit(item))
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def convert_parallel(engine, items, output_dir=None, workers=None, max_pending=None,
+                     max_tasks_per_child=None, staging_dir=None):
+    """并行转换 items 中的 (源文件, 相对根目录, 输出文件名)，按完成顺序产出结果
+
+    workers 不为 1 时图片分发到进程池（0 或 None 表示使用全部CPU核），否则在线程中转换；
+    文档由 engine.doc_workers 个线程提交给办公软件实例池。
+    同时解码的图片数不超过 workers，排队的任务数不超过 max_pending（默认并发数的两倍），
+    因此内存占用与输入文件数量无关。max_tasks_per_child 可定期回收子进程以释放内存碎片。
+    staging_dir 见 ConversionEngine.convert_file。
+    """
+    use_processes = workers != 1
+    workers = (workers or default_workers()) if use_processes else 1
+    threads = engine.doc_workers + (0 if use_processes else 1)
+    max_pending = max(max_pending or (workers + engine.doc_workers) * 2, 1)
+    output_dir = output_dir or engine.output_dir
+
+    pool_kwargs = {
+        "max_workers": workers,
+        "initializer": _init_worker,
+        "initargs": (_worker_settings(engine),),
+    }
+    if max_tasks_per_child:
+        pool_kwargs["max_tasks_per_child"] = max_tasks_per_child
+    with ExitStack() as stack:
+        thread_pool = stack.enter_context(ThreadPoolExecutor(max_workers=threads))
+        process_pool = None
+        if use_processes:
+            process_pool = stack.enter_context(ProcessPoolExecutor(**pool_kwargs))
+
+        def submit(item):
+            source, base_dir, name = item
+            if process_pool is not None and uses_process(engine, source):
+                return process_pool.submit(_convert_in_worker, source, output_dir, base_dir,
+                                           staging_dir, name)
+            return thread_pool.submit(engine.convert_file, source, output_dir, base_dir,
+                                      staging_dir, name)
+
+        for result in run_bounded(submit, items, max_pending):
+            if result.events:
+                metrics.forward(result.events)
+                result.events = None
+            yield result
+
+
+def extract_text_parallel(engine, items, output_dir=None, workers=None, max_pending=None,
+                          staging_dir=None):
+    """多个 Tesseract 进程并行识别 items 中图片的文字，按完成顺序产出结果
+
+    items 的格式与 convert_parallel 相同。
+    Tesseract 本身在子进程中运行，因此用线程调度即可；每个 Tesseract 进程的
+    OpenMP 线程数由 engine.ocr_threads 控制（并行时默认 1，避免互相争抢CPU）。
+    """
+    workers = workers or default_workers()
+    max_pending = max(max_pending or workers * 2, 1)
+    output_dir = output_dir or engine.output_dir
+    ocr.set_thread_limit(engine.ocr_threads or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(item):
+            source, base_dir, name = item
+            return executor.submit(engine.extract_text_to_file, source, output_dir, base_dir,
+                                   staging_dir, name)
+
+        yield from run_bounded(submit, items, max_pending)
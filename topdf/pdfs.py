@@ -0,0 +1,183 @@
+"""PDF 输入：不经办公软件直接复制，或用 poppler 按页栅格化（用于OCR和规范化）
+
+poppler 的 pdfinfo / pdftoppm 作为子进程运行，打包版本自带（见 runtime.setup_environment）。
+栅格化和 Tesseract 都在子进程中运行，因此用线程调度即可按页并行；页面按顺序写入
+输出PDF，同时处理中的页数有上限，几百页的扫描件内存和临时文件占用也是恒定的。
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from . import capabilities, images, metrics
+from .errors import ConversionError
+from .pdfwriter import PdfWriter
+
+# 栅格化的默认分辨率，300 DPI 是 Tesseract 推荐的识别分辨率
+DEFAULT_PDF_DPI = 300
+
+
+def _probe_poppler():
+    path = shutil.which("pdftoppm")
+    return (os.path.dirname(path), path) if path else (None, None)
+
+
+def find_poppler(refresh=False):
+    """poppler 可执行文件所在的目录，未找到返回 None（结果缓存在磁盘上，见 capabilities）"""
+    return capabilities.cached("poppler", _probe_poppler, refresh)
+
+
+def _tool(name):
+    directory = find_poppler()
+    if directory is None:
+        raise ConversionError("未找到 poppler（pdftoppm），无法栅格化PDF！")
+    return os.path.join(directory, name + (".exe" if sys.platform == "win32" else ""))
+
+
+def _run(args):
+    """运行 poppler 工具，返回标准输出，失败抛出 ConversionError"""
+    try:
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise ConversionError(f"无法运行 {os.path.basename(args[0])}: {str(e)}") from e
+    if process.returncode != 0:
+        message = process.stderr.decode(errors="replace").strip()
+        raise ConversionError(f"PDF 处理失败: {message or f'返回值 {process.returncode}'}")
+    return process.stdout
+
+
+def check_pdf(pdf_path):
+    """检查文件是否为PDF（只读文件头），无效时抛出 ConversionError"""
+    if not os.path.exists(pdf_path):
+        raise ConversionError(f"文件不存在: {pdf_path}")
+    with open(pdf_path, "rb") as f:
+        # 规范允许文件头之前有少量其他数据
+        if b"%PDF-" not in f.read(1024):
+            raise ConversionError(f"无效的PDF文件: {os.path.basename(pdf_path)}")
+
+
+def copy_pdf(pdf_path, output_path):
+    """PDF 本身无需转换，校验后原样复制"""
+    check_pdf(pdf_path)
+    with metrics.stage("pdf_copy", size=os.path.getsize(pdf_path)):
+        shutil.copyfile(pdf_path, output_path)
+
+
+def page_count(pdf_path):
+    """用 pdfinfo 读取页数"""
+    check_pdf(pdf_path)
+    output = _run([_tool("pdfinfo"), pdf_path]).decode(errors="replace")
+    for line in output.splitlines():
+        if line.startswith("Pages:"):
+            return int(line.split(":", 1)[1])
+    raise ConversionError(f"无法读取PDF页数: {os.path.basename(pdf_path)}")
+
+
+def render_page(pdf_path, page, dpi, out_dir):
+    """用 pdftoppm 把第 page 页（从 1 开始）渲染为未压缩的 PPM 图片，返回文件路径
+
+    临时图片只在本机读写一次，不压缩比 PNG 快得多；images 按行区域读取未压缩的大图。
+    """
+    prefix = os.path.join(out_dir, f"page-{page}")
+    with metrics.stage("pdf_render"):
+        _run([_tool("pdftoppm"), "-r", f"{dpi:g}", "-f", str(page), "-l", str(page),
+              "-singlefile", pdf_path, prefix])
+    return prefix + ".ppm"
+
+
+def iter_pages(pdf_path, dpi=DEFAULT_PDF_DPI, workers=1, process=None):
+    """按页序产出 (页序号, 图片, process(图片, 页序号) 的结果)
+
+    各页在 workers 个线程中并行渲染并调用 process（通常是OCR），同时处理的页数
+    不超过 workers 的两倍。提供 process 时产出的就是它处理过的那个已解码的图片，
+    调用方写入时不必再解码一次；否则产出未解码的图片，大图可以按行区域读取。
+    每页的图片和临时文件在调用方处理完这一页之后关闭并删除。
+    """
+    count = page_count(pdf_path)
+    workers = max(workers or 1, 1)
+    max_pending = workers * 2
+    context = metrics.current_context()
+
+    def job(index, out_dir):
+        # 线程中没有调用方的事件上下文：重新标记源文件，子进程中由调用方的 capture 收集
+        with metrics.attach(context, source=pdf_path):
+            path = render_page(pdf_path, index + 1, dpi, out_dir)
+            if process is None:
+                return path, None, None
+            # 自己渲染的临时图片，不需要 open_image 的校验和像素上限
+            img = Image.open(path)
+            try:
+                with metrics.stage("decode"):
+                    img.load()
+                return path, img, process(img, index)
+            except BaseException:
+                img.close()
+                raise
+
+    def discard(future):
+        # 没有交给调用方的页面（出错或提前停止）也要关闭已解码的图片
+        if not future.cancelled() and future.exception() is None:
+            img = future.result()[1]
+            if img is not None:
+                img.close()
+
+    with tempfile.TemporaryDirectory(prefix="topdf-pdf-") as out_dir:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {}
+        try:
+            for index in range(count):
+                while len(futures) < max_pending and index + len(futures) < count:
+                    page = index + len(futures)
+                    futures[page] = executor.submit(job, page, out_dir)
+                path, img, value = futures.pop(index).result()
+                try:
+                    if img is None:
+                        img = Image.open(path)
+                    yield index, img, value
+                finally:
+                    if img is not None:
+                        img.close()
+                    os.remove(path)
+        finally:
+            # 出错或调用方提前停止时不再渲染排队中的页面
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future in futures.values():
+                discard(future)
+
+
+def rasterize_pdf(pdf_path, output_path, dpi=DEFAULT_PDF_DPI, options=None, workers=1,
+                  words_for=None):
+    """把PDF的每一页栅格化为图片页，写入新的PDF，返回页数
+
+    页面尺寸与原文档相同，图片按 options（ImageEncodeOptions）编码。提供
+    words_for(图片, 页序号) 时各页并行OCR，并把结果写为不可见文字层（可搜索PDF）。
+    """
+    options = options or images.DEFAULT_ENCODE_OPTIONS
+    # 渲染出的图片不带DPI信息，页面分辨率必须等于渲染分辨率，页面尺寸才与原文档一致
+    page_options = images.ImageEncodeOptions(dpi, options.quality, options.max_dpi,
+                                             options.jpeg_passthrough, options.lossless)
+    try:
+        with PdfWriter(output_path) as writer:
+            for _, img, words in iter_pages(pdf_path, dpi, workers, words_for):
+                # OCR 时 img 已经解码过，编码直接使用同一份像素
+                images.write_image_pages(writer, img, page_options, img.filename,
+                                         (lambda frame, index: words) if words_for else None)
+            if not writer.page_count:
+                raise ConversionError("PDF 中没有页面！")
+            return writer.page_count
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise ConversionError(f"PDF 栅格化失败: {str(e)}") from e
+
+
+def extract_text(pdf_path, text_for, dpi=DEFAULT_PDF_DPI, workers=1):
+    """栅格化后逐页识别文字，text_for(图片, 页序号) 返回一页的文字
+
+    页与页之间用换页符分隔，与 Tesseract 多页输出的格式一致。
+    """
+    return "\f".join(text for _, _, text in iter_pages(pdf_path, dpi, workers, text_for))
@@ -0,0 +1,274 @@
+"""逐页写入的极简PDF生成器
+
+每添加一页就把图片数据、内容流和页面对象直接写入文件，只在内存中保留
+各对象的偏移量，因此合并成百上千页时内存占用约等于一页解码后的图片。
+除图片页外也可以添加自行绘制的内容页（见 add_content_page，用于文本渲染）。
+"""
+import io
+import os
+import zlib
+
+# 默认分辨率（与 Pillow 保存PDF时使用的一致）
+DEFAULT_RESOLUTION = 100.0
+DEFAULT_QUALITY = 95
+
+_CATALOG_ID = 1
+_PAGES_ID = 2
+
+# 不可见文字层使用的字体：文字不显示（渲染模式 3），只用于搜索和复制，因此不嵌入字体文件。
+# 字符以 Unicode 码位作为 CID（Identity-H 编码）写入，ToUnicode 映射保证各阅读器都能提取文字
+_TEXT_FONT_NAME = "GlyphLessFont"
+_TEXT_FONT_RESOURCE = "/FText"
+
+
+def partial_path(path):
+    """写入过程中使用的临时文件名（同一目录，完成后用 os.replace 原子地替换为目标文件）"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.part{ext}"
+
+
+def _pdf_name(value):
+    return "/" + value
+
+
+def _utf16_hex(text):
+    """文字层字符串编码：两字节 Unicode 码位的十六进制，基本平面以外的字符替换为问号"""
+    text = "".join(ch if ord(ch) <= 0xFFFF and not 0xD800 <= ord(ch) <= 0xDFFF else "?"
+                   for ch in text)
+    return text.encode("utf-16-be").hex().upper()
+
+
+def _to_unicode_cmap():
+    """CID（即两字节 Unicode 码位）到 Unicode 的恒等映射"""
+    ranges = [f"<{hi:02X}00> <{hi:02X}FF> <{hi:02X}00>" for hi in range(256)
+              if not 0xD8 <= hi <= 0xDF]
+    lines = [
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+    ]
+    for i in range(0, len(ranges), 100):
+        block = ranges[i:i + 100]
+        lines.append(f"{len(block)} beginbfrange")
+        lines.extend(block)
+        lines.append("endbfrange")
+    lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+    return "\n".join(lines).encode()
+
+
+class PdfWriter:
+    """把图片逐页写入一个PDF文件
+
+    先写入临时文件，close() 时才替换为目标文件，中途失败不会留下半个PDF。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = partial_path(path)
+        self._fp = open(self._tmp_path, "wb")
+        self._offsets = {}
+        self._next_id = _PAGES_ID + 1
+        self._page_ids = []
+        self._text_font_id = None
+        self._closed = False
+        self._fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+
+    def _reserve(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        """写入一个对象，stream 为字节串，或 (长度, 数据块迭代器)（数据很大时逐块写入）"""
+        self._offsets[obj_id] = self._fp.tell()
+        self._fp.write(f"{obj_id} 0 obj\n".encode())
+        if stream is None:
+            self._fp.write(body.encode() + b"\nendobj\n")
+            return
+        if isinstance(stream, tuple):
+            length, chunks = stream
+        else:
+            length, chunks = len(stream), (stream,)
+        prefix = f"<< {body} " if body else "<< "
+        self._fp.write(f"{prefix}/Length {length} >>\nstream\n".encode())
+        written = 0
+        for chunk in chunks:
+            self._fp.write(chunk)
+            written += len(chunk)
+        if written != length:
+            raise ValueError(f"数据流长度不符: 应为 {length}，实际 {written}")
+        self._fp.write(b"\nendstream\nendobj\n")
+
+    def reserve_object(self):
+        """预留一个对象编号：页面可以先引用，对象稍后再写入（如最后才能确定字形的子集字体）
+
+        预留的对象必须在 close() 之前用 write_object 写入。
+        """
+        return self._reserve()
+
+    def write_object(self, obj_id, body, stream=None):
+        """写入一个对象；有 stream 时 body 为字典内容（不含两侧的 << >> 和 /Length）"""
+        self._write_object(obj_id, body, stream)
+
+    def _text_font(self):
+        """写入文字层字体（整个文件只写一次），返回字体对象编号"""
+        if self._text_font_id is None:
+            font_id = self._reserve()
+            cid_font_id = self._reserve()
+            descriptor_id = self._reserve()
+            cmap_id = self._reserve()
+            self._write_object(
+                descriptor_id,
+                f"<< /Type /FontDescriptor /FontName /{_TEXT_FONT_NAME} /Flags 6 "
+                "/FontBBox [-25 -254 1000 880] /ItalicAngle 0 /Ascent 880 /Descent -120 "
+                "/CapHeight 880 /StemV 93 >>")
+            self._write_object(
+                cid_font_id,
+                f"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{_TEXT_FONT_NAME} "
+                "/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+                f"/FontDescriptor {descriptor_id} 0 R /DW 1000 >>")
+            self._write_object(cmap_id, "", _to_unicode_cmap())
+            self._write_object(
+                font_id,
+                f"<< /Type /Font /Subtype /Type0 /BaseFont /{_TEXT_FONT_NAME} "
+                f"/Encoding /Identity-H /DescendantFonts [{cid_font_id} 0 R] "
+                f"/ToUnicode {cmap_id} 0 R >>")
+            self._text_font_id = font_id
+        return self._text_font_id
+
+    @staticmethod
+    def _text_layer_ops(words):
+        """不可见文字（渲染模式 3）的内容流，words 为 (x, y, 宽, 高, 文字)，单位为点"""
+        ops = ["BT", "3 Tr"]
+        for x, y, w, h, text in words:
+            text = text.strip()
+            if not text or w <= 0 or h <= 0:
+                continue
+            # 字体宽度统一按 1000（全角）计算，用水平缩放把文字拉伸到识别框的宽度
+            scale = 100.0 * w / (len(text) * h)
+            ops.append(f"{_TEXT_FONT_RESOURCE} {h:.2f} Tf {scale:.2f} Tz "
+                       f"1 0 0 1 {x:.2f} {y:.2f} Tm <{_utf16_hex(text)}> Tj")
+        ops.append("ET")
+        return "\n".join(ops)
+
+    def add_image_page(self, data, width, height, color_space, bits=8, filter_name=None,
+                       resolution=DEFAULT_RESOLUTION, extra="", words=None):
+        """添加一页，页面大小由像素尺寸和分辨率决定，图片铺满整页
+
+        data 是已编码的图片数据，filter_name 为对应的PDF解码过滤器（如 DCTDecode）。
+        data 也可以是 (长度, 数据块迭代器)，用于不经内存直接转写的大数据。
+        resolution 为DPI，水平和垂直分辨率不同时（如传真的 204x98）传入 (水平, 垂直)。
+        words 为可选的OCR文字框 (x, y, 宽, 高, 文字)，单位为点、原点在页面左下角，
+        写为不可见的文字层，使PDF可搜索、可复制。
+        """
+        self.add_strip_page([(data, height, color_space, bits, filter_name, extra)],
+                            width, height, resolution, words)
+
+    def add_strip_page(self, strips, width, height, resolution=DEFAULT_RESOLUTION, words=None):
+        """由从上到下的若干横条拼成一页，用于超大图片：每个条带单独编码，写完即释放
+
+        strips 依次产出 (数据, 条带高度, 色彩空间, 位数, 过滤器, 附加字典项)，
+        条带宽度都等于 width，高度之和等于 height（像素）。其余参数同 add_image_page。
+        """
+        placed = []
+        for data, strip_height, color_space, bits, filter_name, extra in strips:
+            image_id = self._reserve()
+            image_dict = (f"/Type /XObject /Subtype /Image /Width {width} /Height {strip_height} "
+                          f"/ColorSpace {color_space} /BitsPerComponent {bits}")
+            if filter_name:
+                image_dict += f" /Filter {_pdf_name(filter_name)}"
+            if extra:
+                image_dict += " " + extra
+            self._write_object(image_id, image_dict, data)
+            placed.append((image_id, strip_height))
+        if sum(strip_height for _, strip_height in placed) != height:
+            raise ValueError("条带高度之和与页面高度不符")
+
+        x_res, y_res = resolution if isinstance(resolution, tuple) else (resolution, resolution)
+        page_width = width * 72.0 / x_res
+        page_height = height * 72.0 / y_res
+        ops, names = [], []
+        top = 0
+        for index, (image_id, strip_height) in enumerate(placed):
+            # PDF 坐标原点在左下角，条带从页面顶部依次向下排列
+            y = (height - top - strip_height) * 72.0 / y_res
+            ops.append(f"q {page_width:.4f} 0 0 {strip_height * 72.0 / y_res:.4f} 0 {y:.4f} cm "
+                       f"/Im{index} Do Q")
+            names.append(f"/Im{index} {image_id} 0 R")
+            top += strip_height
+        contents = "\n".join(ops)
+        resources = f"/XObject << {' '.join(names)} >>"
+        if words:
+            contents += "\n" + self._text_layer_ops(words)
+            resources += f" /Font << {_TEXT_FONT_RESOURCE} {self._text_font()} 0 R >>"
+        self.add_content_page(page_width, page_height, contents, resources)
+
+    def add_content_page(self, width, height, contents, resources=""):
+        """添加一页自行绘制的内容，width、height 为页面尺寸（点）
+
+        contents 为内容流（字符串），resources 为资源字典的内容，如 "/Font << /F1 5 0 R >>"。
+        内容流用 Flate 压缩，排满文字的页面通常可缩小到原来的四分之一以下。
+        """
+        contents_id = self._reserve()
+        page_id = self._reserve()
+        self._write_object(contents_id, "/Filter /FlateDecode", zlib.compress(contents.encode()))
+        self._write_object(
+            page_id,
+            f"<< /Type /Page /Parent {_PAGES_ID} 0 R "
+            f"/MediaBox [0 0 {width:.4f} {height:.4f}] "
+            f"/Resources << {resources} >> "
+            f"/Contents {contents_id} 0 R >>")
+        self._page_ids.append(page_id)
+
+    def close(self):
+        """写入页面树、交叉引用表并生成最终文件"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+            self._write_object(
+                _PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>")
+            self._write_object(_CATALOG_ID, f"<< /Type /Catalog /Pages {_PAGES_ID} 0 R >>")
+
+            xref_offset = self._fp.tell()
+            xref = io.StringIO()
+            xref.write(f"xref\n0 {self._next_id}\n0000000000 65535 f \n")
+            for obj_id in range(1, self._next_id):
+                xref.write(f"{self._offsets[obj_id]:010d} 00000 n \n")
+            xref.write(f"trailer\n<< /Size {self._next_id} /Root {_CATALOG_ID} 0 R >>\n"
+                       f"startxref\n{xref_offset}\n%%EOF\n")
+            self._fp.write(xref.getvalue().encode())
+            self._fp.close()
+            os.replace(self._tmp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self._closed = True
+        self._fp.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,122 @@
+"""批量转换的读/写流水线：预读后面的输入，后台写出转换好的输出
+
+转换本身（解码、编码、OCR、办公软件）在 convert_many 的线程或进程池中进行，
+这里在它前后各加一个阶段，阶段之间的队列都有上限：
+
+    prefetch      后台线程按顺序把后面几个输入文件读入操作系统的文件缓存，
+                  转换（包括子进程、办公软件和 poppler）打开文件时直接命中内存，
+                  不必等待网络共享或慢速磁盘
+    write_behind  输出先写在本机的暂存目录中，后台线程再移到输出目录（跨文件系统时
+                  先复制为临时文件再原子地改名），转换不必等待写入网络共享
+
+预读使用操作系统的文件缓存而不是进程内的缓冲区，因此对子进程和外部程序同样有效，
+也不需要把文件内容传给它们。
+"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from . import metrics
+
+# 默认预读的文件数和预读中（尚未交给转换）的文件总大小上限
+DEFAULT_PREFETCH = 4
+DEFAULT_PREFETCH_BYTES = 256 * 1024 ** 2
+# 每次读取的字节数
+_READ_CHUNK = 1 << 20
+
+
+def read_ahead(path):
+    """读一遍文件，让内容进入操作系统的文件缓存，返回读取的字节数"""
+    total = 0
+    buf = bytearray(_READ_CHUNK)
+    with metrics.stage("prefetch", source=path) as timing, open(path, "rb", buffering=0) as f:
+        while True:
+            count = f.readinto(buf)
+            if not count:
+                break
+            total += count
+        timing.size = total
+    return total
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def prefetch(items, depth=DEFAULT_PREFETCH, max_bytes=DEFAULT_PREFETCH_BYTES, workers=2,
+             wanted=None):
+    """按原顺序产出 items 中的 (源文件, 相对根目录)，同时在后台预读后面最多 depth 个文件
+
+    预读中的文件总大小不超过 max_bytes，单个超过 max_bytes 的文件不预读（读进来也会
+    被挤出缓存）；wanted(条目) 返回 False 的文件（如增量转换时会跳过的）也不预读。
+    产出一个文件前等待它的预读完成，预读失败时照常产出，由转换报告错误。
+    """
+    items = iter(items)
+    depth = max(depth, 1)
+    # 已取出、尚未产出的 [条目, 大小, 预读任务]
+    pending = deque()
+    budget = 0
+    exhausted = False
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while not exhausted and len(pending) < depth:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                size = _file_size(item[0])
+                if size is None or size > max_bytes or (wanted is not None and not wanted(item)):
+                    pending.append([item, 0, False])
+                else:
+                    pending.append([item, size, None])
+            # 按顺序提交预读，超出预算的等前面的文件交给转换后再读
+            for entry in pending:
+                if entry[2] is not None:
+                    continue
+                if budget and budget + entry[1] > max_bytes:
+                    break
+                entry[2] = executor.submit(read_ahead, entry[0][0])
+                budget += entry[1]
+            if not pending:
+                return
+            item, size, future = pending.popleft()
+            if future:
+                budget -= size
+                try:
+                    future.result()
+                except OSError:
+                    pass
+            yield item
+    finally:
+        # 调用方提前停止时不再读取排队中的文件
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def write_behind(engine, results, writers=2, max_pending=None):
+    """在后台线程中把暂存的输出移到输出目录（engine.commit_output），按完成顺序产出结果
+
+    results 为 convert_file / extract_text_to_file 在 staging_dir 下的转换结果，没有
+    暂存输出的（跳过、失败）直接产出。等待写入的文件不超过 max_pending 个（默认
+    writers 的两倍），写入跟不上时暂停转换，暂存目录的占用因此有上限。
+    """
+    max_pending = max(max_pending or writers * 2, 1)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        for result in results:
+            if result.staged is None:
+                yield result
+                continue
+            pending.add(executor.submit(engine.commit_output, result))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = {future for future in pending if future.done()}
+                pending -= done
+            for future in done:
+                yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
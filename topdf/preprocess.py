@@ -0,0 +1,263 @@
+"""OCR 前的图片预处理
+
+扫描件的分辨率和色彩深度往往远超识别所需，600 DPI 的彩色图交给 Tesseract
+既慢又不会更准。这里的各个步骤都只使用 Pillow 内置的整图运算（C 实现），
+不逐像素遍历：灰度化、缩放到目标DPI、纠偏、裁掉边框、二值化。
+
+预处理会改变图片尺寸和位置，PreprocessResult.map_box 用于把识别出的文字框
+换算回原图坐标（生成可搜索PDF时需要）。
+"""
+import math
+
+from PIL import Image, ImageOps
+
+# Tesseract 在 300 DPI 左右识别效果最好
+DEFAULT_TARGET_DPI = 300
+# 估计倾斜角度时使用的缩略图最长边
+_SKEW_SAMPLE_SIZE = 800
+
+
+class PreprocessOptions:
+    """预处理参数
+
+    grayscale: 转为灰度
+    target_dpi: 缩放到该DPI（图片未记录DPI时不缩放），None 表示不缩放
+    deskew: 检测并纠正倾斜，max_skew 为检测范围（度）
+    crop_borders: 裁掉扫描产生的四周空白/黑边
+    binarize: 用 Otsu 阈值二值化
+    """
+
+    def __init__(self, grayscale=True, target_dpi=None, deskew=False, max_skew=5.0,
+                 crop_borders=False, binarize=False):
+        self.grayscale = grayscale
+        self.target_dpi = target_dpi
+        self.deskew = deskew
+        self.max_skew = max_skew
+        self.crop_borders = crop_borders
+        self.binarize = binarize
+
+    @classmethod
+    def parse(cls, spec):
+        """从逗号分隔的字符串解析，如 "gray,dpi=300,deskew,crop,binarize"；"none" 表示不做任何处理"""
+        options = cls(grayscale=False)
+        for item in filter(None, (part.strip().lower() for part in spec.split(","))):
+            name, _, value = item.partition("=")
+            if name == "none":
+                continue
+            if name in ("gray", "grayscale"):
+                options.grayscale = True
+            elif name == "dpi":
+                options.target_dpi = float(value) if value else DEFAULT_TARGET_DPI
+            elif name == "deskew":
+                options.deskew = True
+                if value:
+                    options.max_skew = float(value)
+            elif name == "crop":
+                options.crop_borders = True
+            elif name == "binarize":
+                options.binarize = True
+            else:
+                raise ValueError(f"未知的预处理步骤: {name}")
+        return options
+
+    def key(self):
+        """用于缓存键的参数描述"""
+        parts = []
+        if self.grayscale:
+            parts.append("gray")
+        if self.target_dpi:
+            parts.append(f"dpi={self.target_dpi:g}")
+        if self.deskew:
+            parts.append(f"deskew={self.max_skew:g}")
+        if self.crop_borders:
+            parts.append("crop")
+        if self.binarize:
+            parts.append("binarize")
+        return ",".join(parts) or "none"
+
+    def __repr__(self):
+        return f"PreprocessOptions({self.key()!r})"
+
+
+class PreprocessResult:
+    """预处理后的图片以及回到原图坐标的换算参数"""
+
+    def __init__(self, image, scale=1.0, angle=0.0, rotated_size=None, offset=(0, 0), dpi=None):
+        self.image = image
+        self.scale = scale
+        self.angle = angle
+        self.rotated_size = rotated_size
+        self.offset = offset
+        self.dpi = dpi
+
+    def map_box(self, left, top, width, height):
+        """把预处理后图片上的文字框换算回原图坐标"""
+        left += self.offset[0]
+        top += self.offset[1]
+        if self.angle:
+            # 纠偏时图片绕中心旋转（尺寸不变），把框的中心点转回去
+            cx, cy = self.rotated_size[0] / 2.0, self.rotated_size[1] / 2.0
+            x, y = left + width / 2.0 - cx, top + height / 2.0 - cy
+            rad = math.radians(-self.angle)
+            # 图像坐标系 y 轴向下，逆时针旋转在这里对应 (x, y) -> (x cos + y sin, -x sin + y cos)
+            x, y = (x * math.cos(rad) + y * math.sin(rad),
+                    -x * math.sin(rad) + y * math.cos(rad))
+            left, top = x + cx - width / 2.0, y + cy - height / 2.0
+        s = self.scale
+        return (round(left / s), round(top / s), round(width / s), round(height / s))
+
+
+def to_grayscale(img):
+    if img.mode == "L":
+        return img
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img)
+    return img.convert("L")
+
+
+def rescale(img, scale):
+    """按比例缩放，缩小用 BOX（快速且抗锯齿），放大用 BICUBIC"""
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if size == img.size:
+        return img
+    if img.mode == "1":
+        img = img.convert("L")
+    return img.resize(size, Image.BOX if scale < 1 else Image.BICUBIC)
+
+
+def otsu_threshold(img):
+    """基于灰度直方图计算 Otsu 阈值（只处理 256 个直方图桶）"""
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    if not total:
+        return 128
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best_threshold, best_variance = 128, -1.0
+    for t, count in enumerate(hist):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = t, variance
+    return best_threshold
+
+
+def binarize(img, threshold=None):
+    """二值化为 0/255 的灰度图"""
+    gray = to_grayscale(img)
+    if threshold is None:
+        threshold = otsu_threshold(gray)
+    return gray.point(lambda v: 255 if v > threshold else 0)
+
+
+def _row_profile_score(img):
+    """水平投影的“尖锐度”：文字行与行间距对比越强，得分越高"""
+    # 缩放到 1 像素宽即得到每行的平均灰度（Pillow 内部用 C 完成）
+    rows = list(img.resize((1, img.height), Image.BOX).getdata())
+    return sum((rows[i + 1] - rows[i]) ** 2 for i in range(len(rows) - 1))
+
+
+def estimate_skew(img, max_angle=5.0, step=0.25):
+    """用投影轮廓法估计纠偏所需的旋转角度（度，逆时针为正）"""
+    sample = to_grayscale(img)
+    sample.thumbnail((_SKEW_SAMPLE_SIZE, _SKEW_SAMPLE_SIZE), Image.BOX)
+    # 文字为白、背景为黑，旋转填充的黑边不会干扰投影
+    sample = ImageOps.invert(binarize(sample))
+
+    def score(angle):
+        return _row_profile_score(sample.rotate(angle, resample=Image.NEAREST))
+
+    # 先粗扫再在最佳角度附近细扫
+    coarse = max(step * 4, 1.0)
+    candidates = [i * coarse for i in range(-int(max_angle / coarse), int(max_angle / coarse) + 1)]
+    best = max(candidates, key=score)
+    fine = [best + i * step for i in range(-int(coarse / step), int(coarse / step) + 1)
+            if abs(best + i * step) <= max_angle]
+    best = max(fine, key=score)
+    return 0.0 if abs(best) < step / 2 else best
+
+
+def deskew(img, angle):
+    """按角度旋转纠偏，尺寸不变，空出的区域填白色"""
+    if not angle:
+        return img
+    fill = 255 if img.mode in ("L", "1") else (255,) * len(img.getbands())
+    return img.rotate(angle, resample=Image.BICUBIC, fillcolor=fill)
+
+
+def content_bbox(img, margin=10):
+    """内容区域（去掉四周空白和扫描黑边），找不到内容时返回 None"""
+    gray = to_grayscale(img)
+    small = gray
+    scale = 1.0
+    if max(gray.size) > 1000:
+        scale = 1000 / max(gray.size)
+        small = rescale(gray, scale)
+    # 反相后深色（文字和黑边）为白，getbbox 即可去掉四周的空白
+    bw = ImageOps.invert(binarize(small))
+    bbox = bw.getbbox()
+    if not bbox:
+        return None
+    # 扫描黑边几乎整行/整列都是深色：从边缘向内跳过这些行列，再取一次内容框
+    left, top, right, bottom = bbox
+    cols = list(bw.resize((bw.width, 1), Image.BOX).getdata())
+    rows = list(bw.resize((1, bw.height), Image.BOX).getdata())
+    while left < right - 1 and cols[left] > 200:
+        left += 1
+    while right - 1 > left and cols[right - 1] > 200:
+        right -= 1
+    while top < bottom - 1 and rows[top] > 200:
+        top += 1
+    while bottom - 1 > top and rows[bottom - 1] > 200:
+        bottom -= 1
+    inner = bw.crop((left, top, right, bottom)).getbbox()
+    if not inner:
+        return None
+    left, top, right, bottom = (left + inner[0], top + inner[1], left + inner[2], top + inner[3])
+    left, top = max(0, int(left / scale) - margin), max(0, int(top / scale) - margin)
+    right = min(gray.width, int(math.ceil(right / scale)) + margin)
+    bottom = min(gray.height, int(math.ceil(bottom / scale)) + margin)
+    return left, top, right, bottom
+
+
+def preprocess(img, options, dpi=None):
+    """按 options 预处理图片，返回 PreprocessResult；dpi 为原图分辨率（未知时为 None）"""
+    result = PreprocessResult(img, dpi=dpi)
+    if options.grayscale or options.binarize or options.deskew or options.crop_borders:
+        img = to_grayscale(img)
+
+    if options.target_dpi and dpi:
+        scale = options.target_dpi / dpi
+        if abs(scale - 1) > 0.05:
+            img = rescale(img, scale)
+            result.scale = img.width / result.image.width
+            result.dpi = dpi * result.scale
+
+    if options.deskew:
+        angle = estimate_skew(img, options.max_skew)
+        if angle:
+            img = deskew(img, angle)
+            result.angle = angle
+            result.rotated_size = img.size
+
+    if options.crop_borders:
+        bbox = content_bbox(img)
+        if bbox and bbox != (0, 0) + img.size:
+            img = img.crop(bbox)
+            result.offset = bbox[:2]
+
+    if options.binarize:
+        img = binarize(img)
+
+    result.image = img
+    return result
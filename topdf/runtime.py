@@ -0,0 +1,39 @@
+"""运行环境相关的路径处理（源码运行 / PyInstaller 打包运行）"""
+import os
+import sys
+
+
+def is_frozen():
+    """是否为打包后的可执行程序"""
+    return getattr(sys, 'frozen', False)
+
+
+# 处理打包后的资源路径
+def resource_path(relative_path):
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+def default_tesseract_path():
+    """默认的 Tesseract 可执行文件路径"""
+    if is_frozen():
+        return resource_path("Tesseract-OCR/tesseract.exe")
+    return r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # 开发环境路径
+
+
+def cache_dir():
+    """本工具的缓存目录（OCR 结果等）"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "topdf")
+
+
+def setup_environment():
+    """打包运行时把内置的 poppler 加入 PATH"""
+    if is_frozen():
+        poppler_bin = resource_path("poppler/bin")
+        if poppler_bin not in os.environ.get("PATH", "").split(os.pathsep):
+            os.environ["PATH"] += os.pathsep + poppler_bin
@@ -0,0 +1,442 @@
+"""本地 HTTP 转换服务
+
+    python -m topdf.server --port 8765
+
+常驻进程让办公软件实例（DocumentWorkerPool）保持运行，不必每次转换都启动、退出 Word；
+同时到达的 OCR 请求合并为一次 Tesseract 调用，语言数据只加载一次。
+
+接口（请求体为文件原始内容，支持 Content-Length 或分块传输）：
+
+    POST /convert?filename=a.docx     返回 PDF
+    POST /ocr?filename=a.png&lang=eng 返回 UTF-8 文本
+    GET  /health                      返回 JSON 状态
+    GET  /metrics                     返回各转换阶段的 Prometheus 指标
+
+前端基于 asyncio，上传和下载都按块流式读写，不把整个文件放入内存。
+转换在有上限的线程池中执行；排队和执行中的请求达到 max_queue 时直接返回 503，
+由客户端稍后重试，而不是无限堆积。
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from . import metrics, ocr
+from .errors import ConversionError
+from .formats import KIND_IMAGE, KIND_PDF, file_kind
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_UPLOAD = 200 * 1024 * 1024
+DEFAULT_OCR_BATCH_SIZE = 8
+# 等待更多 OCR 请求合并为一批的时间（秒）
+DEFAULT_OCR_BATCH_WAIT = 0.05
+
+_CHUNK_SIZE = 64 * 1024
+# 空闲的 keep-alive 连接保留多久（秒）
+_KEEP_ALIVE_TIMEOUT = 30
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, close=False):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.close = close
+
+
+class _OcrBatcher:
+    """把短时间内到达的 OCR 请求（同一语言）合并为一次 Tesseract 调用"""
+
+    def __init__(self, server, batch_size, batch_wait):
+        self.server = server
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = batch_wait
+        self._pending = {}
+
+    async def extract(self, image_path, lang):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(lang, [])
+        batch.append((image_path, future))
+        if len(batch) == 1:
+            loop.call_later(self.batch_wait, self._flush, lang)
+        elif len(batch) >= self.batch_size:
+            self._flush(lang)
+        return await future
+
+    def _flush(self, lang):
+        batch = self._pending.pop(lang, None)
+        if batch:
+            asyncio.ensure_future(self._run(batch, lang))
+
+    async def _run(self, batch, lang):
+        paths = [path for path, _ in batch]
+        try:
+            results = await self.server.run_blocking(self.server.engine.extract_text_batch,
+                                                     paths, lang)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class ConversionServer:
+    """基于 asyncio 的本地转换服务，转换工作交给有上限的线程池"""
+
+    def __init__(self, engine, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None,
+                 max_queue=DEFAULT_MAX_QUEUE, max_upload=DEFAULT_MAX_UPLOAD, spool_dir=None,
+                 ocr_batch_size=DEFAULT_OCR_BATCH_SIZE, ocr_batch_wait=DEFAULT_OCR_BATCH_WAIT,
+                 metrics_sink=None):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.workers = workers or min(os.cpu_count() or 1, 8)
+        self.max_queue = max_queue
+        self.max_upload = max_upload
+        self.spool_dir = spool_dir
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="topdf-server")
+        self._batcher = _OcrBatcher(self, ocr_batch_size, ocr_batch_wait)
+        # 提供 GET /metrics 的 PrometheusSink（需已通过 metrics.add_sink 注册），None 表示不提供
+        self.metrics_sink = metrics_sink
+        # 已接收（正在上传、排队或转换）的请求数，用于背压
+        self._active = 0
+        self._completed = 0
+        self._server = None
+        # 文档转换后端名称，启动时在线程中检测一次（检测办公软件可能要几秒）
+        self._backend = None
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def start(self):
+        self._backend = await self.run_blocking(lambda: self.engine.office_type)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # port 为 0 时使用系统分配的端口
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+
+    # ---------------- HTTP ----------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            # 服务停止时取消仍然打开的连接
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _handle_request(self, reader, writer):
+        """处理一个请求，返回连接是否可以继续使用"""
+        request_line = await asyncio.wait_for(reader.readline(), _KEEP_ALIVE_TIMEOUT)
+        if not request_line.strip():
+            return False
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            await self._send_error(writer, HttpError(400, "无效的请求行"), close=True)
+            return False
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = (headers.get("connection", "").lower() != "close"
+                      and version.upper() == "HTTP/1.1")
+
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/health":
+                if method != "GET":
+                    raise HttpError(405, "只支持 GET", close=True)
+                await self._send_json(writer, 200, self.status(), keep_alive)
+                return keep_alive
+            if url.path == "/metrics" and self.metrics_sink is not None:
+                if method != "GET":
+                    raise HttpError(405, "只支持 GET", close=True)
+                body = self.metrics_sink.render().encode("utf-8")
+                await self._send_bytes(writer, 200, body,
+                                       "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+                return keep_alive
+            if url.path not in ("/convert", "/ocr"):
+                raise HttpError(404, f"未知的路径: {url.path}", close=True)
+            if method != "POST":
+                raise HttpError(405, "只支持 POST", close=True)
+            if self._active >= self.max_queue:
+                # 请求体尚未读取，直接关闭连接
+                raise HttpError(503, "服务繁忙，请稍后重试", close=True)
+            self._active += 1
+            try:
+                await self._handle_job(url.path, params, headers, reader, writer, keep_alive)
+            finally:
+                self._active -= 1
+                self._completed += 1
+            return keep_alive
+        except HttpError as e:
+            close = e.close or not keep_alive
+            await self._send_error(writer, e, close)
+            return not close
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            raise
+        except Exception:
+            # 未预料的错误：记录下来并返回 500，请求体可能没有读完，因此关闭连接
+            print(f"处理请求 {method} {url.path} 时出错:", file=sys.stderr)
+            traceback.print_exc()
+            await self._send_error(writer, HttpError(500, "服务器内部错误"), close=True)
+            return False
+
+    async def _handle_job(self, path, params, headers, reader, writer, keep_alive):
+        filename = os.path.basename(unquote(params.get("filename", "")))
+        kind = file_kind(filename) if filename else None
+        if kind is None:
+            raise HttpError(400, "请用 filename 参数给出带扩展名的文件名，且格式受支持", close=True)
+        if path == "/ocr" and kind not in (KIND_IMAGE, KIND_PDF):
+            raise HttpError(400, "仅支持从图片或PDF中提取文字", close=True)
+
+        work_dir = tempfile.mkdtemp(prefix="topdf-server-", dir=self.spool_dir)
+        try:
+            source = os.path.join(work_dir, filename)
+            if headers.get("expect", "").lower() == "100-continue":
+                # 已确认可以接收，客户端这时才开始上传
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                await writer.drain()
+            await self._receive_body(headers, reader, source)
+            try:
+                if path == "/ocr":
+                    if kind == KIND_PDF:
+                        # PDF 自己按页并行识别，不参与图片的合批
+                        text = await self.run_blocking(self.engine.extract_pdf_text, source,
+                                                       params.get("lang") or None)
+                    else:
+                        text = await self._batcher.extract(source, params.get("lang") or None)
+                    await self._send_bytes(writer, 200, text.encode("utf-8"),
+                                           "text/plain; charset=utf-8", keep_alive)
+                    return
+                pdf_path = os.path.join(work_dir, "output.pdf")
+                await self.run_blocking(self._convert, source, kind, pdf_path)
+            except ConversionError as e:
+                raise HttpError(422, self._client_message(str(e), work_dir))
+            await self._send_file(writer, pdf_path, "application/pdf", keep_alive,
+                                  os.path.splitext(filename)[0] + ".pdf")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def _client_message(message, work_dir):
+        """错误信息中不暴露服务器上的临时目录，只保留客户端给出的文件名"""
+        message = message.replace(os.path.join(work_dir, ""), "")
+        return message.replace(work_dir, "")
+
+    def _convert(self, source, kind, pdf_path):
+        if kind == KIND_IMAGE:
+            self.engine.convert_image(source, pdf_path)
+        elif kind == KIND_PDF:
+            self.engine.convert_pdf(source, pdf_path)
+        else:
+            self.engine.convert_document(source, pdf_path)
+
+    async def _receive_body(self, headers, reader, path):
+        """把请求体按块写入文件"""
+        received = 0
+        with open(path, "wb") as f:
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size_line = await reader.readline()
+                    try:
+                        size = int(size_line.split(b";")[0].strip(), 16)
+                    except ValueError:
+                        raise HttpError(400, "无效的分块编码", close=True)
+                    if size == 0:
+                        # 跳过 trailer
+                        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                            pass
+                        break
+                    received += size
+                    if received > self.max_upload:
+                        raise HttpError(413, "上传的文件过大", close=True)
+                    while size:
+                        chunk = await reader.read(min(size, _CHUNK_SIZE))
+                        if not chunk:
+                            raise asyncio.IncompleteReadError(b"", size)
+                        f.write(chunk)
+                        size -= len(chunk)
+                    await reader.readline()
+            else:
+                if "content-length" not in headers:
+                    raise HttpError(411, "需要 Content-Length 或分块传输", close=True)
+                try:
+                    remaining = int(headers["content-length"])
+                except ValueError:
+                    raise HttpError(400, "无效的 Content-Length", close=True)
+                if remaining < 0:
+                    raise HttpError(400, "无效的 Content-Length", close=True)
+                if remaining > self.max_upload:
+                    raise HttpError(413, "上传的文件过大", close=True)
+                while remaining:
+                    chunk = await reader.read(min(remaining, _CHUNK_SIZE))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+
+    def status(self):
+        return {
+            "status": "ok",
+            "backend": self._backend,
+            "workers": self.workers,
+            "active": self._active,
+            "max_queue": self.max_queue,
+            "completed": self._completed,
+        }
+
+    @staticmethod
+    def _head(status, content_type, length, keep_alive, extra=()):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {length}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(extra)
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+    async def _send_bytes(self, writer, status, body, content_type, keep_alive, extra=()):
+        writer.write(self._head(status, content_type, len(body), keep_alive, extra) + body)
+        await writer.drain()
+
+    async def _send_json(self, writer, status, data, keep_alive, extra=()):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        await self._send_bytes(writer, status, body, "application/json; charset=utf-8",
+                               keep_alive, extra)
+
+    async def _send_error(self, writer, error, close):
+        extra = ("Retry-After: 1",) if error.status == 503 else ()
+        await self._send_json(writer, error.status, {"error": error.message}, not close, extra)
+
+    async def _send_file(self, writer, path, content_type, keep_alive, download_name):
+        size = os.path.getsize(path)
+        # 文件名可能包含中文，按 RFC 5987 编码
+        extra = (f"Content-Disposition: attachment; filename*=UTF-8''{quote(download_name)}",)
+        writer.write(self._head(200, content_type, size, keep_alive, extra))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                writer.write(chunk)
+                await writer.drain()
+
+
+def main(argv=None):
+    from .backends import backend_names
+    from .engine import ConversionEngine
+    from .ocrcache import OcrCache
+    from .runtime import setup_environment
+
+    parser = argparse.ArgumentParser(prog="python -m topdf.server",
+                                     description="本地 HTTP 转换服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址（默认 %(default)s）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="端口（默认 %(default)s）")
+    parser.add_argument("--workers", type=int, help="转换线程数（默认 CPU 核数，最多 8）")
+    parser.add_argument("--doc-workers", type=int, default=1, help="常驻的办公软件实例数（默认 1）")
+    parser.add_argument("--backend", choices=backend_names(), help="文档转换后端（默认自动检测）")
+    parser.add_argument("--font", metavar="PATH[#INDEX]",
+                        help="直接排版纯文本/网页/XML 时使用的 TrueType 字体（默认自动查找中文字体）")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="同时接收的请求上限，超过返回 503（默认 %(default)s）")
+    parser.add_argument("--max-upload", type=int, default=DEFAULT_MAX_UPLOAD,
+                        help="单个上传文件的字节数上限（默认 %(default)s）")
+    parser.add_argument("--ocr-batch-size", type=int, default=DEFAULT_OCR_BATCH_SIZE,
+                        help="合并为一次 Tesseract 调用的 OCR 请求数上限（默认 %(default)s）")
+    parser.add_argument("--lang", default=ocr.DEFAULT_LANG, help="默认 OCR 语言（默认 %(default)s）")
+    parser.add_argument("--searchable", action="store_true", help="图片转PDF时附加OCR文字层")
+    parser.add_argument("--ocr-cache", metavar="PATH", help="OCR 结果缓存数据库")
+    parser.add_argument("--tesseract", help="Tesseract 可执行文件路径")
+    parser.add_argument("--metrics", metavar="SPEC", action="append", default=[],
+                        help="另外把阶段指标写入 jsonl:路径 或 prometheus:路径，可重复指定")
+    args = parser.parse_args(argv)
+    try:
+        sinks = [metrics.create_sink(spec) for spec in args.metrics]
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    setup_environment()
+    if args.tesseract:
+        ocr.set_tesseract_path(args.tesseract)
+    else:
+        ocr.init_tesseract()
+    engine_kwargs = {"ocr_lang": args.lang, "doc_workers": max(args.doc_workers, 1),
+                     "searchable": args.searchable, "text_font": args.font}
+    if args.backend:
+        engine_kwargs["office_type"] = args.backend
+    if args.ocr_cache:
+        engine_kwargs["ocr_cache"] = OcrCache(args.ocr_cache)
+
+    # GET /metrics 使用的内存中的指标
+    metrics_sink = metrics.add_sink(metrics.PrometheusSink())
+    for sink in sinks:
+        metrics.add_sink(sink)
+
+    async def serve(engine):
+        server = ConversionServer(engine, args.host, args.port, workers=args.workers,
+                                  max_queue=args.max_queue, max_upload=args.max_upload,
+                                  ocr_batch_size=args.ocr_batch_size, metrics_sink=metrics_sink)
+        await server.start()
+        print(f"转换服务已启动: http://{server.host}:{server.port}/ （按 Ctrl+C 停止）", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    started = time.perf_counter()
+    with ConversionEngine(**engine_kwargs) as engine:
+        try:
+            asyncio.run(serve(engine))
+        except KeyboardInterrupt:
+            pass
+    metrics.close_sinks()
+    print(f"服务已停止，运行 {time.perf_counter() - started:.0f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
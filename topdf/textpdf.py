@@ -0,0 +1,364 @@
+"""不经办公软件把纯文本、HTML 和 XML 直接排版为PDF
+
+输入按块读取、边解析边分页，每排满一页就写入文件，内存占用与文件大小无关。
+文字使用 fonts 找到的中文字体（只嵌入用到的字形子集），没有中文字体时使用
+阅读器自带的 STSong-Light。HTML 只保留文字和段落结构，XML 按源文本显示。
+"""
+import codecs
+import os
+import re
+from bisect import bisect_right
+from html.parser import HTMLParser
+from itertools import accumulate, groupby
+
+from . import fonts, metrics
+from .errors import ConversionError
+from .pdfwriter import PdfWriter
+
+# A4 纸，上下左右各 2 厘米页边距，五号字，1.5 倍行距
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 56.69
+FONT_SIZE = 10.5
+LEADING = FONT_SIZE * 1.5
+TAB_SIZE = 4
+
+# 编码检测读取的文件头长度，以及流式读取的块大小
+_SNIFF_SIZE = 4096
+_READ_SIZE = 64 * 1024
+
+# 行尾允许超出版心的标点（避头），不会被单独挤到下一行的开头
+_HANGING_PUNCT = set("，。、；：！？）》」』】〕…—,.;:!?)]}")
+
+# HTML 中另起一段的标签，以及内容不显示的标签
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tr", "ul",
+}
+_SKIPPED_TAGS = {"script", "style", "head", "title", "template", "noscript"}
+_CELL_TAGS = {"td", "th"}
+
+_HTML_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+_XML_ENCODING = re.compile(rb"^\s*<\?xml[^>]*encoding\s*=\s*[\"']([\w.:-]+)[\"']")
+# 除制表符和换页符外的控制字符不显示
+_CONTROL_CHARS = re.compile("[\x00-\x08\x0b\x0d-\x1f\x7f]")
+
+
+def _normalize_encoding(name):
+    """统一编码名称：GB2312/GBK 按其超集 GB18030 解码，未知编码返回 None"""
+    try:
+        name = codecs.lookup(name).name
+    except LookupError:
+        return None
+    return "gb18030" if name in ("gb2312", "gbk") else name
+
+
+def detect_encoding(path, markup=None):
+    """检测文本文件的编码：BOM、HTML/XML 声明的编码，否则在 UTF-8 和 GB18030 之间判断
+
+    markup 为 "html" 或 "xml" 时读取文件头中声明的编码。
+    """
+    with open(path, "rb") as f:
+        head = f.read(_SNIFF_SIZE)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    pattern = {"html": _HTML_CHARSET, "xml": _XML_ENCODING}.get(markup)
+    match = pattern.search(head) if pattern is not None else None
+    if match:
+        declared = _normalize_encoding(match.group(1).decode("ascii"))
+        if declared:
+            return declared
+    try:
+        # 文件头末尾可能截断了一个多字节字符，不按完整输入解码
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def _read_chunks(path, encoding):
+    """按块产出解码后的文字（统一换行符），无法解码的字节替换为 U+FFFD"""
+    with open(path, "r", encoding=encoding, errors="replace", newline=None) as f:
+        while True:
+            chunk = f.read(_READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _text_lines(chunks):
+    """把文字块切分为行，产出 (文字, 是否到了行尾)，文字不含换行符
+
+    没有换行的超长行不会整行缓存：块末尾未结束的部分直接产出，行尾标记为假。
+    """
+    for chunk in chunks:
+        lines = chunk.split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line, True
+        if rest:
+            yield rest, False
+
+
+class _HtmlText(HTMLParser):
+    """把 HTML 转为按段落分行的纯文本：连续空白合并，块级标签换行，pre 保留原样"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self._line = []
+        self._skip = 0
+        self._pre = 0
+
+    def _break(self):
+        text = "".join(self._line)
+        self._line = []
+        if not self._pre:
+            text = text.strip()
+            if not text:
+                return
+        self.lines.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skip += 1
+        elif tag == "br":
+            self._break()
+        elif tag in _CELL_TAGS:
+            if self._line:
+                self._line.append("\t")
+        elif tag in _BLOCK_TAGS:
+            self._break()
+            if tag == "pre":
+                self._pre += 1
+            elif tag == "li":
+                self._line.append("• ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br" or tag == "hr":
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self._break()
+            if tag == "pre":
+                self._pre = max(self._pre - 1, 0)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._pre:
+            # pre 中的换行就是分行
+            parts = data.split("\n")
+            for part in parts[:-1]:
+                self._line.append(part)
+                self._break()
+            self._line.append(parts[-1])
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not self._line or self._line[-1].endswith((" ", "\t")):
+            text = text.lstrip(" ")
+        if text:
+            self._line.append(text)
+
+    def close(self):
+        super().close()
+        self._break()
+
+
+def _html_lines(chunks):
+    """流式解析 HTML，产出可见文字的各行"""
+    parser = _HtmlText()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.lines
+        parser.lines = []
+    parser.close()
+    yield from parser.lines
+
+
+def _complete_lines(lines):
+    """把完整的行转为 _text_lines 的 (文字, 是否到了行尾) 形式"""
+    for line in lines:
+        yield line, True
+
+
+class _Paginator:
+    """按字符宽度折行、按行数分页，排满一页就写入 writer
+
+    字体中没有的字符改用 STSong-Light（/F2）显示，用到时才添加该字体。
+    """
+
+    def __init__(self, writer, font):
+        self.writer = writer
+        self.font = font
+        self.font_id = writer.reserve_object()
+        self.fallback = None
+        self.fallback_id = None
+        # 由后备字体显示的字符
+        self._fallback_chars = set()
+        # 版心宽度，单位与字符宽度相同（1/1000 字号）
+        self.max_width = (PAGE_WIDTH - 2 * MARGIN) * 1000 / FONT_SIZE
+        self.lines_per_page = int((PAGE_HEIGHT - 2 * MARGIN) // LEADING)
+        self._widths = {}
+        self._lines = []
+        # 当前逻辑行中已经读入、还没有折行的末尾部分，以及它之前（展开制表符后）的字符数
+        self._pending = None
+        self._column = 0
+        # 当前逻辑行中已经出现过换页符
+        self._split = False
+        # 刚因排满而换页（或在文档开头），此时的换页符不再产生空白页
+        self._page_filled = True
+
+    def add_line(self, text, end=True):
+        """排入一个逻辑行，换页符另起一页
+
+        end 为假时 text 只是逻辑行的一部分，后续部分由下一次调用接着排入；已经确定的
+        行直接排入页面，只保留最后一个可能还会变长的行，超长的行不必整行缓存。
+        """
+        # 制表位按整个逻辑行计算，前面部分的字符数决定这一段开头的列号
+        offset = self._column % TAB_SIZE
+        text = (" " * offset + text).expandtabs(TAB_SIZE)[offset:]
+        self._column = 0 if end else self._column + len(text)
+        text = _CONTROL_CHARS.sub("", text)
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            text = pending + text
+        parts = text.split("\f")
+        split = self._split or len(parts) > 1
+        self._split = split and not end
+        for i, part in enumerate(parts):
+            if i:
+                if self._lines or not self._page_filled:
+                    self.flush(force=True)
+                self._page_filled = False
+            if not part and split and (end or i < len(parts) - 1):
+                continue
+            lines = self._wrap(part)
+            if not end and i == len(parts) - 1:
+                self._pending = lines.pop()
+            for line in lines:
+                self._lines.append(line)
+                self._page_filled = False
+                if len(self._lines) == self.lines_per_page:
+                    self.flush()
+                    self._page_filled = True
+
+    def _wrap(self, text):
+        """贪心折行：尽量排满一行，西文单词在空格处断开，避头标点留在行尾"""
+        widths = self._widths
+        for char in set(text).difference(widths):
+            if self.font.covers(char):
+                widths[char] = self.font.width(char)
+            else:
+                if self.fallback is None:
+                    self.fallback = fonts.StandardCjkFont()
+                    self.fallback_id = self.writer.reserve_object()
+                self._fallback_chars.add(char)
+                widths[char] = self.fallback.width(char)
+        # 前缀宽度和：每行能排下多少字符用二分查找，不必逐字累加
+        offsets = list(accumulate(map(widths.__getitem__, text)))
+        lines = []
+        start, base = 0, 0
+        while offsets and offsets[-1] - base > self.max_width:
+            end = max(bisect_right(offsets, base + self.max_width, start), start + 1)
+            if end >= len(text):
+                break
+            char = text[end]
+            if char in _HANGING_PUNCT:
+                end = next_start = end + 1
+            elif char == " ":
+                next_start = end + 1
+            else:
+                next_start = end
+                space = text.rfind(" ", start, end)
+                if space > start and text[space + 1:end + 1].isascii():
+                    # 在西文单词中间超出版心，整个单词移到下一行
+                    end, next_start = space, space + 1
+            lines.append(text[start:end])
+            start = next_start
+            base = offsets[start - 1] if start else 0
+        if start < len(text) or not lines:
+            lines.append(text[start:])
+        return lines
+
+    def flush(self, force=False):
+        """写出已排的行；force 为真时即使没有内容也输出一页（换页符产生的空白页）"""
+        if not self._lines and not force:
+            return
+        lines, self._lines = self._lines, []
+        ops = [
+            "BT",
+            f"/F1 {FONT_SIZE:g} Tf",
+            f"{LEADING:g} TL",
+            f"{MARGIN:g} {PAGE_HEIGHT - MARGIN - FONT_SIZE:.2f} Td",
+        ]
+        for i, line in enumerate(lines):
+            if i:
+                ops.append("T*")
+            if line:
+                ops.append(self._show(line))
+        ops.append("ET")
+        resources = f"/F1 {self.font_id} 0 R"
+        if self.fallback is not None:
+            resources += f" /F2 {self.fallback_id} 0 R"
+        self.writer.add_content_page(PAGE_WIDTH, PAGE_HEIGHT, "\n".join(ops),
+                                     f"/Font << {resources} >>")
+
+    def _show(self, line):
+        """一行文字的绘制指令，每段连续使用同一字体的文字一个 Tj"""
+        if not self._fallback_chars or self._fallback_chars.isdisjoint(line):
+            return f"<{self.font.encode(line)}> Tj"
+        ops = []
+        current = False
+        for fallback, run in groupby(line, self._fallback_chars.__contains__):
+            if fallback != current:
+                ops.append(f"/F{2 if fallback else 1} {FONT_SIZE:g} Tf")
+                current = fallback
+            font = self.fallback if fallback else self.font
+            ops.append(f"<{font.encode(''.join(run))}> Tj")
+        if current:
+            ops.append(f"/F1 {FONT_SIZE:g} Tf")
+        return " ".join(ops)
+
+    def close(self):
+        """写出最后一页和字体；没有任何内容时输出一张空白页"""
+        if self._pending is not None:
+            # 文件末尾没有换行的最后一行
+            self.add_line("")
+        self.flush(force=not self.writer.page_count)
+        self.font.write(self.writer, self.font_id)
+        if self.fallback is not None:
+            self.fallback.write(self.writer, self.fallback_id)
+
+
+def render_text_to_pdf(source, output_path, font_spec=None):
+    """把 txt/htm/html/xml 文件排版为PDF，返回页数，失败抛出 ConversionError
+
+    font_spec 指定字体（"路径" 或 "路径#序号"），默认查找常见的中文字体。
+    """
+    ext = os.path.splitext(source)[1].lower()
+    markup = {".htm": "html", ".html": "html", ".xml": "xml"}.get(ext)
+    try:
+        font = fonts.document_font(font_spec)
+        encoding = detect_encoding(source, markup)
+        chunks = _read_chunks(source, encoding)
+        if markup == "html":
+            lines = _complete_lines(_html_lines(chunks))
+        else:
+            lines = _text_lines(chunks)
+        with metrics.stage("text_render"), PdfWriter(output_path) as writer:
+            paginator = _Paginator(writer, font)
+            for line, end in lines:
+                paginator.add_line(line, end)
+            paginator.close()
+            return writer.page_count
+    except fonts.FontError as e:
+        raise ConversionError(str(e)) from e
+    except OSError as e:
+        raise ConversionError(f"无法读取文件: {str(e)}") from e
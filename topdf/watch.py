@@ -0,0 +1,303 @@
+"""监视文件夹，持续转换新放入的文件
+
+Linux 上使用 inotify（通过 ctypes 调用，无需额外依赖）即时得到文件变化，
+其他平台或 inotify 不可用时退回定时扫描。文件大小和修改时间在 settle 秒内
+不再变化才认为写入完成，避免转换还在复制中的文件。转换并发数和排队数都有上限，
+输出先写入临时文件再原子地替换（见 PdfWriter 和 ConversionEngine.convert_document）。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import metrics
+from .engine import ConversionResult
+from .formats import file_kind
+from .parallel import (_convert_in_worker, _init_worker, _worker_settings, default_workers,
+                       uses_process)
+
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 事件（见 <sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _ignored_name(name):
+    """隐藏文件、临时文件和 Office 的锁文件"""
+    return (name.startswith((".", "~$")) or name.endswith((".part", ".tmp", ".crdownload"))
+            or ".part." in name)
+
+
+def scan_tree(directory, recursive=True, exclude=()):
+    """列出目录中所有支持的文件"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".")
+                         and os.path.abspath(os.path.join(root, d)) not in exclude)
+        for name in sorted(files):
+            if not _ignored_name(name) and file_kind(name) is not None:
+                yield os.path.join(root, name)
+        if not recursive:
+            break
+
+
+class PollingWatcher:
+    """定时扫描目录，报告新增或大小/修改时间有变化的文件"""
+
+    def __init__(self, directories, recursive=True, interval=DEFAULT_POLL_INTERVAL, exclude=()):
+        self.directories = directories
+        self.recursive = recursive
+        self.interval = interval
+        self.exclude = exclude
+        self._seen = {}
+        self._scan()
+
+    def _scan(self):
+        changed, seen = [], {}
+        for directory in self.directories:
+            for path in scan_tree(directory, self.recursive, self.exclude):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen[path] = (st.st_size, st.st_mtime_ns)
+                if self._seen.get(path) != seen[path]:
+                    changed.append(path)
+        self._seen = seen
+        return changed
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return self._scan()
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 Linux inotify 的监视器，新建的子目录会自动加入监视"""
+
+    def __init__(self, directories, recursive=True, exclude=()):
+        self.recursive = recursive
+        self.exclude = exclude
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._dirs = {}
+        self.directories = directories
+        for directory in directories:
+            self._add_tree(directory)
+
+    def _add_tree(self, directory):
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")
+                       and os.path.abspath(os.path.join(root, d)) not in self.exclude]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), _IN_WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"无法监视目录: {root}")
+            self._dirs[wd] = root
+            if not self.recursive:
+                break
+
+    def poll(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changed = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                # 事件队列溢出，丢失的事件只能靠重新扫描补回
+                for directory in self.directories:
+                    changed.extend(scan_tree(directory, self.recursive, self.exclude))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if self.recursive and not name.startswith(".") \
+                        and os.path.abspath(path) not in self.exclude:
+                    # 新目录：加入监视，并补上加入监视之前已经写入的文件
+                    self._add_tree(path)
+                    changed.extend(scan_tree(path, True, self.exclude))
+            elif not _ignored_name(name) and file_kind(name) is not None:
+                changed.append(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(directories, recursive=True, polling=False,
+                   interval=DEFAULT_POLL_INTERVAL, exclude=()):
+    """Linux 上优先使用 inotify，否则（或 polling 为真时）定时扫描"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories, recursive, exclude)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, recursive, interval, exclude)
+
+
+class _Settler:
+    """文件写入完成检测：大小和修改时间持续 settle 秒不变才认为可以转换"""
+
+    def __init__(self, settle):
+        self.settle = settle
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def touch(self, path):
+        self._pending.setdefault(path, (None, 0.0))
+
+    def ready(self, busy=()):
+        now = time.monotonic()
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # 文件在写完之前又被删除或移走
+                del self._pending[path]
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle and path not in busy:
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+
+class WatchService:
+    """监视一个或多个输入目录，把写入完成的文件交给转换引擎
+
+    每个文件按所在的监视目录保留子目录结构输出到 output_dir。workers 不为 1 时图片在
+    进程池中转换；同时进行的转换不超过 max_pending 个，其余文件排队等待。
+    引擎设置了 manifest 时，重启后已转换且未变化的文件会被跳过。同名不同扩展名的文件
+    （scan.jpg、scan.pdf）按 ConversionEngine.assign_names 分配不同的输出文件名，
+    分配过的名字在服务运行期间一直保留。
+    """
+
+    def __init__(self, engine, directories, output_dir=None, recursive=True, ocr_text=False,
+                 workers=1, max_pending=None, settle=DEFAULT_SETTLE, polling=False,
+                 poll_interval=DEFAULT_POLL_INTERVAL, on_result=None):
+        self.engine = engine
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.output_dir = os.path.abspath(output_dir or engine.output_dir)
+        self.recursive = recursive
+        self.ocr_text = ocr_text
+        self.workers = workers
+        self.max_pending = max(max_pending or (workers or default_workers()) * 2, 1)
+        self.settle = settle
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self._stopping = False
+        # 已分配的输出文件名（见 ConversionEngine.assign_names），同一个文件再次转换时沿用
+        self._claimed = {}
+
+    def _base_dir(self, path):
+        path = os.path.abspath(path)
+        for directory in self.directories:
+            if os.path.commonpath([path, directory]) == directory:
+                return directory
+        return None
+
+    def stop(self):
+        """请求停止（可在其他线程或信号处理函数中调用），run 会等正在转换的文件完成后返回"""
+        self._stopping = True
+
+    def run(self):
+        """开始监视，直到调用 stop() 或按 Ctrl+C"""
+        use_processes = self.workers != 1 and not self.ocr_text
+        workers = self.workers or default_workers()
+        thread_pool = ThreadPoolExecutor(
+            max_workers=(1 if use_processes else workers) + self.engine.doc_workers)
+        process_pool = None
+        if use_processes:
+            process_pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(_worker_settings(self.engine),))
+        handler = self.engine.extract_text_to_file if self.ocr_text else self.engine.convert_file
+        ext = ".txt" if self.ocr_text else ".pdf"
+        # 输出目录在输入目录之内时不能监视它，否则会处理自己的输出
+        exclude = {self.output_dir}
+        watcher = create_watcher(self.directories, self.recursive, self.polling,
+                                 self.poll_interval, exclude)
+        settler = _Settler(self.settle)
+        queued, in_flight = [], {}
+        try:
+            # 启动前已经存在的文件也需要处理
+            for directory in self.directories:
+                for path in scan_tree(directory, self.recursive, exclude):
+                    settler.touch(path)
+            while not self._stopping:
+                timeout = min(self.settle / 2, self.poll_interval) if len(settler) else 1.0
+                for path in watcher.poll(timeout):
+                    settler.touch(path)
+                for path in settler.ready(busy=in_flight.values()):
+                    if path not in queued:
+                        queued.append(path)
+                self._collect(in_flight)
+                while queued and len(in_flight) < self.max_pending:
+                    path = queued.pop(0)
+                    _, base_dir, name = next(self.engine.assign_names(
+                        [(path, self._base_dir(path))], self.output_dir, ext, self._claimed))
+                    if process_pool is not None and uses_process(self.engine, path):
+                        future = process_pool.submit(_convert_in_worker, path,
+                                                     self.output_dir, base_dir, None, name)
+                    else:
+                        future = thread_pool.submit(handler, path, self.output_dir, base_dir,
+                                                    name=name)
+                    in_flight[future] = path
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            # 等待正在转换的文件完成，排队中的文件下次启动时会重新扫描到
+            for future in list(in_flight):
+                future.exception()
+            self._collect(in_flight)
+            thread_pool.shutdown()
+            if process_pool is not None:
+                process_pool.shutdown()
+
+    def _collect(self, in_flight):
+        for future in [f for f in in_flight if f.done()]:
+            path = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                # 子进程意外退出等，引擎本身不会抛出转换错误
+                result = ConversionResult(path, kind=file_kind(path),
+                                          error=f"转换过程中发生错误: {str(e)}")
+            if result.events:
+                metrics.forward(result.events)
+                result.events = None
+            if self.on_result is not None:
+                self.on_result(result)